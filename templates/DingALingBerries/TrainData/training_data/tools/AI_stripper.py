@@ -1,8 +1,9 @@
 import os
 import subprocess
-import imageio.v3 as iio
 from PIL import Image
 from tkinter import Tk, filedialog
+from frame_source import AnimatedFrameSource, is_animated_image
+from png_chunks import PngFormatError, strip_chunks
 
 # Suppress tkinter window
 Tk().withdraw()
@@ -16,20 +17,42 @@ if not source_folder:
 output_folder = os.path.join(source_folder, "stripped")
 os.makedirs(output_folder, exist_ok=True)
 
-# Strip metadata from PNG
+# Strip metadata from PNG: drop the text / EXIF / time chunks and copy the rest byte for byte,
+# so pixels, compression and the ICC profile stay exactly as they were (no decode, no re-encode)
 def strip_png(input_path, output_path):
     try:
-        img = Image.open(input_path)
-        img.save(output_path, format="PNG")
-        print(f"[PNG] Stripped: {output_path}")
+        dropped, removed = strip_chunks(input_path, output_path)
+        print(f"[PNG] Stripped: {output_path} ({dropped} chunk(s), {removed / 1024:.1f} KB)")
+    except PngFormatError:
+        # not really a PNG (or damaged): fall back to decoding and re-saving it
+        try:
+            img = Image.open(input_path)
+            img.save(output_path, format="PNG")
+            print(f"[PNG] Stripped (re-encoded): {output_path}")
+        except Exception as e:
+            print(f"[PNG] Failed: {e}")
     except Exception as e:
         print(f"[PNG] Failed: {e}")
 
-# Strip metadata from animated WebP
+# Strip metadata from animated WebP (frames streamed into ffmpeg one at a time)
 def strip_webp(input_path, output_path):
     try:
-        frames = list(iio.imiter(input_path))
-        iio.imwrite(output_path, frames, plugin="pillow", format="WEBP", loop=0)
+        if not is_animated_image(input_path):
+            with Image.open(input_path) as img:
+                img.save(output_path, format="WEBP")
+            print(f"[WEBP] Stripped: {output_path}")
+            return
+        src = AnimatedFrameSource(input_path)
+        cmd = [
+            "ffmpeg", "-y", *src.input_args(),
+            "-map_metadata", "-1",
+            "-c:v", "libwebp_anim", "-quality", "80", "-loop", "0",
+            output_path
+        ]
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        src.write_to(proc.stdin)
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with {proc.returncode}")
         print(f"[WEBP] Stripped: {output_path}")
     except Exception as e:
         print(f"[WEBP] Failed: {e}")
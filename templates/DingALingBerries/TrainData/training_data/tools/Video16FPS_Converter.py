@@ -4,6 +4,10 @@
 # - GPU (NVENC) or CPU encoders, queue, live logs, per-file + overall progress.
 # - Avoids CUDA hwframes/scaler requirements (compatible with vanilla ffmpeg builds).
 # - Auto-mode prefers HEVC Main10 for >8‑bit sources, else H.264 NVENC.
+# - Training profiles trade file size for decode speed when musubi extracts frames
+#   (all-intra / short-GOP fastdecode x264, PNG sequence, or a raw .npy frame dump).
+# - Animated WebP/GIF inputs are decoded frame by frame (frame_source.py) and piped in as rawvideo.
+# - All ffmpeg/ffprobe children run on one asyncio loop (ffmpeg_jobs.py), several at once if asked.
 #
 # Requirements: ffmpeg + ffprobe on PATH (or pick via "Browse ffmpeg…").
 # Windows: run with python 3.9+ (double-click if py assoc enabled).
@@ -12,15 +16,26 @@ import os
 import re
 import math
 import json
-import time
 import shlex
-import threading
+import struct
+import asyncio
 import subprocess
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
+from frame_source import ANIMATED_EXTS, AnimatedFrameSource, ffmpeg_input, is_animated_image
+from ffmpeg_jobs import JobEngine, JobLog, TkDispatcher
+
 VIDEO_EXTS = {".mp4",".mkv",".mov",".avi",".wmv",".flv",".webm",".mts",".m2ts",".m4v",".mpg",".mpeg"}
 
+# Training profiles -> output extension ("" = folder of PNG frames).
+TRAIN_PROFILES = {
+    "train_intra": ".mp4",   # libx264 all-intra, -tune fastdecode, 8-bit yuv420p
+    "train_gop":   ".mp4",   # libx264 1-second GOP, no B-frames, -tune fastdecode
+    "png_seq":     "",       # lossless PNG image sequence
+    "npy":         ".npy",   # uint8 RGB frames, shape (T, H, W, 3), memory-mappable
+}
+
 # ---------------------- FFPROBE HELPERS ----------------------
 
 def run_json(cmd):
@@ -30,11 +45,38 @@ def run_json(cmd):
     except Exception:
         return None
 
+def ffprobe_cmd(ffprobe_path, src):
+    return [ffprobe_path,"-v","error","-print_format","json","-show_streams","-show_format",src]
+
 def ffprobe_info(ffprobe_path, src):
-    return run_json([ffprobe_path,"-v","error","-print_format","json","-show_streams","-show_format",src])
+    return run_json(ffprobe_cmd(ffprobe_path, src))
 
 def get_video_stream_info(ffprobe_path, src):
-    info = ffprobe_info(ffprobe_path, src)
+    if is_animated_image(src):
+        try:
+            return AnimatedFrameSource(src).probe()
+        except (OSError, ValueError):
+            return stream_info_from_probe(None)
+    return stream_info_from_probe(ffprobe_info(ffprobe_path, src))
+
+async def probe_video_async(engine, ffprobe_path, src):
+    """
+    get_video_stream_info() on the JobEngine loop (ffprobe runs as an async child).
+    """
+    if is_animated_image(src):
+        try:
+            return AnimatedFrameSource(src).probe()
+        except (OSError, ValueError):
+            return stream_info_from_probe(None)
+    info = None
+    try:
+        res = await engine.run_capture(ffprobe_cmd(ffprobe_path, src))
+        if res.ok: info = json.loads(res.stdout)
+    except (RuntimeError, ValueError):
+        info = None
+    return stream_info_from_probe(info)
+
+def stream_info_from_probe(info):
     if not info: return {"duration": None, "bit_depth": 8, "pix_fmt": None}
     v = None
     for s in info.get("streams",[]):
@@ -51,6 +93,13 @@ def get_video_stream_info(ffprobe_path, src):
         try: dur = float(info.get("format",{}).get("duration"))
         except: dur = None
 
+    fps = None
+    rate = v.get("avg_frame_rate") or v.get("r_frame_rate") or "0/1"
+    try:
+        num, den = rate.split("/")
+        fps = float(num)/float(den) if float(den) else None
+    except: fps = None
+
     pix_fmt = v.get("pix_fmt")
     bit_depth = 8
     if isinstance(pix_fmt, str):
@@ -59,7 +108,17 @@ def get_video_stream_info(ffprobe_path, src):
             try: bit_depth = int(m.group(1))
             except: bit_depth = 8
 
-    return {"duration": dur, "bit_depth": bit_depth, "pix_fmt": pix_fmt}
+    # display size (rotated phone clips come out of ffmpeg with width/height swapped)
+    w, h = v.get("width"), v.get("height")
+    rot = v.get("tags",{}).get("rotate")
+    for sd in v.get("side_data_list") or []:
+        rot = sd.get("rotation", rot)
+    try:
+        if abs(int(float(rot or 0))) in (90, 270): w, h = h, w
+    except: pass
+
+    return {"duration": dur, "bit_depth": bit_depth, "pix_fmt": pix_fmt, "fps": fps,
+            "width": w, "height": h}
 
 def fmt_hms(secs):
     if secs is None or math.isinf(secs) or math.isnan(secs): return "—"
@@ -67,16 +126,21 @@ def fmt_hms(secs):
     h = secs//3600; m=(secs%3600)//60; s=secs%60
     return f"{h:d}:{m:02d}:{s:02d}" if h else f"{m:d}:{s:02d}"
 
-def list_videos(paths):
+def list_videos(paths, animated=True):
+    def wanted(f):
+        ext = os.path.splitext(f)[1].lower()
+        if ext in VIDEO_EXTS: return True
+        return animated and ext in ANIMATED_EXTS and is_animated_image(f)
+
     files = []
     for p in paths:
         if os.path.isdir(p):
             for root,_,names in os.walk(p):
                 for n in names:
-                    if os.path.splitext(n)[1].lower() in VIDEO_EXTS:
+                    if wanted(os.path.join(root,n)):
                         files.append(os.path.join(root,n))
         else:
-            if os.path.splitext(p)[1].lower() in VIDEO_EXTS:
+            if wanted(p):
                 files.append(p)
     # dedupe keep order
     seen=set(); out=[]
@@ -94,12 +158,65 @@ def detect_gpus():
     except Exception:
         return []
 
-def safe_out_path(in_path, out_dir, fps=16):
+def safe_out_path(in_path, out_dir, fps=16, encoder=None):
     base = os.path.basename(in_path)
     name, ext = os.path.splitext(base)
-    if not ext: ext = ".mp4"
+    if encoder in TRAIN_PROFILES: ext = TRAIN_PROFILES[encoder]
+    elif not ext or ext.lower() in ANIMATED_EXTS: ext = ".mp4"
     return os.path.join(out_dir, f"{name}_{fps}FPS{ext}")
 
+class NpyFrameWriter:
+    """
+    Streams raw rgb24 frames from ffmpeg into a .npy of shape (T, H, W, 3).
+    The header is a fixed 128 bytes written up front and patched with the real
+    frame count on close, so frames go straight to disk and never pile up in RAM.
+    """
+    HEADER_LEN = 128
+    CHUNK_FRAMES = 8
+
+    def __init__(self, path, height, width):
+        self.path = path
+        self.height = int(height)
+        self.width = int(width)
+        self.frame_bytes = self.height * self.width * 3
+        self.frames = 0
+
+    def _header(self, frames):
+        d = "{'descr': '|u1', 'fortran_order': False, 'shape': (%d, %d, %d, 3), }" % (frames, self.height, self.width)
+        body = d.ljust(self.HEADER_LEN - 11) + "\n"
+        return b"\x93NUMPY\x01\x00" + struct.pack("<H", len(body)) + body.encode("latin1")
+
+    def begin(self):
+        self._f = open(self.path, "wb")
+        self._f.write(self._header(0))
+        self._total = 0
+
+    def write(self, data):
+        self._f.write(data)
+        self._total += len(data)
+
+    def finish(self):
+        f = self._f
+        self.frames = self._total // self.frame_bytes
+        f.truncate(self.HEADER_LEN + self.frames * self.frame_bytes)
+        f.seek(0)
+        f.write(self._header(self.frames))
+        f.close()
+        return self.frames
+
+    def pump(self, stream):
+        buf = bytearray(self.frame_bytes * self.CHUNK_FRAMES)
+        view = memoryview(buf)
+        self.begin()
+        try:
+            while True:
+                n = stream.readinto(view)
+                if not n: break
+                self.write(view[:n])
+        finally:
+            self.finish()
+        return self.frames
+
 # ---------------------- COMMAND BUILDER ----------------------
 
 class BuildCmdError(Exception): pass
@@ -112,6 +229,10 @@ class CmdBuilder:
       - "hevc_nvenc"   -> GPU HEVC (set profile main10 if user wants 10‑bit)
       - "libx264"      -> CPU H.264
       - "libx265"      -> CPU HEVC (uses 10‑bit if source is >8‑bit)
+      - "train_intra"  -> CPU H.264 all-intra, fastdecode, 8-bit yuv420p (decode-friendly dataset clips)
+      - "train_gop"    -> CPU H.264 GOP = fps frames, no B-frames, fastdecode, 8-bit yuv420p
+      - "png_seq"      -> lossless PNG sequence; dst is a folder
+      - "npy"          -> rawvideo rgb24 on stdout for NpyFrameWriter; dst is ignored
     Avoids CUDA hwframe filters; keeps pipeline broadly compatible.
     """
     def __init__(self, ffmpeg="ffmpeg", ffprobe="ffprobe", fps=16,
@@ -134,7 +255,11 @@ class CmdBuilder:
         self.crf = str(crf)
         self.x_preset = str(x_preset)
 
-    def build(self, src, dst, vinfo):
+    def build(self, src, dst, vinfo, input_args=None):
+        """
+        input_args: ffmpeg input of a piped frame source (rawvideo on stdin, no NVDEC);
+        None reads src directly.
+        """
         bd = vinfo.get("bit_depth", 8) or 8
         enc = self.encoder
 
@@ -147,13 +272,15 @@ class CmdBuilder:
         cmd = [self.ffmpeg, "-hide_banner", "-y"]
 
         # Optional HW decode: use NVDEC without forcing CUDA hwframe output (no -hwaccel_output_format)
-        if enc.endswith("_nvenc") and self.use_hwdecode:
+        if enc.endswith("_nvenc") and self.use_hwdecode and not input_args:
             cmd += ["-hwaccel","cuda","-hwaccel_device",str(self.gpu_index)]
 
-        cmd += ["-i", src, "-fps_mode","cfr","-r", str(self.fps)]
+        cmd += (input_args or ["-i", src]) + ["-fps_mode","cfr","-r", str(self.fps)]
 
         # Audio mapping
-        if self.keep_audio:
+        if enc in ("png_seq","npy"):
+            cmd += ["-map","0:v:0","-an"]
+        elif self.keep_audio:
             cmd += ["-map","0:v:0","-map","0:a?","-c:a","aac","-b:a","192k"]
         else:
             cmd += ["-map","0:v:0","-an"]
@@ -179,6 +306,16 @@ class CmdBuilder:
                 cmd += ["-c:v","libx265","-preset",self.x_preset,"-crf",self.crf,"-pix_fmt","yuv420p10le","-movflags","+faststart"]
             else:
                 cmd += ["-c:v","libx265","-preset",self.x_preset,"-crf",self.crf,"-pix_fmt","yuv420p","-movflags","+faststart"]
+        elif enc in ("train_intra","train_gop"):
+            gop = "1" if enc == "train_intra" else str(self.fps)
+            cmd += ["-c:v","libx264","-preset",self.x_preset,"-crf",self.crf,"-tune","fastdecode",
+                    "-g",gop,"-bf","0","-pix_fmt","yuv420p","-movflags","+faststart"]
+        elif enc == "png_seq":
+            cmd += ["-c:v","png","-compression_level","1","-pix_fmt","rgb24","-f","image2"]
+            dst = os.path.join(dst, "%06d.png")
+        elif enc == "npy":
+            cmd += ["-f","rawvideo","-pix_fmt","rgb24"]
+            dst = "pipe:1"
         else:
             raise BuildCmdError(f"Unsupported encoder: {enc}")
 
@@ -187,101 +324,143 @@ class CmdBuilder:
 
 # ---------------------- WORKER / PROGRESS ----------------------
 
-TIME_RE = re.compile(r"time=(\d+):(\d+):(\d+)\.(\d+)")
-def parse_timecode(line):
-    m = TIME_RE.search(line)
-    if not m: return None
-    h, mnt, s, ms = m.groups()
-    secs = int(h)*3600 + int(mnt)*60 + int(s) + (int(ms)/ (10**len(ms)))
-    return secs
-
-class Worker(threading.Thread):
-    def __init__(self, files, out_dir, builder: CmdBuilder, ffprobe, log_fn, progress_fn, overall_fn, stop_flag):
-        super().__init__(daemon=True)
-        self.files = files
+def fmt_metrics(m):
+    parts = []
+    if m.get("frames") is not None: parts.append(f"{m['frames']} frames")
+    if m.get("fps"): parts.append(f"{m['fps']:.1f} fps")
+    if m.get("speed"): parts.append(f"{m['speed']:.2f}x")
+    if m.get("total_size"): parts.append(f"{m['total_size']/(1024*1024):.1f} MB")
+    return ", ".join(parts)
+
+class Worker:
+    """
+    Converts the queue on the shared JobEngine loop. Up to `jobs` ffmpeg children run at
+    once and all of their pipes are read by that one loop thread; every UI callback is
+    posted through `ui` (TkDispatcher) so nothing here touches Tk directly.
+    Progress comes from ffmpeg's -progress stream; per-job metrics also go to job_log.
+    """
+    def __init__(self, engine, ui, files, out_dir, builder: CmdBuilder, ffprobe,
+                 log_fn, progress_fn, overall_fn, done_fn, jobs=1, job_log=None):
+        self.engine = engine
+        self.ui = ui
+        self.files = list(files)
         self.out_dir = out_dir
         self.builder = builder
         self.ffprobe = ffprobe
         self.log = log_fn
         self.progress = progress_fn
         self.overall = overall_fn
-        self.stop_flag = stop_flag
+        self.done_fn = done_fn
+        self.jobs = max(1, int(jobs))
+        self.job_log = job_log
+        self.future = None
 
-    def run(self):
-        # Pre-compute durations for overall ETA
-        total_secs = 0.0
-        durations = {}
-        for f in self.files:
-            vi = get_video_stream_info(self.ffprobe, f)
-            d = vi.get("duration") if vi else None
-            durations[f] = d
-            if d: total_secs += d
+    def start(self):
+        self.future = self.engine.submit(self.run())
 
-        done_secs = 0.0
-        total_files = len(self.files)
+    def stop(self):
+        if self.future: self.future.cancel()
 
-        for idx, src in enumerate(self.files, 1):
-            if self.stop_flag.is_set(): break
+    def _post(self, fn, *args):
+        self.ui.post(fn, *args)
 
-            vi = get_video_stream_info(self.ffprobe, src) or {}
-            dur = vi.get("duration") or 0.0
-            dst = safe_out_path(src, self.out_dir, self.builder.fps)
-            self.log(f"\\n[{idx}/{total_files}] {src}\\n")
-            try:
-                cmd = self.builder.build(src, dst, vi)
-            except BuildCmdError as e:
-                self.log(f"Build error: {e}\\n")
-                continue
+    async def run(self):
+        try:
+            # Probe everything up front (concurrently) for the overall ETA
+            infos = await asyncio.gather(*(probe_video_async(self.engine, self.ffprobe, f) for f in self.files))
+            self.total_secs = sum((vi.get("duration") or 0.0) for vi in infos)
+            self.secs_done = {}   # src -> seconds encoded (finished or in progress)
+            self.files_done = 0
+
+            slots = asyncio.Semaphore(self.jobs)
+            async def one(idx, src, vi):
+                async with slots:
+                    await self.convert(idx, src, vi)
+            await asyncio.gather(*(one(i, f, vi) for i, (f, vi) in enumerate(zip(self.files, infos), 1)))
+        finally:
+            self._post(self.done_fn)
+
+    async def convert(self, idx, src, vi):
+        """
+        One file; any error is logged and recorded for that file only, so the batch goes on.
+        """
+        try:
+            await self._convert(idx, src, vi)
+        except Exception as e:
+            self.secs_done.pop(src, None)
+            if self.job_log: self.job_log.write("failed", src, error=str(e))
+            self._post(self.log, f"[{idx}/{len(self.files)}] failed: {e}\\n")
+            self._advance()
+
+    async def _convert(self, idx, src, vi):
+        total_files = len(self.files)
+        dur = vi.get("duration") or 0.0
+        dst = safe_out_path(src, self.out_dir, self.builder.fps, self.builder.encoder)
+        self._post(self.log, f"\\n[{idx}/{total_files}] {src}\\n")
+        try:
+            in_args, feeder = ffmpeg_input(src)
+            cmd = self.builder.build(src, dst, vi, in_args if feeder else None)
+        except BuildCmdError as e:
+            self._post(self.log, f"Build error: {e}\\n")
+            return
 
-            self.log(" ".join(shlex.quote(c) for c in cmd) + "\\n")
+        self._post(self.log, " ".join(shlex.quote(c) for c in cmd) + "\\n")
+
+        writer = None
+        if self.builder.encoder == "png_seq":
+            os.makedirs(dst, exist_ok=True)
+        elif self.builder.encoder == "npy":
+            if not vi.get("width") or not vi.get("height"):
+                self._post(self.log, "Build error: ffprobe reported no frame size, cannot write .npy.\\n")
+                return
+            writer = NpyFrameWriter(dst, vi["height"], vi["width"])
+            writer.begin()
+
+        if self.job_log: self.job_log.write("start", src, dst=dst, duration=dur, cmd=cmd)
+        last = {}
+
+        def on_progress(m):
+            last.update(m)
+            if self.job_log: self.job_log.progress(src, m)
+            tc = m["out_time"]
+            if tc is None or dur <= 0: return
+            tc = min(tc, dur)
+            self.secs_done[src] = tc
+            pct = (tc/dur)*100.0
+            speed = m["speed"]
+            eta = (dur-tc)/speed if speed else None
+            self.ui.post_latest("progress", self.progress, idx, total_files, src, tc, dur, pct, eta, m)
 
-            start = time.time()
-            last_tc = 0.0
-            speeds = []
-            N = 20
+        try:
+            res = await self.engine.run_process(cmd, on_progress=on_progress, stdin_source=feeder,
+                                                stdout_sink=writer.write if writer else None)
+        finally:
+            if writer: writer.finish()
+
+        if self.job_log:
+            self.job_log.write("done" if res.ok else "failed", src, returncode=res.returncode,
+                               **{k: v for k, v in last.items() if k != "done"})
+        if writer:
+            self._post(self.log, f"{writer.frames} frames → {dst}\\n")
+        if res.ok:
+            self._post(self.log, f"✓ Done. {fmt_metrics(last)}\\n")
+            self.secs_done[src] = dur
+        else:
+            self.secs_done.pop(src, None)
+            self._post(self.log, "\n".join(res.stderr_tail) + "\n")
+            self._post(self.log, f"✗ FAILED (rc={res.returncode}).\\n")
 
-            proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, universal_newlines=True)
-            err_buf = []
-            while True:
-                if self.stop_flag.is_set():
-                    try: proc.kill()
-                    except: pass
-                    return
-                line = proc.stderr.readline()
-                if not line:
-                    if proc.poll() is not None: break
-                    time.sleep(0.01); continue
-                err_buf.append(line)
-                tc = parse_timecode(line)
-                if tc is not None and dur>0:
-                    last_tc = max(last_tc, tc)
-                    elapsed = time.time()-start
-                    pct = min(100.0, (last_tc/dur)*100.0)
-                    if elapsed>0:
-                        sp = last_tc/elapsed
-                        speeds.append(sp)
-                        if len(speeds)>N: speeds.pop(0)
-                        avg = sum(speeds)/len(speeds)
-                        eta = (dur-last_tc)/avg if avg>0 else None
-                    else:
-                        eta = None
-                    self.progress(idx, total_files, src, last_tc, dur, pct, eta, done_secs + last_tc)
-
-            rc = proc.poll()
-            if rc == 0:
-                self.log("✓ Done.\\n")
-                done_secs += dur or 0.0
-            else:
-                self.log("".join(err_buf) + "\\n")
-                self.log(f"✗ FAILED (rc={rc}).\\n")
+        self._advance()
 
-            # update overall bar
-            if total_secs>0:
-                pct = (done_secs/total_secs)*100.0
-                self.overall(done_secs, total_secs, pct)
-            else:
-                pct = (idx/total_files)*100.0
-                self.overall(idx, total_files, pct)
+    def _advance(self):
+        # update overall bar
+        total_files = len(self.files)
+        self.files_done += 1
+        if self.total_secs>0:
+            done_secs = sum(self.secs_done.values())
+            self._post(self.overall, done_secs, self.total_secs, (done_secs/self.total_secs)*100.0)
+        else:
+            self._post(self.overall, self.files_done, total_files, (self.files_done/total_files)*100.0)
 
 # ---------------------- GUI ----------------------
 
@@ -314,7 +493,12 @@ class App(tk.Tk):
         self.crf_var = tk.StringVar(value="18")      # CPU
         self.x_preset_var = tk.StringVar(value="medium")
 
-        self.stop_flag = threading.Event()
+        # Concurrency: every job shares one event-loop thread
+        self.jobs_var = tk.StringVar(value="1")
+        self.engine = JobEngine(max_jobs=32)
+        self.ui = TkDispatcher(self)
+        self.job_log = JobLog.for_tool("Video16FPS_Converter")  # ~/.cache/deadlymusubi/logs/*.jsonl
+        self.worker = None
 
         self._build_ui()
         self._log("Ready.\\n")
@@ -353,7 +537,7 @@ class App(tk.Tk):
 
         ttk.Label(opts, text="Encoder:").grid(row=0, column=c, sticky="e"); c+=1
         enc = ttk.Combobox(opts, textvariable=self.encoder_var, state="readonly",
-                           values=["auto","h264_nvenc","hevc_nvenc","libx264","libx265"], width=12)
+                           values=["auto","h264_nvenc","hevc_nvenc","libx264","libx265"] + list(TRAIN_PROFILES), width=12)
         enc.grid(row=0, column=c, sticky="w", padx=6); c+=1
 
         ttk.Checkbutton(opts, text="Prefer HEVC Main10 for >8-bit (Auto)", variable=self.prefer_hevc10).grid(row=0, column=c, sticky="w", padx=12); c+=1
@@ -390,6 +574,8 @@ class App(tk.Tk):
         ttk.Combobox(opts, textvariable=self.x_preset_var, state="readonly",
                      values=["ultrafast","superfast","veryfast","faster","fast","medium","slow","slower","veryslow"], width=10)\
             .grid(row=row2, column=c, sticky="w", padx=6); c+=1
+        ttk.Label(opts, text="Parallel jobs:").grid(row=row2, column=c, sticky="e"); c+=1
+        ttk.Spinbox(opts, from_=1, to=32, textvariable=self.jobs_var, width=5).grid(row=row2, column=c, sticky="w", padx=6); c+=1
 
         # Progress
         prog = ttk.Frame(main); prog.grid(row=3, column=0, columnspan=2, sticky="ew", padx=8, pady=6)
@@ -457,17 +643,21 @@ class App(tk.Tk):
     def _log(self, msg):
         self.logbox.insert("end", msg)
         self.logbox.see("end")
-        self.update_idletasks()
 
-    def _progress(self, idx, total, src, tc, dur, pct, eta, overall_secs_done):
+    def _progress(self, idx, total, src, tc, dur, pct, eta, metrics):
         self.file_prog["value"] = pct
         left = fmt_hms(eta) if eta is not None else "—"
-        self.status.config(text=f"[{idx}/{total}] {os.path.basename(src)}  |  {tc:.1f}/{dur:.1f}s  |  {pct:.1f}%  |  ETA {left}")
-        self.update_idletasks()
+        self.status.config(text=f"[{idx}/{total}] {os.path.basename(src)}  |  {tc:.1f}/{dur:.1f}s  |  {pct:.1f}%  |  "
+                                f"{fmt_metrics(metrics)}  |  ETA {left}")
 
     def _overall(self, done, total, pct):
         self.all_prog["value"] = pct
-        self.update_idletasks()
+
+    def _finished(self):
+        self.worker = None
+        self.start_btn.config(state="normal")
+        self.stop_btn.config(state="disabled")
+        self._log("\\nFinished.\\n")
 
     def start(self):
         if not self.files:
@@ -478,6 +668,11 @@ class App(tk.Tk):
             if fps <= 0: raise ValueError
         except:
             messagebox.showerror("FPS","Enter a positive FPS (e.g., 16)."); return
+        try:
+            jobs = int(self.jobs_var.get())
+            if jobs <= 0: raise ValueError
+        except:
+            messagebox.showerror("Jobs","Enter a positive number of parallel jobs."); return
 
         # GPU index from combo or entry
         if hasattr(self, "gpu_combo") and isinstance(self.gpu_combo, ttk.Combobox) and self.gpu_combo.get():
@@ -501,15 +696,16 @@ class App(tk.Tk):
 
         self.start_btn.config(state="disabled")
         self.stop_btn.config(state="normal")
-        self.stop_flag = threading.Event()
         self._log("\\nStarting…\\n")
 
-        self.worker = Worker(self.files, self.out_dir, builder, self.ffprobe, self._log, self._progress, self._overall, self.stop_flag)
+        self.worker = Worker(self.engine, self.ui, self.files, self.out_dir, builder, self.ffprobe,
+                             self._log, self._progress, self._overall, self._finished, jobs=jobs,
+                             job_log=self.job_log)
         self.worker.start()
 
     def stop(self):
-        if hasattr(self, "worker"):
-            self.stop_flag.set()
+        if self.worker:
+            self.worker.stop()
             self._log("\\nStopping…\\n")
 
     def run(self):
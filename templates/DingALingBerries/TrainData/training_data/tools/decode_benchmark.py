@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# decode_benchmark.py — frame-extraction throughput for each converter output profile.
+# Latent caching time is dominated by decoding the dataset clips, so this encodes one source
+# clip with every profile from Video16FPS_Converter and times how fast frames come back out.
+#
+# Usage:
+#   python decode_benchmark.py <clip> [--fps 16] [--threads 1] [--profiles libx264 train_intra ...] [--keep]
+#
+# --threads 1 approximates one dataloader worker; raise it to see multi-threaded decode.
+# Requirements: ffmpeg + ffprobe on PATH, numpy + pillow.
+
+import os
+import sys
+import glob
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+from PIL import Image
+
+from Video16FPS_Converter import (BuildCmdError, CmdBuilder, NpyFrameWriter, TRAIN_PROFILES,
+                                  get_video_stream_info, safe_out_path)
+
+DEFAULT_PROFILES = ["libx264"] + list(TRAIN_PROFILES)
+
+# ---------------------- DECODERS ----------------------
+
+def decode_video(ffmpeg, path, threads):
+    """
+    Decode every frame to rgb24 through a pipe, the way a loader would see them.
+    """
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-threads", str(threads),
+           "-i", path, "-f", "rawvideo", "-pix_fmt", "rgb24", "pipe:1"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    buf = bytearray(1 << 22)
+    total = 0
+    while True:
+        n = proc.stdout.readinto(buf)
+        if not n: break
+        total += n
+    proc.wait()
+    return total
+
+def decode_png_seq(folder):
+    total = 0
+    for p in sorted(glob.glob(os.path.join(folder, "*.png"))):
+        with Image.open(p) as im:
+            total += np.asarray(im.convert("RGB")).nbytes
+    return total
+
+def decode_npy(path):
+    arr = np.load(path, mmap_mode="r")
+    total = 0
+    for frame in arr:
+        total += np.array(frame).nbytes
+    return total
+
+def output_size(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(p) for p in glob.glob(os.path.join(path, "*")))
+    return os.path.getsize(path)
+
+# ---------------------- BENCHMARK ----------------------
+
+def encode(builder, src, dst, vinfo):
+    cmd = builder.build(src, dst, vinfo)
+    cmd[3:3] = ["-loglevel", "error"]
+    if builder.encoder == "png_seq":
+        os.makedirs(dst, exist_ok=True)
+    if builder.encoder == "npy":
+        writer = NpyFrameWriter(dst, vinfo["height"], vinfo["width"])
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        writer.pump(proc.stdout)
+        err = proc.stderr.read()
+        rc = proc.wait()
+    else:
+        p = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        rc, err = p.returncode, p.stderr
+    if rc != 0:
+        raise RuntimeError(err.decode("utf-8", "replace")[-1000:])
+
+def bench_profile(args, src, vinfo, profile, work_dir):
+    builder = CmdBuilder(ffmpeg=args.ffmpeg, ffprobe=args.ffprobe, fps=args.fps, encoder=profile,
+                         use_hwdecode=False, crf=args.crf, x_preset=args.preset)
+    dst = safe_out_path(src, work_dir, args.fps, profile)
+    if profile not in TRAIN_PROFILES:
+        dst = os.path.splitext(dst)[0] + f"_{profile}.mp4"
+
+    t0 = time.perf_counter()
+    encode(builder, src, dst, vinfo)
+    enc_secs = time.perf_counter() - t0
+
+    frame_bytes = vinfo["width"] * vinfo["height"] * 3
+    best = None
+    for _ in range(args.repeat):
+        t0 = time.perf_counter()
+        if profile == "png_seq":
+            total = decode_png_seq(dst)
+        elif profile == "npy":
+            total = decode_npy(dst)
+        else:
+            total = decode_video(args.ffmpeg, dst, args.threads)
+        secs = time.perf_counter() - t0
+        best = secs if best is None else min(best, secs)
+    frames = total // frame_bytes
+    return {
+        "profile": profile,
+        "frames": frames,
+        "decode_fps": frames / best if best else 0.0,
+        "encode_secs": enc_secs,
+        "size_mb": output_size(dst) / (1024 * 1024),
+    }
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark frame extraction per output profile.")
+    ap.add_argument("clip")
+    ap.add_argument("--fps", type=int, default=16)
+    ap.add_argument("--threads", type=int, default=1, help="ffmpeg decode threads")
+    ap.add_argument("--profiles", nargs="+", default=DEFAULT_PROFILES)
+    ap.add_argument("--crf", default="18")
+    ap.add_argument("--preset", default="medium")
+    ap.add_argument("--repeat", type=int, default=3, help="decode runs per profile (best is kept)")
+    ap.add_argument("--keep", action="store_true", help="keep the encoded outputs")
+    ap.add_argument("--ffmpeg", default="ffmpeg")
+    ap.add_argument("--ffprobe", default="ffprobe")
+    args = ap.parse_args()
+
+    vinfo = get_video_stream_info(args.ffprobe, args.clip)
+    if not vinfo.get("width") or not vinfo.get("height"):
+        print(f"❌ ffprobe could not read {args.clip}")
+        return 1
+
+    work_dir = tempfile.mkdtemp(prefix="decode_bench_")
+    rows = []
+    try:
+        for profile in args.profiles:
+            try:
+                row = bench_profile(args, args.clip, vinfo, profile, work_dir)
+            except (RuntimeError, BuildCmdError) as e:
+                print(f"❌ {profile}: {e}")
+                continue
+            rows.append(row)
+            print(f"  {profile:<12} {row['frames']:>6} frames  {row['decode_fps']:>9.1f} fps")
+    finally:
+        if args.keep:
+            print(f"Outputs kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if not rows:
+        return 1
+    base = rows[0]["decode_fps"] or 1.0
+    print()
+    print(f"{'profile':<12} {'frames':>7} {'decode fps':>11} {'x first':>8} {'size MB':>9} {'encode s':>9}")
+    for r in rows:
+        print(f"{r['profile']:<12} {r['frames']:>7} {r['decode_fps']:>11.1f} {r['decode_fps'] / base:>8.2f}"
+              f" {r['size_mb']:>9.1f} {r['encode_secs']:>9.1f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
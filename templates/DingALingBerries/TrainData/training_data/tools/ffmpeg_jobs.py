@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# ffmpeg_jobs.py — one asyncio event loop that runs every ffmpeg/ffprobe child for the GUIs.
+# - JobEngine owns a single background thread with an event loop; any number of encodes
+#   share it (no polling thread or blocking reader thread per process).
+# - run_process() spawns, reads stdout/stderr without blocking, feeds stdin from a frame
+#   source, enforces timeouts, and kills the child if its task is cancelled.
+# - on_progress: run_process() adds ffmpeg's -progress key=value stream and hands parsed
+#   metrics (frames, fps, speed, out_time, total_size) to the caller instead of regex-scanning
+#   the human-readable stats line.
+# - TkDispatcher hands callbacks back to the Tk main loop, so worker code never touches widgets;
+#   post_latest() coalesces progress so the UI refreshes at a fixed rate however many jobs run.
+# - JobLog appends per-job metrics as JSON lines (throttled), for batch post-mortems.
+#
+# Typical use from a GUI:
+#   engine = JobEngine(max_jobs=4)
+#   ui = TkDispatcher(root)
+#   fut = engine.submit(my_batch_coroutine())   # concurrent.futures.Future
+#   fut.cancel()                                # stop: kills the running children
+
+import re
+import json
+import time
+import asyncio
+import threading
+import subprocess
+import queue as queue_module
+from pathlib import Path
+
+STDERR_TAIL = 50  # lines of stderr kept for error reports
+LOG_DIR = Path.home() / ".cache" / "deadlymusubi" / "logs"
+
+class JobTimeout(Exception): pass
+
+class ProcessResult:
+    def __init__(self, returncode, stdout, stderr_tail, timed_out=False):
+        self.returncode = returncode
+        self.stdout = stdout            # bytes if capture_stdout, else None
+        self.stderr_tail = stderr_tail  # last STDERR_TAIL stderr lines
+        self.timed_out = timed_out
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out
+
+# ---------------------- PROGRESS ----------------------
+
+PROGRESS_LINE_RE = re.compile(
+    r"^(frame|fps|stream_\d+_\d+_\w+|bitrate|total_size|out_time\w*|dup_frames|drop_frames|speed|progress)=(.*)$")
+
+def with_progress(cmd, pipe="pipe:1"):
+    """
+    Insert ffmpeg's machine-readable progress output (global options go first).
+    pipe:1 when stdout is free, pipe:2 when stdout carries data (rawvideo, npy).
+    """
+    return [cmd[0], "-progress", pipe, "-nostats", *cmd[1:]]
+
+def _num(value, cast=float):
+    try:
+        return cast(value.rstrip("x").strip())
+    except (AttributeError, ValueError):
+        return None  # "N/A" until ffmpeg knows
+
+class ProgressParser:
+    """
+    Collects -progress key=value lines; feed() returns a metrics dict at the end of each
+    block (progress=continue / progress=end), otherwise None.
+    """
+    def __init__(self):
+        self._block = {}
+
+    @staticmethod
+    def is_progress_line(line):
+        return PROGRESS_LINE_RE.match(line) is not None
+
+    def feed(self, line):
+        m = PROGRESS_LINE_RE.match(line.strip())
+        if not m: return None
+        key, value = m.groups()
+        if key != "progress":
+            self._block[key] = value
+            return None
+        block, self._block = self._block, {}
+        out_us = _num(block.get("out_time_us"), int)
+        if out_us is None:
+            out_us = _num(block.get("out_time_ms"), int)  # also microseconds, despite the name
+        return {
+            "frames": _num(block.get("frame"), int),
+            "fps": _num(block.get("fps")),
+            "speed": _num(block.get("speed")),
+            "out_time": max(0.0, out_us / 1e6) if out_us is not None else None,
+            "total_size": _num(block.get("total_size"), int),
+            "bitrate": (block.get("bitrate") or "").strip() or None,
+            "done": value.strip() == "end",
+        }
+
+# ---------------------- ENGINE ----------------------
+
+class JobEngine:
+    def __init__(self, max_jobs=1):
+        self.loop = asyncio.new_event_loop()
+        self.max_jobs = max(1, int(max_jobs))
+        self._sem = None
+        self._futures = set()
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="ffmpeg-jobs", daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self._sem = asyncio.Semaphore(self.max_jobs)
+        self.loop.call_soon(self._ready.set)
+        self.loop.run_forever()
+
+    # ---- thread-safe API (call from any thread) ----
+
+    def submit(self, coro):
+        """
+        Schedule a coroutine on the engine loop; returns a concurrent.futures.Future.
+        Cancelling the future cancels the coroutine and kills its children.
+        """
+        fut = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        self._futures.add(fut)
+        fut.add_done_callback(self._futures.discard)
+        return fut
+
+    def set_max_jobs(self, n):
+        """
+        Change the concurrent-process limit; takes effect for processes not yet waiting.
+        """
+        n = max(1, int(n))
+        def apply():
+            self.max_jobs = n
+            self._sem = asyncio.Semaphore(n)
+        self.loop.call_soon_threadsafe(apply)
+
+    def cancel_all(self):
+        for fut in list(self._futures):
+            fut.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    # ---- coroutines (await from code running on the engine loop) ----
+
+    async def run_process(self, cmd, on_stdout_line=None, on_stderr_line=None, stdout_sink=None,
+                          stdin_source=None, capture_stdout=False, timeout=None, on_progress=None):
+        """
+        Run one child process under the engine's concurrency limit.
+          on_stdout_line / on_stderr_line(str): called per decoded line (on the loop thread)
+          stdout_sink(bytes): raw stdout chunks instead of lines (e.g. rawvideo frames)
+          stdin_source: object with .frames() yielding bytes-like frames, streamed to stdin
+                        (each is written before the next is requested, so one buffer may be reused)
+          capture_stdout: collect all stdout into ProcessResult.stdout
+          timeout: seconds before the child is killed (ProcessResult.timed_out)
+          on_progress(dict): ffmpeg only; adds -progress and gets ProgressParser metrics
+        """
+        parser = None
+        progress_on_stderr = False
+        if on_progress is not None:
+            parser = ProgressParser()
+            progress_on_stderr = stdout_sink is not None or capture_stdout
+            cmd = with_progress(cmd, "pipe:2" if progress_on_stderr else "pipe:1")
+
+        def progress_line(line):
+            metrics = parser.feed(line)
+            if metrics is not None: on_progress(metrics)
+
+        sem = self._sem
+        async with sem:
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd,
+                    stdin=subprocess.PIPE if stdin_source is not None else subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                )
+            except FileNotFoundError:
+                raise RuntimeError(
+                    f"Could not find command: {cmd[0]}\n"
+                    "Make sure ffmpeg/ffprobe are installed and on your PATH."
+                )
+
+            tail = []
+            out_chunks = [] if capture_stdout else None
+
+            async def read_stdout():
+                if stdout_sink is not None or capture_stdout:
+                    while True:
+                        chunk = await proc.stdout.read(1 << 20)
+                        if not chunk: break
+                        if stdout_sink is not None: stdout_sink(chunk)
+                        else: out_chunks.append(chunk)
+                else:
+                    async for raw in proc.stdout:
+                        line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                        if parser is not None and not progress_on_stderr:
+                            progress_line(line)
+                        elif on_stdout_line is not None:
+                            on_stdout_line(line)
+
+            async def read_stderr():
+                # ffmpeg ends its stats lines with \r; treat both as line breaks
+                buf = b""
+                while True:
+                    chunk = await proc.stderr.read(65536)
+                    if not chunk: break
+                    buf += chunk.replace(b"\r", b"\n")
+                    *lines, buf = buf.split(b"\n")
+                    for raw in lines:
+                        if not raw: continue
+                        line = raw.decode("utf-8", "replace")
+                        if progress_on_stderr and parser.is_progress_line(line):
+                            progress_line(line)
+                            continue
+                        tail.append(line)
+                        if len(tail) > STDERR_TAIL: del tail[0]
+                        if on_stderr_line is not None: on_stderr_line(line)
+                if buf:
+                    line = buf.decode("utf-8", "replace")
+                    if progress_on_stderr and parser.is_progress_line(line):
+                        progress_line(line)
+                        return
+                    tail.append(line)
+                    if on_stderr_line is not None: on_stderr_line(line)
+
+            async def feed_stdin():
+                it = iter(stdin_source.frames())
+                try:
+                    while True:
+                        data = await self.loop.run_in_executor(None, next, it, None)
+                        if data is None: break
+                        proc.stdin.write(data)
+                        await proc.stdin.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    try: proc.stdin.close()
+                    except Exception: pass
+
+            tasks = [asyncio.ensure_future(read_stdout()), asyncio.ensure_future(read_stderr())]
+            if stdin_source is not None:
+                tasks.append(asyncio.ensure_future(feed_stdin()))
+
+            timed_out = False
+            try:
+                await asyncio.wait_for(asyncio.gather(*tasks, proc.wait()), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                await self._kill(proc, tasks)
+            except BaseException:
+                # cancelled, or a sink / stdin source raised: never leave ffmpeg or its readers behind
+                await self._kill(proc, tasks)
+                raise
+
+            stdout = b"".join(out_chunks) if capture_stdout else None
+            return ProcessResult(proc.returncode, stdout, tail, timed_out)
+
+    async def run_capture(self, cmd, timeout=60):
+        """
+        Run a short command (ffprobe, nvidia-smi) and return ProcessResult with stdout bytes.
+        """
+        return await self.run_process(cmd, capture_stdout=True, timeout=timeout)
+
+    @staticmethod
+    async def _kill(proc, tasks):
+        if proc.returncode is None:
+            try: proc.kill()
+            except ProcessLookupError: pass
+        for t in tasks:
+            t.cancel()
+        try:
+            await asyncio.wait_for(proc.wait(), 10)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            pass
+
+# ---------------------- JSON LOG ----------------------
+
+class JobLog:
+    """
+    Appends one JSON object per line: {"t", "event", "job", ...metrics}.
+    progress() writes at most every `interval` seconds per job (always the final block).
+    """
+    def __init__(self, path, interval=2.0):
+        self.path = Path(path)
+        self.interval = interval
+        self._last = {}
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, "a", encoding="utf-8", buffering=1)
+
+    @classmethod
+    def for_tool(cls, tool, **kw):
+        return cls(LOG_DIR / f"{tool}.jsonl", **kw)
+
+    def write(self, event, job, **fields):
+        rec = {"t": round(time.time(), 3), "event": event, "job": job, **fields}
+        with self._lock:
+            self._f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+
+    def progress(self, job, metrics):
+        now = time.monotonic()
+        if not metrics.get("done") and now - self._last.get(job, 0.0) < self.interval:
+            return
+        self._last[job] = now
+        self.write("progress", job, **metrics)
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+# ---------------------- TK HANDOFF ----------------------
+
+class TkDispatcher:
+    """
+    Thread-safe handoff to the Tk main loop: post(fn, *args) from anywhere,
+    fn runs on the UI thread at the next pump (every interval_ms).
+    post_latest(key, fn, *args) keeps only the newest call per key between pumps,
+    so progress from any number of jobs costs at most one update per key per pump.
+    """
+    def __init__(self, root, interval_ms=50):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._q = queue_module.SimpleQueue()
+        self._latest = {}
+        self._latest_lock = threading.Lock()
+        self.root.after(self.interval_ms, self._pump)
+
+    def post(self, fn, *args):
+        self._q.put((fn, args))
+
+    def post_latest(self, key, fn, *args):
+        with self._latest_lock:
+            self._latest[key] = (fn, args)
+
+    @staticmethod
+    def _call(fn, args):
+        try:
+            fn(*args)
+        except Exception as e:
+            print(f"UI callback failed: {e}")
+
+    def _pump(self):
+        # coalesced progress first, so a queued "finished" callback always lands last
+        with self._latest_lock:
+            latest, self._latest = self._latest, {}
+        for fn, args in latest.values():
+            self._call(fn, args)
+        try:
+            while True:
+                fn, args = self._q.get_nowait()
+                self._call(fn, args)
+        except queue_module.Empty:
+            pass
+        self.root.after(self.interval_ms, self._pump)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# fp8_quantize.py — write scaled FP8 copies of the Wan DiTs (and a T5 encoder) once, on CPU.
+# - Same scheme as musubi's --fp8_scaled: every targeted Linear weight W becomes
+#   float8_e4m3fn(W / s) with a per-tensor scale s = max|W| / 448, stored next to it as
+#   <module>.scale_weight (float32, shape [1]); W ~= fp8 * s. Everything else keeps its dtype.
+# - Targets follow musubi's key lists: --preset wan quantizes "blocks" weights except norms,
+#   embeddings, modulation and the head; --preset t5 quantizes the encoder's Linear weights.
+#   --target-keys / --exclude-keys (comma-separated substrings) override them.
+# - Streams: the input is memory-mapped (safetensors_io.TensorFile); each tensor is read twice in
+#   CHUNK_ELEMS slices (max |W|, then encode) and written in order (SafetensorsWriter), --workers
+#   tensors in parallel. Peak memory is --workers fp8 tensors (at most ~READ_AHEAD_BYTES), not the model.
+# - The scheme (format, scaling, max value, scale key, key lists, source file) is stored in the
+#   output's metadata as fp8_scheme (JSON).
+# - T5: needs a .safetensors copy of the encoder; the .pth that musubi uses can't be read without torch.
+#
+# Usage:
+#   python fp8_quantize.py model.safetensors... [--preset wan|t5] [--target-keys a,b] [--exclude-keys c,d]
+#                          [--out-dir DIR] [--workers N]
+#   (output: <name>_fp8_e4m3fn_scaled.safetensors)
+
+import os
+import sys
+import json
+import math
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lora_epoch_stats import CHUNK_ELEMS
+from safetensors_hash import drop_hashes
+from safetensors_io import E4M3_MAX, SafetensorsWriter, TensorFile, to_e4m3, to_float32
+
+PRESETS = {
+    # musubi wan: target_layer_keys / exclude_layer_keys of optimize_state_dict_with_fp8
+    "wan": (["blocks"], ["norm", "patch_embedding", "text_embedding", "time_embedding", "time_projection",
+                         "head", "modulation", "img_emb"]),
+    "t5": (["block", "blocks"], ["norm", "embedding", "shared", "relative_attention_bias"]),
+}
+SOURCE_DTYPES = {"F16", "BF16", "F32"}
+SUFFIX = "_fp8_e4m3fn_scaled"
+DEFAULT_WORKERS = 2          # tensors quantized ahead of the writer; each already streams its chunks
+READ_AHEAD_BYTES = 1 << 30   # fp8 output held in memory while it waits for the writer
+
+# ---------------------- SELECTION ----------------------
+
+def is_target(tf, name, target_keys, exclude_keys):
+    if not name.endswith(".weight") or len(tf.shape(name)) != 2 or tf.dtype(name) not in SOURCE_DTYPES:
+        return False
+    if target_keys and not any(k in name for k in target_keys):
+        return False
+    return not any(k in name for k in exclude_keys)
+
+def scale_name(name):
+    return name[:-len(".weight")] + ".scale_weight"
+
+# ---------------------- QUANTIZATION ----------------------
+
+def _slices(tf, name):
+    raw = tf.raw(name).reshape(-1)
+    dtype = tf.dtype(name)
+    for i in range(0, raw.size, CHUNK_ELEMS):
+        yield to_float32(raw[i:i + CHUNK_ELEMS], dtype)
+
+def quantize_tensor(tf, name):
+    """
+    (fp8 chunks, scale) of one weight; two streamed passes over its bytes.
+    """
+    amax = max((float(np.abs(x).max()) for x in _slices(tf, name) if x.size), default=0.0)
+    scale = np.float32(amax / E4M3_MAX if amax > 0 else 1.0)
+    chunks = [to_e4m3(x / scale) for x in _slices(tf, name)]
+    return chunks, scale
+
+def quantize_file(path, out_path, target_keys, exclude_keys, workers=DEFAULT_WORKERS, log=print):
+    """
+    Writes the scaled fp8 copy; returns (quantized count, bytes before, bytes after).
+    """
+    with TensorFile(path) as tf:
+        if any(n.endswith(".scale_weight") for n in tf.keys()):
+            raise ValueError(f"{os.path.basename(path)} already has scale_weight tensors; is it quantized?")
+        targets = [n for n in tf.keys() if is_target(tf, n, target_keys, exclude_keys)]
+        if not targets:
+            raise ValueError(f"{os.path.basename(path)}: no weights match the target keys")
+        specs = {}
+        for name in tf.keys():
+            if name in targets:
+                specs[name] = ("F8_E4M3", tf.shape(name))
+                specs[scale_name(name)] = ("F32", (1,))
+            else:
+                specs[name] = (tf.dtype(name), tf.shape(name))
+
+        metadata = drop_hashes(tf.metadata)
+        metadata["fp8_scheme"] = json.dumps({
+            "format": "float8_e4m3fn", "scaling": "per_tensor_absmax", "max_value": E4M3_MAX,
+            "scale_key": "<module>.scale_weight", "scale_dtype": "float32", "dequant": "weight * scale_weight",
+            "target_keys": target_keys, "exclude_keys": exclude_keys, "source": os.path.basename(path),
+        })
+
+        window = max(1, workers)
+        with ThreadPoolExecutor(window) as pool, SafetensorsWriter(out_path, specs, metadata) as w:
+            queued, pending = iter(targets), {}
+
+            def fill():
+                # bounded by count and by bytes: one Wan DiT weight is ~70 MB of fp8
+                while len(pending) < window and (not pending or
+                                                 sum(math.prod(tf.shape(n)) for n in pending) < READ_AHEAD_BYTES):
+                    n = next(queued, None)
+                    if n is None:
+                        return
+                    pending[n] = pool.submit(quantize_tensor, tf, n)
+
+            fill()
+            for i, name in enumerate(tf.keys(), 1):
+                if name not in pending:
+                    w.write(name, tf.raw(name))
+                    continue
+                chunks, scale = pending.pop(name).result()
+                fill()
+                for c in chunks[:-1]:
+                    w.write(name, c, partial=True)
+                w.write(name, chunks[-1])
+                w.write(scale_name(name), np.array([scale], np.float32))
+                if i % 50 == 0:
+                    log(f"   {i}/{len(tf.header)} tensors")
+        before = tf.header.file_size
+    return len(targets), before, os.path.getsize(out_path)
+
+# ---------------------- CLI ----------------------
+
+def split_keys(text):
+    return [k.strip() for k in text.split(",") if k.strip()] if text is not None else None
+
+def main():
+    ap = argparse.ArgumentParser(description="Write pre-scaled FP8 (e4m3fn) copies of DiT / T5 safetensors.")
+    ap.add_argument("inputs", nargs="*", help=".safetensors models")
+    ap.add_argument("--preset", choices=list(PRESETS), default="wan", help="default key lists (default: wan)")
+    ap.add_argument("--target-keys", help="only quantize weights whose name contains one of these")
+    ap.add_argument("--exclude-keys", help="never quantize weights whose name contains one of these")
+    ap.add_argument("--out-dir", help="output folder (default: next to each input)")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="tensors quantized in parallel")
+    args = ap.parse_args()
+
+    paths = args.inputs
+    if not paths:
+        from tkinter import filedialog, Tk
+        root = Tk()
+        root.withdraw()
+        paths = list(filedialog.askopenfilenames(title="Select Models to Quantize",
+                                                 filetypes=[("SafeTensor files", "*.safetensors")]))
+    paths = [p for p in paths if os.path.isfile(p)]
+    if not paths:
+        print("❌ No valid file selected.")
+        return 1
+    target_keys, exclude_keys = PRESETS[args.preset]
+    target_keys = split_keys(args.target_keys) if args.target_keys is not None else target_keys
+    exclude_keys = split_keys(args.exclude_keys) if args.exclude_keys is not None else exclude_keys
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    for path in paths:
+        out_dir = args.out_dir or os.path.dirname(os.path.abspath(path))
+        out = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + SUFFIX + ".safetensors")
+        print(f"{os.path.basename(path)}")
+        try:
+            count, before, after = quantize_file(path, out, target_keys, exclude_keys, args.workers)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return 1
+        print(f"✔️ {out}\n   {count} weight(s) quantized, {before / 1e9:.2f} GB -> {after / 1e9:.2f} GB")
+
+if __name__ == "__main__":
+    sys.exit(main())
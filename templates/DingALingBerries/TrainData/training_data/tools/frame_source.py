@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# frame_source.py — streaming frame source for animated WebP / GIF, shared by the video tools.
+# ffmpeg's webp demuxer can't read animated WebP, and loading every frame into a list
+# (list(iio.imiter(...))) grows memory with the animation length. This decodes one frame
+# at a time with Pillow and pipes raw rgb24 into ffmpeg's stdin instead.
+#
+# - Frame timing comes from the container headers (WebP ANMF / GIF graphic control blocks),
+#   so probing never decodes pixels.
+# - Variable frame delays are resampled to a constant input rate by repeating frames.
+# - Memory stays at about one decoded frame plus one pipe buffer, however long the animation:
+#   every frame is copied into the same preallocated rgb24 buffer, which frames() yields views of.
+
+import os
+import math
+import struct
+import threading
+
+import numpy as np
+from PIL import Image, ImageSequence
+
+ANIMATED_EXTS = {".webp", ".gif"}
+
+DEFAULT_DELAY_MS = 100  # browsers treat 0/missing GIF delays as 100 ms
+MAX_RATE = 60.0
+
+# ---------------------- HEADER SCANNING ----------------------
+
+def _webp_frame_info(f):
+    """
+    Walk RIFF chunks. Returns (width, height, [delay_ms, ...]); one entry per ANMF chunk.
+    """
+    hdr = f.read(12)
+    if len(hdr) < 12 or hdr[:4] != b"RIFF" or hdr[8:12] != b"WEBP":
+        return None
+    width = height = None
+    delays = []
+    while True:
+        ch = f.read(8)
+        if len(ch) < 8:
+            break
+        fourcc, size = ch[:4], struct.unpack("<I", ch[4:])[0]
+        padded = size + (size & 1)
+        if fourcc == b"VP8X":
+            data = f.read(10)
+            width = 1 + int.from_bytes(data[4:7], "little")
+            height = 1 + int.from_bytes(data[7:10], "little")
+            f.seek(padded - 10, os.SEEK_CUR)
+        elif fourcc == b"ANMF":
+            data = f.read(16)
+            delays.append(int.from_bytes(data[12:15], "little"))
+            f.seek(padded - 16, os.SEEK_CUR)
+        else:
+            f.seek(padded, os.SEEK_CUR)
+    return width, height, delays
+
+def _gif_skip_sub_blocks(f):
+    while True:
+        n = f.read(1)
+        if not n or n[0] == 0:
+            return
+        f.seek(n[0], os.SEEK_CUR)
+
+def _gif_frame_info(f):
+    """
+    Walk GIF blocks without LZW decoding. Returns (width, height, [delay_ms, ...]).
+    """
+    hdr = f.read(13)
+    if len(hdr) < 13 or hdr[:3] != b"GIF":
+        return None
+    width, height, packed = struct.unpack("<HHB", hdr[6:11])
+    if packed & 0x80:
+        f.seek(3 * (2 << (packed & 7)), os.SEEK_CUR)
+    delays = []
+    pending = None
+    while True:
+        b = f.read(1)
+        if not b or b == b"\x3b":
+            break
+        if b == b"\x21":
+            label = f.read(1)
+            if label == b"\xf9":
+                block = f.read(5)  # size(4), packed, delay lo/hi, transparent index
+                pending = struct.unpack("<H", block[2:4])[0] * 10
+            _gif_skip_sub_blocks(f)
+        elif b == b"\x2c":
+            desc = f.read(9)
+            if desc[8] & 0x80:
+                f.seek(3 * (2 << (desc[8] & 7)), os.SEEK_CUR)
+            f.read(1)  # LZW minimum code size
+            _gif_skip_sub_blocks(f)
+            delays.append(pending if pending is not None else 0)
+            pending = None
+        else:
+            break
+    return width, height, delays
+
+def scan_frames(path):
+    """
+    (width, height, [delay_ms per frame]) from the container headers, or None.
+    """
+    with open(path, "rb") as f:
+        ext = os.path.splitext(path)[1].lower()
+        info = _webp_frame_info(f) if ext == ".webp" else _gif_frame_info(f)
+    if not info or info[0] is None:
+        return None
+    return info
+
+def is_animated_image(path):
+    if os.path.splitext(path)[1].lower() not in ANIMATED_EXTS:
+        return False
+    try:
+        info = scan_frames(path)
+    except OSError:
+        return False
+    return bool(info) and len(info[2]) > 1
+
+# ---------------------- FRAME SOURCE ----------------------
+
+class AnimatedFrameSource:
+    """
+    Frame-by-frame rgb24 reader for an animated WebP or GIF.
+      src = AnimatedFrameSource(path)
+      cmd = [ffmpeg, *src.input_args(), ...]
+    rate=None keeps the native timing (1000 / gcd of the frame delays, capped at MAX_RATE).
+    """
+    def __init__(self, path, rate=None):
+        self.path = path
+        info = scan_frames(path)
+        if not info:
+            with Image.open(path) as im:
+                info = (im.width, im.height, [im.info.get("duration", 0)] * getattr(im, "n_frames", 1))
+        self.width, self.height, delays = info
+        self.delays = [d if d and d > 10 else DEFAULT_DELAY_MS for d in delays] or [DEFAULT_DELAY_MS]
+        self.rate = float(rate) if rate else self.native_rate()
+
+    def native_rate(self):
+        g = 0
+        for d in self.delays:
+            g = math.gcd(g, int(d))
+        return min(MAX_RATE, 1000.0 / g) if g else 1000.0 / DEFAULT_DELAY_MS
+
+    @property
+    def duration(self):
+        return sum(self.delays) / 1000.0
+
+    @property
+    def frame_bytes(self):
+        return self.width * self.height * 3
+
+    def probe(self):
+        """
+        Same shape as the ffprobe-derived info dicts used by the GUIs.
+        """
+        return {"type": "video", "duration": self.duration, "width": self.width, "height": self.height,
+                "fps": self.rate, "audio_bps": 0, "bit_depth": 8, "pix_fmt": "rgb24"}
+
+    def input_args(self):
+        return ["-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{self.width}x{self.height}",
+                "-framerate", f"{self.rate:g}", "-i", "pipe:0"]
+
+    def frames(self):
+        """
+        Yield one rgb24 frame per output tick as a memoryview of a single preallocated buffer.
+        The view is only valid until the next frame is requested: write (or copy) it first.
+        A frame is decoded once and the same view is re-yielded while its delay covers further ticks.
+        """
+        tick = 1000.0 / self.rate
+        t_end = 0.0
+        emitted = 0
+        buf = np.zeros((self.height, self.width, 3), np.uint8)
+        view = memoryview(buf).cast("B")
+        with Image.open(self.path) as im:
+            for i, frame in enumerate(ImageSequence.Iterator(im)):
+                rgb = np.asarray(frame.convert("RGB"))
+                h, w = min(rgb.shape[0], self.height), min(rgb.shape[1], self.width)
+                if (w, h) != (self.width, self.height):
+                    buf.fill(0)   # smaller frame: black canvas, pasted top-left
+                buf[:h, :w] = rgb[:h, :w]
+                del rgb
+                t_end += self.delays[i] if i < len(self.delays) else self.delays[-1]
+                while emitted * tick < t_end - 1e-6:
+                    yield view
+                    emitted += 1
+
+    def write_to(self, stream, stop_flag=None):
+        """
+        Write all frames to a binary stream (ffmpeg stdin), then close it.
+        Returns the number of frames written; stops quietly if ffmpeg goes away.
+        """
+        n = 0
+        stream = getattr(stream, "buffer", stream)  # text-mode Popen stdin
+        try:
+            for data in self.frames():
+                if stop_flag is not None and stop_flag.is_set():
+                    break
+                stream.write(data)
+                n += 1
+        except (BrokenPipeError, OSError, ValueError):
+            pass
+        finally:
+            try:
+                stream.close()
+            except (BrokenPipeError, OSError):
+                pass
+        return n
+
+    def start_feeder(self, proc, stop_flag=None):
+        """
+        Stream into proc.stdin from a background thread (the caller keeps reading stderr).
+        """
+        t = threading.Thread(target=self.write_to, args=(proc.stdin, stop_flag), daemon=True)
+        t.start()
+        return t
+
+def ffmpeg_input(path, rate=None):
+    """
+    ffmpeg input args for path plus the frame source to feed, if any:
+      regular media           -> (["-i", path], None)
+      animated WebP / GIF     -> (rawvideo on pipe:0, AnimatedFrameSource)
+    Start the source with source.start_feeder(proc) after Popen(..., stdin=PIPE).
+    """
+    if is_animated_image(path):
+        src = AnimatedFrameSource(path, rate)
+        return src.input_args(), src
+    return ["-i", path], None
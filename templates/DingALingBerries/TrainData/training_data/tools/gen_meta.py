@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# gen_meta.py — structured generation settings from PNG text chunks, for png_index.py.
+# - ComfyUI: the "prompt" chunk (API graph: {id: {class_type, inputs}}) is walked from the
+#   sampler back through its links; if only the "workflow" chunk (UI graph) is present, known
+#   node types are converted to the same shape first. Covers the bundled Wan 2.2 graphs
+#   (UNETLoader high/low, Power Lora Loader, KSampler / WanMoeKSampler, EmptyHunyuanLatentVideo,
+#   Wildcard Processor -> CLIPTextEncode) and the stock loaders/samplers.
+# - A1111: the "parameters" text ("Steps: 20, Sampler: ..., Seed: ..." plus <lora:name:w>).
+#
+# extract(chunks) -> dict with source, models, loras [(name, strength)], seed, steps, cfg,
+# sampler, scheduler, width, height, frames, prompt, negative (missing values are None).
+
+import os
+import re
+import json
+
+LORA_TAG = re.compile(r"<lora:([^:>]+)(?::([^:>]*))?[^>]*>")
+
+# UI-graph widget order for node types whose widgets_values is a plain list ("_" = skipped,
+# e.g. control_after_generate).
+WIDGETS = {
+    "CheckpointLoaderSimple": ["ckpt_name"],
+    "UNETLoader": ["unet_name", "weight_dtype"],
+    "UnetLoaderGGUF": ["unet_name"],
+    "LoraLoader": ["lora_name", "strength_model", "strength_clip"],
+    "LoraLoaderModelOnly": ["lora_name", "strength_model"],
+    "KSampler": ["seed", "_", "steps", "cfg", "sampler_name", "scheduler", "denoise"],
+    "KSamplerAdvanced": ["add_noise", "noise_seed", "_", "steps", "cfg", "sampler_name", "scheduler",
+                         "start_at_step", "end_at_step", "return_with_leftover_noise"],
+    "WanMoeKSampler": ["boundary", "seed", "_", "steps", "cfg_high_noise", "cfg_low_noise",
+                       "sampler_name", "scheduler", "sigma_shift", "denoise"],
+    "RandomNoise": ["noise_seed", "_"],
+    "KSamplerSelect": ["sampler_name"],
+    "BasicScheduler": ["scheduler", "steps", "denoise"],
+    "EmptyLatentImage": ["width", "height", "batch_size"],
+    "EmptySD3LatentImage": ["width", "height", "batch_size"],
+    "EmptyHunyuanLatentVideo": ["width", "height", "length", "batch_size"],
+    "WanImageToVideo": ["width", "height", "length", "batch_size"],
+    "CLIPTextEncode": ["text"],
+    "Wildcard Processor": ["prompt", "seed", "_"],
+    "easy string": ["value"],
+    "PrimitiveNode": ["value", "_"],
+}
+
+MODEL_INPUTS = {"ckpt_name", "unet_name", "model_name"}
+TEXT_INPUTS = ("text", "prompt", "value", "string", "populated_text", "wildcard_text")
+SEED_INPUTS = ("seed", "noise_seed")
+
+# ---------------------- GRAPH HELPERS ----------------------
+
+def workflow_to_prompt(workflow):
+    """
+    UI graph (nodes + links) -> API-style {id: {"class_type", "inputs"}} for known node types.
+    Linked inputs become [source_id, slot] like in the API format.
+    """
+    links = {}
+    for link in workflow.get("links", []):
+        if isinstance(link, list) and len(link) >= 3:
+            links[link[0]] = [str(link[1]), link[2]]
+        elif isinstance(link, dict):
+            links[link.get("id")] = [str(link.get("origin_id")), link.get("origin_slot", 0)]
+    graph = {}
+    for node in workflow.get("nodes", []):
+        if node.get("mode") in (2, 4):  # muted / bypassed
+            continue
+        ctype = node.get("type", "")
+        inputs = {}
+        values = node.get("widgets_values")
+        if isinstance(values, dict):
+            inputs.update(values)
+        elif isinstance(values, list):
+            names = WIDGETS.get(ctype)
+            if names:
+                for name, value in zip(names, values):
+                    if name != "_":
+                        inputs[name] = value
+            n_lora = 0
+            for value in values:
+                # rgthree Power Lora Loader rows: {"on", "lora", "strength", ...}
+                if isinstance(value, dict) and "lora" in value:
+                    n_lora += 1
+                    inputs[f"lora_{n_lora}"] = value
+        for inp in node.get("inputs", []) or []:
+            if inp.get("link") is not None and inp["link"] in links:
+                inputs[inp.get("name")] = links[inp["link"]]
+        graph[str(node.get("id"))] = {"class_type": ctype, "inputs": inputs}
+    return graph
+
+def _is_link(value):
+    return isinstance(value, list) and len(value) == 2 and isinstance(value[0], (str, int))
+
+def _resolve(graph, value, keys, depth=0):
+    """
+    Follow a link until a literal value appears under one of `keys` (primitive / string nodes).
+    """
+    if not _is_link(value):
+        return value
+    if depth > 8:
+        return None
+    node = graph.get(str(value[0]))
+    if not node:
+        return None
+    inputs = node.get("inputs", {})
+    for k in keys:
+        if k in inputs:
+            return _resolve(graph, inputs[k], keys, depth + 1)
+    return None
+
+def _texts(graph, value, seen=None, depth=0):
+    """
+    Prompt strings feeding a conditioning input (through combines, concat, etc.).
+    """
+    seen = seen if seen is not None else set()
+    if not _is_link(value) or depth > 12:
+        return []
+    nid = str(value[0])
+    if nid in seen:
+        return []
+    seen.add(nid)
+    node = graph.get(nid)
+    if not node:
+        return []
+    inputs = node.get("inputs", {})
+    for k in TEXT_INPUTS:
+        if k in inputs:
+            text = _resolve(graph, inputs[k], TEXT_INPUTS)
+            if isinstance(text, str):
+                return [text] if text.strip() else []
+    out = []
+    for v in inputs.values():
+        out += _texts(graph, v, seen, depth + 1)
+    return out
+
+def _num(value, cast=float):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
+
+# ---------------------- COMFYUI ----------------------
+
+def parse_comfy(graph):
+    meta = empty_meta("comfy")
+    samplers = []
+    for nid, node in graph.items():
+        if not isinstance(node, dict):
+            continue
+        ctype = node.get("class_type", "")
+        inputs = node.get("inputs", {}) or {}
+
+        for k in MODEL_INPUTS:
+            v = inputs.get(k)
+            if isinstance(v, str) and v not in meta["models"]:
+                meta["models"].append(v)
+
+        # LoRAs: stock loaders, and rgthree-style {"on", "lora", "strength"} rows
+        name = inputs.get("lora_name")
+        if isinstance(name, str) and name != "None":
+            strength = inputs.get("strength_model", inputs.get("strength"))
+            meta["loras"].append((name, _num(_resolve(graph, strength, ("value",)))))
+        for v in inputs.values():
+            if isinstance(v, dict) and isinstance(v.get("lora"), str):
+                if v.get("on", True) and v["lora"] != "None":
+                    meta["loras"].append((v["lora"], _num(v.get("strength"))))
+
+        if "steps" in inputs and ("sampler_name" in inputs or any(k in inputs for k in SEED_INPUTS)):
+            samplers.append((ctype, inputs))
+        if "width" in inputs and "height" in inputs and ("Latent" in ctype or "ToVideo" in ctype):
+            meta["width"] = _num(_resolve(graph, inputs["width"], ("value",)), int)
+            meta["height"] = _num(_resolve(graph, inputs["height"], ("value",)), int)
+            if "length" in inputs:
+                meta["frames"] = _num(_resolve(graph, inputs["length"], ("value",)), int)
+
+    # sampler settings (first sampler wins; SamplerCustom-style graphs spread them over nodes)
+    for ctype, inputs in samplers[:1]:
+        for k in SEED_INPUTS:
+            if k in inputs:
+                meta["seed"] = _num(_resolve(graph, inputs[k], SEED_INPUTS + ("value",)), int)
+                break
+        meta["steps"] = _num(_resolve(graph, inputs.get("steps"), ("steps", "value")), int)
+        cfg = inputs.get("cfg", inputs.get("cfg_high_noise"))
+        meta["cfg"] = _num(_resolve(graph, cfg, ("value",)))
+        meta["sampler"] = _resolve(graph, inputs.get("sampler_name"), ("sampler_name", "value"))
+        meta["scheduler"] = _resolve(graph, inputs.get("scheduler"), ("scheduler", "value"))
+        meta["prompt"] = "\n".join(_texts(graph, inputs.get("positive"))) or None
+        meta["negative"] = "\n".join(_texts(graph, inputs.get("negative"))) or None
+    for node in graph.values():
+        if not isinstance(node, dict):
+            continue
+        inputs = node.get("inputs", {}) or {}
+        if meta["seed"] is None and isinstance(inputs.get("noise_seed"), int):
+            meta["seed"] = inputs["noise_seed"]
+        if meta["sampler"] is None and node.get("class_type") == "KSamplerSelect":
+            meta["sampler"] = inputs.get("sampler_name")
+        if meta["steps"] is None and node.get("class_type") == "BasicScheduler":
+            meta["steps"] = _num(inputs.get("steps"), int)
+            meta["scheduler"] = inputs.get("scheduler")
+    if meta["prompt"] is None:
+        texts = [n["inputs"]["text"] for n in graph.values() if isinstance(n, dict)
+                 and n.get("class_type") == "CLIPTextEncode" and isinstance(n.get("inputs", {}).get("text"), str)]
+        meta["prompt"] = "\n".join(t for t in texts if t.strip()) or None
+    if not isinstance(meta["sampler"], str): meta["sampler"] = None
+    if not isinstance(meta["scheduler"], str): meta["scheduler"] = None
+    return meta
+
+# ---------------------- A1111 ----------------------
+
+def parse_a1111(text):
+    meta = empty_meta("a1111")
+    body, _, settings = text.rpartition("\nSteps: ")
+    if not _:
+        body, settings = text, ""
+    else:
+        settings = "Steps: " + settings
+    prompt, sep, negative = body.partition("\nNegative prompt:")
+    meta["prompt"] = prompt.strip() or None
+    meta["negative"] = negative.strip() if sep else None
+    fields = dict(re.findall(r"\s*([\w ]+):\s*(\"[^\"]*\"|[^,]*)", settings))
+    meta["steps"] = _num(fields.get("Steps"), int)
+    meta["seed"] = _num(fields.get("Seed"), int)
+    meta["cfg"] = _num(fields.get("CFG scale"))
+    meta["sampler"] = fields.get("Sampler") or None
+    meta["scheduler"] = fields.get("Schedule type") or None
+    if "Size" in fields and "x" in fields["Size"]:
+        w, _, h = fields["Size"].partition("x")
+        meta["width"], meta["height"] = _num(w, int), _num(h, int)
+    if fields.get("Model"):
+        meta["models"].append(fields["Model"])
+    meta["loras"] = [(name.strip(), _num(w) if w else 1.0) for name, w in LORA_TAG.findall(text)]
+    return meta
+
+# ---------------------- ENTRY ----------------------
+
+def empty_meta(source=None):
+    return {"source": source, "models": [], "loras": [], "seed": None, "steps": None, "cfg": None,
+            "sampler": None, "scheduler": None, "width": None, "height": None, "frames": None,
+            "prompt": None, "negative": None}
+
+def extract(chunks):
+    """
+    Structured settings from a {keyword: text} dict of PNG text chunks.
+    ComfyUI "prompt" wins over "workflow"; A1111 "parameters" is used when there is no graph.
+    """
+    for key in ("prompt", "workflow"):
+        raw = chunks.get(key)
+        if not raw:
+            continue
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            continue
+        if not isinstance(data, dict):
+            continue
+        graph = workflow_to_prompt(data) if "nodes" in data else data
+        try:
+            return parse_comfy(graph)
+        except (AttributeError, TypeError):
+            continue
+    if chunks.get("parameters"):
+        return parse_a1111(chunks["parameters"])
+    return empty_meta()
+
+def lora_stem(name):
+    """
+    "New\\lightx2v_T2V_14B.safetensors" -> "lightx2v_T2V_14B" (what people type in a query).
+    """
+    base = name.replace("\\", "/").rsplit("/", 1)[-1]
+    stem, ext = os.path.splitext(base)
+    return stem if ext.lower() in (".safetensors", ".pt", ".ckpt", ".bin", ".gguf") else base
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+# lora_batch_inspector.py — training metadata of every .safetensors under a folder, side by side.
+# - Reads only the headers (safetensors_io.py), many files in parallel, so auditing the epoch
+#   checkpoints of a whole outputs/ tree (hundreds of files, many GB) takes seconds.
+# - One row per file: selected ss_* training keys (epoch, steps, lr, dim/alpha, optimizer, ...),
+#   tensor count, dtypes, parameter count and file size. Columns sort on click (numbers as numbers).
+# - Export to CSV (the table as shown) or JSON (the table plus each file's full metadata).
+# - Opened from lora_metadata_gui.py ("Batch Inspect Folder..."), or standalone:
+#
+# Usage:
+#   python lora_batch_inspector.py [folder] [--csv OUT] [--json OUT] [--keys ss_a,ss_b] [--workers N]
+#   (no folder: a window with a folder picker; --csv / --json: headless export)
+
+import os
+import csv
+import sys
+import json
+import math
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from png_index import walk_media
+from safetensors_io import read_header
+
+DEFAULT_KEYS = [
+    "ss_output_name", "ss_epoch", "ss_steps", "ss_learning_rate", "ss_unet_lr", "ss_text_encoder_lr",
+    "ss_network_dim", "ss_network_alpha", "ss_network_module", "ss_optimizer", "ss_lr_scheduler",
+    "ss_mixed_precision", "ss_seed", "ss_num_train_images", "ss_base_model_version",
+]
+FILE_COLUMNS = ["file", "size_mb", "tensors", "params", "dtypes"]
+DEFAULT_WORKERS = min(32, (os.cpu_count() or 4) * 4)  # header reads are tiny and I/O bound
+
+# ---------------------- SCANNING ----------------------
+
+def inspect_file(path, root):
+    try:
+        info = read_header(path)
+    except Exception as e:
+        return {"path": path, "file": os.path.relpath(path, root), "error": str(e)}, {}
+    row = dict(info.metadata)
+    row["path"] = path
+    row["file"] = os.path.relpath(path, root)
+    dtypes = Counter(t.get("dtype", "?") for t in info.tensors.values())
+    row["size_mb"] = round(info.file_size / (1 << 20), 2)
+    row["tensors"] = len(info)
+    row["params"] = sum(math.prod(t.get("shape", [])) for t in info.tensors.values())
+    row["dtypes"] = ", ".join(f"{d}:{n}" for d, n in dtypes.most_common())
+    return row, info.metadata
+
+def scan(root, workers=DEFAULT_WORKERS, progress=None):
+    """
+    [(row, metadata)] for every .safetensors under root, sorted by path.
+    progress(done, total) is called from the scanning thread.
+    """
+    root = os.path.abspath(root)
+    paths = sorted(p for p, _, _ in walk_media(root, exts={".safetensors"}))
+    results = []
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        for i, result in enumerate(pool.map(lambda p: inspect_file(p, root), paths), 1):
+            results.append(result)
+            if progress:
+                progress(i, len(paths))
+    return results
+
+def sort_key(value):
+    """
+    Numbers before text, numerically; empty cells last.
+    """
+    if value in (None, ""):
+        return (2, 0, "")
+    try:
+        return (0, float(value), "")
+    except (TypeError, ValueError):
+        return (1, 0, str(value).lower())
+
+# ---------------------- EXPORT ----------------------
+
+def export_csv(results, columns, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(columns + ["error"])
+        for row, _ in results:
+            w.writerow([row.get(c, "") for c in columns] + [row.get("error", "")])
+
+def export_json(results, columns, path):
+    out = []
+    for row, metadata in results:
+        entry = {c: row.get(c) for c in columns + ["path"] if row.get(c) is not None}
+        if "error" in row:
+            entry["error"] = row["error"]
+        entry["metadata"] = metadata
+        out.append(entry)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f, indent=2, ensure_ascii=False)
+
+# ---------------------- GUI ----------------------
+
+class BatchInspector:
+    def __init__(self, master, folder=None, keys=None, workers=DEFAULT_WORKERS):
+        import tkinter as tk
+        from tkinter import ttk
+        from ffmpeg_jobs import TkDispatcher
+
+        self.win = tk.Toplevel(master) if master is not None else tk.Tk()
+        self.win.title("LoRA Batch Inspector")
+        self.win.geometry("1400x700")
+        self.ui = TkDispatcher(self.win)
+        self.keys = keys or DEFAULT_KEYS
+        self.columns = FILE_COLUMNS + self.keys
+        self.workers = workers
+        self.results = []
+        self.sort_state = (None, False)
+
+        top = ttk.Frame(self.win, padding=5)
+        top.pack(fill="x")
+        ttk.Button(top, text="Select Folder...", command=self.choose_folder).pack(side="left")
+        ttk.Button(top, text="Export CSV...", command=lambda: self.export("csv")).pack(side="left", padx=5)
+        ttk.Button(top, text="Export JSON...", command=lambda: self.export("json")).pack(side="left")
+        self.status = tk.StringVar(value="Select a folder to scan.")
+        ttk.Label(top, textvariable=self.status).pack(side="left", padx=10)
+
+        body = ttk.Frame(self.win)
+        body.pack(fill="both", expand=True)
+        self.tree = ttk.Treeview(body, columns=self.columns, show="headings")
+        for c in self.columns:
+            label = c[3:] if c.startswith("ss_") else c
+            self.tree.heading(c, text=label, command=lambda c=c: self.sort_by(c))
+            self.tree.column(c, width=260 if c == "file" else 90, stretch=c == "file")
+        ys = ttk.Scrollbar(body, orient="vertical", command=self.tree.yview)
+        xs = ttk.Scrollbar(body, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(yscrollcommand=ys.set, xscrollcommand=xs.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        ys.grid(row=0, column=1, sticky="ns")
+        xs.grid(row=1, column=0, sticky="ew")
+        body.rowconfigure(0, weight=1)
+        body.columnconfigure(0, weight=1)
+
+        if folder:
+            self.start_scan(folder)
+
+    def choose_folder(self):
+        from tkinter import filedialog
+        folder = filedialog.askdirectory(title="Select Folder with .safetensors Files", parent=self.win)
+        if folder:
+            self.start_scan(folder)
+
+    def start_scan(self, folder):
+        self.folder = os.path.abspath(folder)
+        self.status.set(f"Scanning {self.folder} ...")
+        progress = lambda done, total: self.ui.post_latest("progress", self.status.set, f"Read {done}/{total} headers ...")
+
+        def work():
+            results = scan(self.folder, self.workers, progress)
+            self.ui.post(self.show, results)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def show(self, results):
+        self.results = results
+        self.tree.delete(*self.tree.get_children())
+        for i, (row, _) in enumerate(results):
+            values = [row.get(c, "") for c in self.columns]
+            if "error" in row:
+                values[self.columns.index("dtypes")] = f"❌ {row['error']}"
+            self.tree.insert("", "end", iid=str(i), values=values)
+        errors = sum(1 for row, _ in results if "error" in row)
+        self.status.set(f"{len(results)} file(s) in {self.folder}" + (f", {errors} unreadable" if errors else ""))
+
+    def sort_by(self, column):
+        prev, reverse = self.sort_state
+        reverse = not reverse if prev == column else False
+        self.sort_state = (column, reverse)
+        order = sorted(range(len(self.results)), key=lambda i: sort_key(self.results[i][0].get(column)),
+                       reverse=reverse)
+        for pos, i in enumerate(order):
+            self.tree.move(str(i), "", pos)
+
+    def export(self, kind):
+        from tkinter import filedialog, messagebox
+        if not self.results:
+            messagebox.showwarning("Nothing to export", "Scan a folder first.", parent=self.win)
+            return
+        path = filedialog.asksaveasfilename(parent=self.win, defaultextension=f".{kind}",
+                                            filetypes=[(kind.upper(), f"*.{kind}")],
+                                            initialfile=f"lora_inspection.{kind}")
+        if not path:
+            return
+        # export in the order currently shown
+        order = [int(iid) for iid in self.tree.get_children()]
+        rows = [self.results[i] for i in order]
+        (export_csv if kind == "csv" else export_json)(rows, self.columns, path)
+        self.status.set(f"Exported {len(rows)} row(s) to {path}")
+
+# ---------------------- CLI ----------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect the training metadata of every .safetensors under a folder.")
+    ap.add_argument("folder", nargs="?", help="folder to scan (recursive)")
+    ap.add_argument("--csv", help="write the table to this CSV file and exit")
+    ap.add_argument("--json", help="write the table + full metadata to this JSON file and exit")
+    ap.add_argument("--keys", help="comma-separated metadata keys to show (default: common ss_* keys)")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parallel header reads")
+    args = ap.parse_args()
+    keys = [k.strip() for k in args.keys.split(",") if k.strip()] if args.keys else None
+
+    if args.csv or args.json:
+        if not args.folder or not os.path.isdir(args.folder):
+            print("❌ A valid folder is required for export.")
+            return 1
+        results = scan(args.folder, args.workers)
+        columns = FILE_COLUMNS + (keys or DEFAULT_KEYS)
+        if args.csv:
+            export_csv(results, columns, args.csv)
+        if args.json:
+            export_json(results, columns, args.json)
+        errors = sum(1 for row, _ in results if "error" in row)
+        print(f"✔️ {len(results)} file(s) inspected, {errors} unreadable.")
+        return 0
+
+    app = BatchInspector(None, args.folder, keys, args.workers)
+    app.win.mainloop()
+
+if __name__ == "__main__":
+    sys.exit(main())
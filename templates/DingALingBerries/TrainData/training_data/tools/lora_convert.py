@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# lora_convert.py — switch a LoRA between musubi's "default" key layout and the "other" layout
+# (ComfyUI / diffusers: diffusion_model.<module>.lora_A / lora_B), like musubi's convert_lora.py.
+# - Only the header is rewritten: tensor names change, offsets, dtypes and bytes stay as they are.
+#   The data section is copied straight through (safetensors_io.write_file), so there is no torch,
+#   no dtype round-trip, and a 600 MB LoRA converts in well under a second with a few MB of RAM.
+# - .alpha keys are renamed along with their module instead of being folded into the weights, so
+#   the result is bit-identical to the trained tensors (ComfyUI reads <module>.alpha).
+# - --target default on a file without alphas (e.g. musubi's own "other" output) adds alpha = rank
+#   per module, which is what those weights mean.
+# - Non-LoRA keys are kept unchanged; metadata is kept.
+#
+# Usage:
+#   python lora_convert.py --input in.safetensors [--output out.safetensors] [--target other|default]
+#                          [--prefix diffusion_model]
+#   (no --input: file picker; default output: <name>_converted.safetensors)
+
+import os
+import sys
+import struct
+import argparse
+
+from lora_keys import OTHER_PREFIX, group_modules, rename_key
+from safetensors_hash import drop_hashes
+from safetensors_io import SafetensorsFormatError, read_header, write_file
+
+# ---------------------- CONVERSION ----------------------
+
+def missing_alphas(info, tensors):
+    """
+    {alpha name: (dtype, shape, bytes)} with alpha = rank for modules that have none.
+    """
+    extra = {}
+    for module, parts in group_modules(tensors).items():
+        if "alpha" not in parts:
+            rank = tensors[parts["down"]]["shape"][0]
+            extra[f"{module}.alpha"] = ("F32", [], struct.pack("<f", float(rank)))
+    return extra
+
+def convert(path, out_path, target="other", prefix=OTHER_PREFIX):
+    """
+    Writes the converted file; returns (renamed, kept, added_alphas).
+    """
+    info = read_header(path)
+    tensors, renamed, kept = {}, 0, 0
+    for name, entry in info.tensors.items():
+        new = rename_key(name, target, prefix)
+        if new is None:
+            new = name
+            kept += 1
+        else:
+            renamed += 1
+        if new in tensors:
+            raise SafetensorsFormatError(f"two tensors map to {new}")
+        tensors[new] = entry
+    if not renamed:
+        raise SafetensorsFormatError(f"no keys in the source layout for --target {target}")
+    extra = missing_alphas(info, tensors) if target == "default" else {}
+    # added alphas change the data section, so a stored data hash would no longer match
+    metadata = drop_hashes(info.metadata) if extra else None
+    write_file(info, out_path, tensors=tensors, metadata=metadata, append=extra)
+    return renamed, kept, len(extra)
+
+# ---------------------- CLI ----------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Convert LoRA keys between musubi default and other (ComfyUI) layouts.")
+    ap.add_argument("--input", help="LoRA .safetensors")
+    ap.add_argument("--output", help="output file (default: <name>_converted.safetensors)")
+    ap.add_argument("--target", choices=["other", "default"], default="other",
+                    help="other = ComfyUI / diffusers names, default = musubi names (default: other)")
+    ap.add_argument("--prefix", default=OTHER_PREFIX, help="module prefix of the other layout")
+    args = ap.parse_args()
+
+    path = args.input
+    if not path:
+        from tkinter import filedialog, Tk
+        root = Tk()
+        root.withdraw()
+        path = filedialog.askopenfilename(title="Select LoRA to Convert", filetypes=[("SafeTensor files", "*.safetensors")])
+    if not path or not os.path.isfile(path):
+        print("❌ No valid file selected.")
+        return 1
+    out = args.output or f"{os.path.splitext(path)[0]}_converted.safetensors"
+
+    try:
+        renamed, kept, added = convert(path, out, args.target, args.prefix)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    notes = [f"{renamed} key(s) renamed"]
+    if kept:
+        notes.append(f"{kept} kept as-is")
+    if added:
+        notes.append(f"{added} alpha(s) added")
+    print(f"✔️ {out}\n   {', '.join(notes)}")
+
+if __name__ == "__main__":
+    sys.exit(main())
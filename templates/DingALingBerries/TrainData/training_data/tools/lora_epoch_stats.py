@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# lora_epoch_stats.py — how a LoRA's weights evolve across its epoch checkpoints, without inference.
+# - Memory-maps each checkpoint (safetensors_io.TensorFile) and streams every up/down pair in
+#   row / column chunks, so memory stays at a few chunks whatever the model size.
+# - Never forms the full delta W = up @ down * alpha/rank: everything comes from rank x rank Gram
+#   matrices (up^T up, down down^T, and cross terms between consecutive epochs).
+#     norm      ||dW||_F                      spectral  largest singular value of dW
+#     erank     effective rank exp(H(s/sum s))   rank90  singular values holding 90% of the energy
+#     delta     ||dW_e - dW_prev||_F, rel_delta = delta / ||dW_prev||, cos = <dW_e, dW_prev> / norms
+# - Prints a per-checkpoint summary and the modules that moved most in the last step; --csv writes
+#   every (module, checkpoint) row, --heatmap renders modules x checkpoints for one metric (PIL).
+#
+# Usage:
+#   python lora_epoch_stats.py [folder | file ...] [--csv OUT] [--heatmap OUT.png]
+#                              [--metric norm|rel_delta|cos|erank|spectral] [--top N] [--workers N]
+#   (a folder takes every .safetensors in it, ordered by ss_epoch; no argument opens a folder dialog)
+
+import os
+import re
+import csv
+import sys
+import math
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lora_keys import group_modules
+from safetensors_io import TensorFile, to_float32
+
+CHUNK_ELEMS = 1 << 21        # elements per streamed chunk (16 MB as float64)
+ENERGY = 0.90                # rank90 threshold
+DEFAULT_WORKERS = os.cpu_count() or 4
+METRICS = ["norm", "spectral", "erank", "rank90", "delta", "rel_delta", "cos"]
+
+# ---------------------- STREAMING GRAMS ----------------------
+
+def matrix2d(tf, name):
+    """
+    2-D raw view: up [out, rank(, 1, 1)] -> [out, rank], down [rank, in(, kh, kw)] -> [rank, in * kh * kw].
+    """
+    raw = tf.raw(name)
+    return raw if raw.ndim == 2 else raw.reshape(raw.shape[0], -1)
+
+def row_chunks(tf, name, a):
+    step = max(1, CHUNK_ELEMS // max(1, a.shape[1]))
+    dtype = tf.dtype(name)
+    for r in range(0, a.shape[0], step):
+        yield to_float32(a[r:r + step], dtype).astype(np.float64)
+
+def col_chunks(tf, name, a):
+    step = max(1, CHUNK_ELEMS // max(1, a.shape[0]))
+    dtype = tf.dtype(name)
+    for c in range(0, a.shape[1], step):
+        yield to_float32(a[:, c:c + step], dtype).astype(np.float64)
+
+def up_gram(tf1, n1, tf2=None, n2=None):
+    """
+    up1^T @ up2 (rank1 x rank2), streamed over output rows; up1^T up1 when only one is given.
+    """
+    a = matrix2d(tf1, n1)
+    if tf2 is None:
+        return sum(c.T @ c for c in row_chunks(tf1, n1, a))
+    b = matrix2d(tf2, n2)
+    if a.shape[0] != b.shape[0]:
+        raise ValueError("up shapes differ")
+    return sum(x.T @ y for x, y in zip(row_chunks(tf1, n1, a), row_chunks(tf2, n2, b)))
+
+def down_gram(tf1, n1, tf2=None, n2=None):
+    """
+    down1 @ down2^T (rank1 x rank2), streamed over input columns.
+    """
+    a = matrix2d(tf1, n1)
+    if tf2 is None:
+        return sum(c @ c.T for c in col_chunks(tf1, n1, a))
+    b = matrix2d(tf2, n2)
+    if a.shape[1] != b.shape[1]:
+        raise ValueError("down shapes differ")
+    return sum(x @ y.T for x, y in zip(col_chunks(tf1, n1, a), col_chunks(tf2, n2, b)))
+
+def gram_root(g):
+    """
+    R with R^T R = g (r x r), from the eigendecomposition (robust to rank-deficient g).
+    """
+    w, v = np.linalg.eigh(g)
+    return np.sqrt(np.clip(w, 0, None))[:, None] * v.T
+
+def scale_of(tf, parts):
+    rank = tf.shape(parts["down"])[0]
+    if "alpha" in parts:
+        return float(tf.float32(parts["alpha"]).reshape(-1)[0]) / rank
+    return 1.0
+
+# ---------------------- STATS ----------------------
+
+def spectrum_stats(s):
+    energy = s ** 2
+    total = energy.sum()
+    if total <= 0:
+        return {"norm": 0.0, "spectral": 0.0, "erank": 0.0, "rank90": 0}
+    p = s / s.sum()
+    p = p[p > 0]
+    return {
+        "norm": float(math.sqrt(total)),
+        "spectral": float(s[0]),
+        "erank": float(np.exp(-(p * np.log(p)).sum())),
+        "rank90": int(np.searchsorted(np.cumsum(energy) / total, ENERGY) + 1),
+    }
+
+def module_stats(files, module):
+    """
+    [{metric: value}] per checkpoint for one module (missing modules give empty dicts).
+    """
+    rows, prev = [], None
+    for tf, modules in files:
+        parts = modules.get(module)
+        if parts is None:
+            rows.append({})
+            prev = None
+            continue
+        scale = scale_of(tf, parts)
+        gu = up_gram(tf, parts["up"])
+        gd = down_gram(tf, parts["down"])
+        s = np.linalg.svd(gram_root(gu) @ gram_root(gd).T, compute_uv=False) * abs(scale)
+        row = spectrum_stats(s)
+        if prev is not None:
+            ptf, pparts, pscale, pnorm = prev
+            try:
+                cu = up_gram(ptf, pparts["up"], tf, parts["up"])
+                cd = down_gram(ptf, pparts["down"], tf, parts["down"])
+                inner = pscale * scale * float(np.trace(cu @ cd.T))
+                delta2 = max(pnorm ** 2 + row["norm"] ** 2 - 2 * inner, 0.0)
+                row["delta"] = math.sqrt(delta2)
+                row["rel_delta"] = row["delta"] / pnorm if pnorm else float("nan")
+                row["cos"] = inner / (pnorm * row["norm"]) if pnorm and row["norm"] else float("nan")
+            except ValueError:
+                pass  # shapes changed between checkpoints
+        rows.append(row)
+        prev = (tf, parts, scale, row["norm"])
+    return rows
+
+# ---------------------- INPUT ----------------------
+
+def _natural(name):
+    return [int(t) if t.isdigit() else t.lower() for t in re.split(r"(\d+)", name)]
+
+def order_checkpoints(paths, tensor_files):
+    """
+    Sort by ss_epoch when every file has one, else by file name (numbers compared as numbers).
+    """
+    epochs = [tf.metadata.get("ss_epoch") for tf in tensor_files]
+    if all(e is not None and str(e).isdigit() for e in epochs):
+        key = lambda i: (int(epochs[i]), _natural(os.path.basename(paths[i])))
+    else:
+        key = lambda i: _natural(os.path.basename(paths[i]))
+    order = sorted(range(len(paths)), key=key)
+    return [paths[i] for i in order], [tensor_files[i] for i in order]
+
+def collect_paths(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths += [os.path.join(item, f) for f in os.listdir(item) if f.lower().endswith(".safetensors")]
+        else:
+            paths.append(item)
+    return paths
+
+def compute(paths, workers=DEFAULT_WORKERS):
+    """
+    (ordered paths, epochs, modules, {module: [row per checkpoint]}).
+    """
+    tensor_files = [TensorFile(p) for p in paths]
+    try:
+        paths, tensor_files = order_checkpoints(paths, tensor_files)
+        files = [(tf, group_modules(tf.keys())) for tf in tensor_files]
+        modules = list(dict.fromkeys(m for _, mods in files for m in mods))
+        with ThreadPoolExecutor(max(1, workers)) as pool:
+            results = dict(zip(modules, pool.map(lambda m: module_stats(files, m), modules)))
+        epochs = [tf.metadata.get("ss_epoch", "") for tf in tensor_files]
+    finally:
+        for tf in tensor_files:
+            tf.close()
+    return paths, epochs, modules, results
+
+# ---------------------- REPORTS ----------------------
+
+def summary(paths, epochs, modules, results):
+    print(f"{'checkpoint':<40} {'epoch':>5} {'modules':>7} {'total norm':>11} {'mean erank':>10} "
+          f"{'mean rel_delta':>14} {'mean cos':>8}")
+    for i, path in enumerate(paths):
+        rows = [results[m][i] for m in modules if results[m][i]]
+        total = math.sqrt(sum(r["norm"] ** 2 for r in rows))
+        erank = np.mean([r["erank"] for r in rows]) if rows else float("nan")
+        rel = [r["rel_delta"] for r in rows if "rel_delta" in r]
+        cos = [r["cos"] for r in rows if "cos" in r]
+        print(f"{os.path.basename(path)[:40]:<40} {str(epochs[i]):>5} {len(rows):>7} {total:>11.4f} "
+              f"{erank:>10.2f} {(np.nanmean(rel) if rel else float('nan')):>14.4f} "
+              f"{(np.nanmean(cos) if cos else float('nan')):>8.4f}")
+
+def top_movers(paths, modules, results, n):
+    last = len(paths) - 1
+    moved = [(results[m][last].get("rel_delta"), m) for m in modules]
+    moved = sorted(((v, m) for v, m in moved if v is not None and not math.isnan(v)), reverse=True)[:n]
+    if moved:
+        print(f"\nLargest relative change into {os.path.basename(paths[last])}:")
+        for v, m in moved:
+            print(f"  {v:>8.4f}  {m}")
+
+def write_csv(path, paths, epochs, modules, results):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["module", "checkpoint", "epoch"] + METRICS)
+        for m in modules:
+            for i, row in enumerate(results[m]):
+                if row:
+                    w.writerow([m, os.path.basename(paths[i]), epochs[i]] + [row.get(k, "") for k in METRICS])
+
+# viridis-like anchors for the heatmap
+COLORMAP = np.array([[68, 1, 84], [59, 82, 139], [33, 145, 140], [94, 201, 98], [253, 231, 37]], np.float64)
+
+def colorize(values):
+    """
+    RGB uint8 for values in [0, 1] (NaN -> grey).
+    """
+    v = np.clip(np.nan_to_num(values, nan=0.0), 0, 1) * (len(COLORMAP) - 1)
+    lo = np.floor(v).astype(int).clip(0, len(COLORMAP) - 2)
+    t = (v - lo)[..., None]
+    rgb = COLORMAP[lo] * (1 - t) + COLORMAP[lo + 1] * t
+    rgb[np.isnan(values)] = (96, 96, 96)
+    return rgb.astype(np.uint8)
+
+def write_heatmap(path, paths, epochs, modules, results, metric):
+    from PIL import Image, ImageDraw
+    grid = np.array([[results[m][i].get(metric, np.nan) for i in range(len(paths))] for m in modules], np.float64)
+    finite = grid[np.isfinite(grid)]
+    lo, hi = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+    norm = (grid - lo) / (hi - lo) if hi > lo else np.zeros_like(grid)
+    norm[~np.isfinite(grid)] = np.nan
+
+    cell_w = 48
+    row_h = max(1, min(12, 1600 // max(1, len(modules))))
+    label_w = 360 if row_h >= 8 else 0
+    top, bottom = 24, 24
+    img = Image.new("RGB", (label_w + cell_w * len(paths), top + row_h * len(modules) + bottom), "white")
+    cells = np.repeat(np.repeat(colorize(norm), row_h, axis=0), cell_w, axis=1)
+    img.paste(Image.fromarray(cells), (label_w, top))
+    draw = ImageDraw.Draw(img)
+    for i, e in enumerate(epochs):
+        draw.text((label_w + i * cell_w + 4, 6), str(e or i + 1), fill="black")
+    if label_w:
+        for j, m in enumerate(modules):
+            draw.text((2, top + j * row_h), m[-58:], fill="black")
+    draw.text((4, img.height - 18), f"{metric}: {lo:.4g} (dark) .. {hi:.4g} (bright), grey = n/a", fill="black")
+    img.save(path)
+
+# ---------------------- CLI ----------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-module weight statistics across LoRA epoch checkpoints.")
+    ap.add_argument("inputs", nargs="*", help="folder of checkpoints, or checkpoint files")
+    ap.add_argument("--csv", help="write every (module, checkpoint) row to this CSV")
+    ap.add_argument("--heatmap", help="write a modules x checkpoints PNG heatmap")
+    ap.add_argument("--metric", choices=METRICS, default="rel_delta", help="heatmap metric")
+    ap.add_argument("--top", type=int, default=10, help="modules listed as largest movers")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="modules processed in parallel")
+    args = ap.parse_args()
+
+    inputs = args.inputs
+    if not inputs:
+        from tkinter import filedialog, Tk
+        root = Tk()
+        root.withdraw()
+        folder = filedialog.askdirectory(title="Select Folder with LoRA Epoch Checkpoints")
+        inputs = [folder] if folder else []
+    paths = collect_paths(inputs)
+    if not paths:
+        print("❌ No .safetensors checkpoints found.")
+        return 1
+
+    paths, epochs, modules, results = compute(paths, args.workers)
+    if not modules:
+        print("❌ No LoRA up/down pairs found in these files.")
+        return 1
+    summary(paths, epochs, modules, results)
+    if len(paths) > 1:
+        top_movers(paths, modules, results, args.top)
+    if args.csv:
+        write_csv(args.csv, paths, epochs, modules, results)
+        print(f"✔️ CSV: {args.csv}")
+    if args.heatmap:
+        write_heatmap(args.heatmap, paths, epochs, modules, results, args.metric)
+        print(f"✔️ Heatmap: {args.heatmap}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# lora_keys.py — LoRA tensor key layout shared by the lora_* tools.
+# - Groups a file's tensor names into modules: {module: {"down", "up", "alpha", ...}}.
+# - Understands the kohya / musubi layout (<module>.lora_down.weight, .lora_up.weight, .alpha)
+#   and the PEFT / ComfyUI layout (<module>.lora_A.weight, .lora_B.weight).
+# - down is [rank, in] (or [rank, in, kh, kw] for convs), up is [out, rank] (or [out, rank, 1, 1]);
+#   the weight delta is up @ down * alpha / rank.
+# - Renames between the two layouts (musubi "default" lora_unet_* names <-> "other" / ComfyUI
+#   diffusion_model.* names), as musubi's convert_lora.py does; used by lora_convert.py.
+
+SUFFIXES = {
+    ".lora_down.weight": "down",
+    ".lora_up.weight": "up",
+    ".lora_A.weight": "down",
+    ".lora_B.weight": "up",
+    ".lora.down.weight": "down",
+    ".lora.up.weight": "up",
+    ".alpha": "alpha",
+    ".dora_scale": "dora_scale",
+}
+
+def split_key(name):
+    """
+    ("module", "down" | "up" | "alpha" | "dora_scale") or (name, None) for anything else.
+    """
+    for suffix, part in SUFFIXES.items():
+        if name.endswith(suffix):
+            return name[:-len(suffix)], part
+    return name, None
+
+def group_modules(names):
+    """
+    {module: {part: tensor name}} for every module that has both down and up, in file order.
+    """
+    modules = {}
+    for name in names:
+        module, part = split_key(name)
+        if part:
+            modules.setdefault(module, {})[part] = name
+    return {m: parts for m, parts in modules.items() if "down" in parts and "up" in parts}
+
+# ---------------------- LAYOUT CONVERSION ----------------------
+
+DEFAULT_PREFIX = "lora_unet_"
+OTHER_PREFIX = "diffusion_model"
+DEFAULT_PARTS = {"down": ".lora_down.weight", "up": ".lora_up.weight", "alpha": ".alpha"}
+OTHER_PARTS = {"down": ".lora_A.weight", "up": ".lora_B.weight", "alpha": ".alpha"}
+
+# module names flattened with "_" -> "." have lost the underscores inside names; put them back
+# (same fix-ups as musubi's convert_lora.py: Wan attention, then HunyuanVideo blocks)
+WAN_FIXES = [("cross.attn", "cross_attn"), ("self.attn", "self_attn"), ("k.img", "k_img"), ("v.img", "v_img")]
+HUNYUAN_FIXES = [("double.blocks.", "double_blocks."), ("single.blocks.", "single_blocks."),
+                 ("img.", "img_"), ("txt.", "txt_"), ("attn.", "attn_")]
+
+def dotted_module(flat):
+    """
+    "blocks_0_self_attn_q" -> "blocks.0.self_attn.q"
+    """
+    name = flat.replace("_", ".")
+    fixes = WAN_FIXES if ".cross.attn." in name or ".self.attn." in name else HUNYUAN_FIXES
+    for old, new in fixes:
+        name = name.replace(old, new)
+    return name
+
+def rename_key(name, target, prefix=OTHER_PREFIX):
+    """
+    Tensor name in the target layout ("other" or "default"), or None if name is not a LoRA key
+    of the source layout.
+    """
+    module, part = split_key(name)
+    if target == "other":
+        if part not in DEFAULT_PARTS or not module.startswith(DEFAULT_PREFIX) or not name.endswith(DEFAULT_PARTS[part]):
+            return None
+        return f"{prefix}.{dotted_module(module[len(DEFAULT_PREFIX):])}{OTHER_PARTS[part]}"
+    if part not in OTHER_PARTS or not name.endswith(OTHER_PARTS[part]) or module.startswith(DEFAULT_PREFIX):
+        return None
+    if prefix and module.startswith(prefix + "."):
+        module = module[len(prefix) + 1:]
+    return f"{DEFAULT_PREFIX}{module.replace('.', '_')}{DEFAULT_PARTS[part]}"
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# lora_merge.py — bake LoRAs into the Wan 2.2 low / high noise DiTs for inference without LoRA loaders.
+# - Streams: the base DiT is memory-mapped (safetensors_io.TensorFile) and written tensor by tensor
+#   (SafetensorsWriter). Tensors no LoRA touches are copied as raw bytes; touched weights are
+#   updated CHUNK_ELEMS at a time (W[rows] += strength * alpha / rank * up[rows] @ down), so peak
+#   memory is a few chunks plus the LoRA, never the 28 GB of the two models.
+# - Low and high noise are one job: --lora goes into both, --lora-low / --lora-high into one each,
+#   with --strength / --strength-high (default: same as --strength).
+# - LoRA modules are matched to base weights by name in either layout (musubi lora_unet_blocks_0_...
+#   or diffusion_model.blocks.0....), with or without a model.diffusion_model. prefix in the base.
+#   Unmatched LoRA modules are reported; a LoRA matching nothing is an error.
+# - The output keeps the base dtype (fp16 / bf16; fp8 bases must be merged at full precision and
+#   quantized afterwards). --max-shard-size writes name-0000N-of-0000M.safetensors shards plus a
+#   .safetensors.index.json; by default each model is one file, which is what ComfyUI loads.
+#
+# Usage:
+#   python lora_merge.py --dit-low LOW.safetensors --dit-high HIGH.safetensors --lora my-lora.safetensors
+#                        [--lora-low A] [--lora-high B] [--strength 1.0] [--strength-high S]
+#                        [--out-dir DIR] [--max-shard-size 5GB] [--workers N]
+
+import os
+import re
+import sys
+import json
+import math
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lora_keys import DEFAULT_PREFIX, OTHER_PREFIX, group_modules
+from lora_epoch_stats import CHUNK_ELEMS, scale_of
+from safetensors_hash import drop_hashes
+from safetensors_io import DTYPE_SIZES, SafetensorsWriter, TensorFile, from_float32, to_float32
+
+BASE_PREFIXES = ("model.diffusion_model.", "diffusion_model.")
+MERGEABLE = {"F16", "BF16", "F32"}
+DEFAULT_WORKERS = 2          # tensors prepared ahead of the writer; NumPy's BLAS is threaded already
+
+# ---------------------- MATCHING ----------------------
+
+def flat_name(module):
+    """
+    Layout-independent module name: "blocks_0_self_attn_q".
+    """
+    if module.startswith(DEFAULT_PREFIX):
+        return module[len(DEFAULT_PREFIX):]
+    for prefix in BASE_PREFIXES + (OTHER_PREFIX + ".",):
+        if module.startswith(prefix):
+            module = module[len(prefix):]
+            break
+    return module.replace(".", "_")
+
+def base_weights(names):
+    """
+    {flat module name: base tensor name} for every <module>.weight of the base model.
+    """
+    return {flat_name(n[:-len(".weight")]): n for n in names if n.endswith(".weight")}
+
+def parse_size(text):
+    """
+    "5GB" / "500MB" / bytes -> bytes.
+    """
+    m = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?i?B)?\s*", text, re.I)
+    if not m:
+        raise argparse.ArgumentTypeError(f"not a size: {text}")
+    unit = (m.group(2) or "B").upper().replace("I", "")
+    return int(float(m.group(1)) * 1024 ** "BKMGT".index(unit[0]))
+
+def format_size(n):
+    """
+    Bytes -> "120.0 GB", in the same 1024-based units parse_size reads.
+    """
+    for i, unit in enumerate("KMGT", 1):
+        if n < 1024 ** (i + 1) or unit == "T":
+            return f"{n / 1024 ** i:.1f} {unit}B"
+
+# ---------------------- DELTAS ----------------------
+
+def load_deltas(loras, base_names, log=print):
+    """
+    {base tensor name: [(up [out, r], down [r, cols], factor)]} for every LoRA module that has a
+    base weight. loras: [(path, strength)]. The factors are small and loaded whole.
+    """
+    targets = base_weights(base_names)
+    deltas = {}
+    for path, strength in loras:
+        with TensorFile(path) as tf:
+            modules = group_modules(tf.keys())
+            matched, missing = 0, []
+            for module, parts in modules.items():
+                if "dora_scale" in parts:
+                    raise ValueError(f"{os.path.basename(path)}: DoRA modules are not supported")
+                target = targets.get(flat_name(module))
+                if target is None:
+                    missing.append(module)
+                    continue
+                up, down = tf.float32(parts["up"]), tf.float32(parts["down"])
+                rank = down.shape[0]
+                up = up.reshape(up.shape[0], rank, -1)
+                if up.shape[2] != 1:
+                    raise ValueError(f"{module}: only 1x1 up kernels can be merged")
+                factor = strength * scale_of(tf, parts)
+                deltas.setdefault(target, []).append((up[:, :, 0], down.reshape(rank, -1), factor))
+                matched += 1
+        if not matched:
+            raise ValueError(f"{os.path.basename(path)}: no module matches a weight of the base model")
+        log(f"   {os.path.basename(path)} x {strength:g}: {matched} module(s) merged"
+            + (f", {len(missing)} without a base weight (e.g. {missing[0]})" if missing else ""))
+    return deltas
+
+def merged_chunks(tf, name, terms):
+    """
+    Raw bytes of base weight `name` with all LoRA terms added, a block of rows at a time.
+    """
+    dtype, shape = tf.dtype(name), tf.shape(name)
+    if dtype not in MERGEABLE:
+        raise ValueError(f"{name} is {dtype}; merge into the fp16 / bf16 model and quantize afterwards")
+    raw = tf.raw(name).reshape(shape[0], -1)
+    for up, down, _ in terms:
+        if up.shape[0] != raw.shape[0] or down.shape[1] != raw.shape[1]:
+            raise ValueError(f"{name}: LoRA shape {up.shape[0]}x{down.shape[1]} does not fit {'x'.join(map(str, shape))}")
+    rows = max(1, CHUNK_ELEMS // max(1, raw.shape[1]))
+    chunks = []
+    for r in range(0, raw.shape[0], rows):
+        w = to_float32(raw[r:r + rows], dtype)
+        for up, down, factor in terms:
+            w += (up[r:r + rows] * np.float32(factor)) @ down
+        chunks.append(from_float32(w, dtype))
+    return chunks
+
+# ---------------------- WRITING ----------------------
+
+def plan_shards(tf, max_shard):
+    """
+    [[tensor names]] in file order, each list under max_shard bytes (a bigger tensor gets its own).
+    """
+    if not max_shard:
+        return [list(tf.keys())]
+    shards, current, size = [], [], 0
+    for name in tf.keys():
+        n = tf.header.nbytes(name)
+        if current and size + n > max_shard:
+            shards.append(current)
+            current, size = [], 0
+        current.append(name)
+        size += n
+    if current:
+        shards.append(current)
+    return shards
+
+def shard_paths(out_path, count):
+    if count == 1:
+        return [out_path]
+    stem = os.path.splitext(out_path)[0]
+    return [f"{stem}-{i:05d}-of-{count:05d}.safetensors" for i in range(1, count + 1)]
+
+def merge_model(base_path, loras, out_path, max_shard=0, workers=DEFAULT_WORKERS, log=print):
+    """
+    Writes base + LoRAs to out_path (or its shards); returns the written paths.
+    """
+    log(f"{os.path.basename(base_path)}")
+    with TensorFile(base_path) as tf:
+        deltas = load_deltas(loras, tf.keys(), log)
+        metadata = drop_hashes(tf.metadata)
+        metadata["merged_loras"] = json.dumps([{"name": os.path.basename(p), "strength": s} for p, s in loras])
+
+        shards = plan_shards(tf, max_shard)
+        paths = shard_paths(out_path, len(shards))
+        window = max(1, workers)
+        with ThreadPoolExecutor(max(1, workers)) as pool:
+            for names, path in zip(shards, paths):
+                specs = {n: (tf.dtype(n), tf.shape(n)) for n in names}
+                merged = [n for n in names if n in deltas]
+                queued, pending = iter(merged), {}
+
+                def fill():
+                    while len(pending) < window:
+                        n = next(queued, None)
+                        if n is None:
+                            return
+                        pending[n] = pool.submit(merged_chunks, tf, n, deltas[n])
+
+                fill()
+                with SafetensorsWriter(path, specs, metadata) as w:
+                    for name in names:
+                        if name not in deltas:
+                            w.write(name, tf.raw(name))
+                            continue
+                        chunks = pending.pop(name).result()
+                        fill()
+                        for c in chunks[:-1]:
+                            w.write(name, c, partial=True)
+                        w.write(name, chunks[-1])
+                log(f"   -> {path}")
+
+        if len(paths) > 1:
+            index = {
+                "metadata": {"total_size": sum(DTYPE_SIZES[tf.dtype(n)] * math.prod(tf.shape(n)) for n in tf.keys())},
+                "weight_map": {n: os.path.basename(p) for names, p in zip(shards, paths) for n in names},
+            }
+            with open(f"{out_path}.index.json", "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2)
+    return paths
+
+def output_path(base_path, loras, out_dir):
+    tag = "+".join(os.path.splitext(os.path.basename(p))[0] for p, _ in loras)
+    stem = os.path.splitext(os.path.basename(base_path))[0]
+    return os.path.join(out_dir or os.path.dirname(os.path.abspath(base_path)), f"{stem}_{tag}.safetensors")
+
+# ---------------------- CLI ----------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Merge LoRAs into the Wan 2.2 low / high noise DiTs, streamed.")
+    ap.add_argument("--dit-low", help="low noise base DiT (.safetensors)")
+    ap.add_argument("--dit-high", help="high noise base DiT (.safetensors)")
+    ap.add_argument("--lora", action="append", default=[], help="LoRA merged into both models (repeatable)")
+    ap.add_argument("--lora-low", action="append", default=[], help="LoRA merged into the low noise model only")
+    ap.add_argument("--lora-high", action="append", default=[], help="LoRA merged into the high noise model only")
+    ap.add_argument("--strength", type=float, default=1.0, help="LoRA strength (default 1.0)")
+    ap.add_argument("--strength-high", type=float, help="strength for the high noise model (default: --strength)")
+    ap.add_argument("--out-dir", help="output folder (default: next to each base model)")
+    ap.add_argument("--max-shard-size", type=parse_size, default=0, help="split outputs into shards, e.g. 5GB")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="tensors merged ahead of the writer")
+    args = ap.parse_args()
+
+    jobs = []
+    for base, extra, strength in ((args.dit_low, args.lora_low, args.strength),
+                                  (args.dit_high, args.lora_high, args.strength if args.strength_high is None
+                                   else args.strength_high)):
+        loras = [(p, strength) for p in args.lora + extra]
+        if base and loras:
+            jobs.append((base, loras))
+    if not jobs:
+        print("❌ Give --dit-low and/or --dit-high and at least one LoRA.")
+        return 1
+    for path in {p for base, loras in jobs for p in [base] + [l for l, _ in loras]}:
+        if not os.path.isfile(path):
+            print(f"❌ Not found: {path}")
+            return 1
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    try:
+        for base, loras in jobs:
+            merge_model(base, loras, output_path(base, loras, args.out_dir), args.max_shard_size, args.workers)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✔️ {len(jobs)} model(s) merged")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,8 +2,9 @@ import os
 import json
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from safetensors import safe_open
-from safetensors.torch import save_file
+
+from safetensors_io import read_header, write_metadata
+from tensor_panel import TensorPanel
 
 
 class LoRAMetadataEditor:
@@ -12,6 +13,7 @@ class LoRAMetadataEditor:
         self.root.title("LoRA Metadata Editor")
         self.file_path = None
         self.metadata = {}
+        self.in_place = tk.BooleanVar(value=False)
 
         self.root.rowconfigure(0, weight=1)
         self.root.columnconfigure(0, weight=1)
@@ -24,11 +26,21 @@ class LoRAMetadataEditor:
         self.frame.columnconfigure(0, weight=1)
         self.frame.rowconfigure(1, weight=1)
 
-        self.select_button = ttk.Button(self.frame, text="Select .safetensors File", command=self.load_file)
-        self.select_button.grid(row=0, column=0, sticky="ew", pady=5)
+        self.top_frame = ttk.Frame(self.frame)
+        self.top_frame.grid(row=0, column=0, sticky="ew", pady=5)
+        self.top_frame.columnconfigure(0, weight=1)
+
+        self.select_button = ttk.Button(self.top_frame, text="Select .safetensors File", command=self.load_file)
+        self.select_button.grid(row=0, column=0, sticky="ew")
+
+        self.batch_button = ttk.Button(self.top_frame, text="Batch Inspect Folder...", command=self.open_batch_inspector)
+        self.batch_button.grid(row=0, column=1, sticky="e", padx=(5, 0))
 
-        self.entries_frame = ttk.LabelFrame(self.frame, text="Metadata")
-        self.entries_frame.grid(row=1, column=0, sticky="nsew", pady=5)
+        self.notebook = ttk.Notebook(self.frame)
+        self.notebook.grid(row=1, column=0, sticky="nsew", pady=5)
+
+        self.entries_frame = ttk.Frame(self.notebook, padding=5)
+        self.notebook.add(self.entries_frame, text="Metadata")
         self.entries_frame.columnconfigure(0, weight=1)
         self.entries_frame.rowconfigure(0, weight=1)
 
@@ -46,11 +58,25 @@ class LoRAMetadataEditor:
         self.entries_inner.columnconfigure(0, weight=0)
         self.entries_inner.columnconfigure(1, weight=1)
 
+        # names / shapes / offsets from the header; a tensor's bytes are read only when it is selected
+        self.tensor_panel = TensorPanel(self.notebook)
+        self.notebook.add(self.tensor_panel.frame, text="Tensors", padding=5)
+
         self.save_button = ttk.Button(self.frame, text="Save Metadata", command=self.save_metadata)
         self.save_button.grid(row=2, column=0, sticky="ew", pady=5)
 
+        # default stays a copy in "edited metadata"; in place only rewrites the header of the original
+        ttk.Checkbutton(self.frame, text="Edit the original file in place", variable=self.in_place).grid(
+            row=3, column=0, sticky="w")
+
         self.entry_widgets = {}
 
+    def open_batch_inspector(self):
+        from lora_batch_inspector import BatchInspector
+        folder = filedialog.askdirectory(title="Select Folder with .safetensors Files")
+        if folder:
+            BatchInspector(self.root, folder)
+
     def load_file(self):
         path = filedialog.askopenfilename(filetypes=[("SafeTensor files", "*.safetensors")])
         if not path:
@@ -58,12 +84,12 @@ class LoRAMetadataEditor:
 
         self.file_path = path
         try:
-            with safe_open(path, framework="pt", device="cpu") as f:
-                self.metadata = f.metadata() or {}
-                self.tensor_data = {key: f.get_tensor(key).detach().cpu() for key in f.keys()}
+            # header only: no tensor data is read, whatever the file size
+            self.metadata = read_header(path).metadata
         except Exception as e:
             messagebox.showerror("Error", f"Failed to read metadata: {e}")
             return
+        self.tensor_panel.load(path)
 
         for widget in self.entries_inner.winfo_children():
             widget.destroy()
@@ -92,14 +118,22 @@ class LoRAMetadataEditor:
             for key, (widget, is_text) in self.entry_widgets.items():
                 self.metadata[key] = widget.get("1.0", "end-1c") if is_text else widget.get()
 
-            base_dir = os.path.dirname(self.file_path)
-            file_name = os.path.basename(self.file_path)
-            output_dir = os.path.join(base_dir, "edited metadata")
-            os.makedirs(output_dir, exist_ok=True)
-            output_path = os.path.join(output_dir, file_name)
-
-            save_file(self.tensor_data, output_path, metadata=self.metadata)
-            messagebox.showinfo("Saved", f"Metadata written to:\n{output_path}")
+            if self.in_place.get():
+                output_path = self.file_path
+                # the tensor tab maps the file; a rewritten header replaces it, which Windows refuses while mapped
+                self.tensor_panel.close()
+                try:
+                    how = write_metadata(self.file_path, self.metadata)
+                finally:
+                    self.tensor_panel.load(self.file_path)
+            else:
+                base_dir = os.path.dirname(self.file_path)
+                file_name = os.path.basename(self.file_path)
+                output_dir = os.path.join(base_dir, "edited metadata")
+                os.makedirs(output_dir, exist_ok=True)
+                output_path = os.path.join(output_dir, file_name)
+                how = write_metadata(self.file_path, self.metadata, output_path)
+            messagebox.showinfo("Saved", f"Metadata written to:\n{output_path}\n({how})")
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save metadata: {e}")
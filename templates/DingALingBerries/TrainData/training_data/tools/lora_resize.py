@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# lora_resize.py — shrink a trained LoRA to a lower rank on CPU (SVD of each up/down pair).
+# - Per module, delta W = up @ down (out x in) has rank <= r, so its SVD comes from an r x r core:
+#   with R_u^T R_u = up^T up and R_d^T R_d = down down^T (streamed Gram matrices), svd(R_u R_d^T)
+#   gives the singular values of up @ down exactly. No out x in matrix is ever formed.
+# - New rank per module: --rank K (fixed) or --energy 0.95 (smallest rank keeping that share of
+#   the squared singular values), clamped by --min-rank / --max-rank.
+# - The new factors are up @ T_u and T_d^T @ down (r x k transforms), streamed chunk by chunk
+#   into the output file (safetensors_io.SafetensorsWriter); modules run in parallel.
+# - Keeps each module's alpha / rank scale, so the LoRA strength you use stays the same, and
+#   updates ss_network_dim / ss_network_alpha ("Dynamic" for --energy, like kohya's resize).
+#
+# Usage:
+#   python lora_resize.py input.safetensors [--rank K | --energy 0.95] [--out OUT]
+#                         [--min-rank N] [--max-rank N] [--workers N]
+
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from lora_keys import group_modules
+from lora_epoch_stats import col_chunks, down_gram, matrix2d, row_chunks, up_gram
+from safetensors_hash import drop_hashes
+from safetensors_io import SafetensorsWriter, TensorFile, from_float32
+
+DEFAULT_WORKERS = os.cpu_count() or 4
+EPS = 1e-12
+
+# ---------------------- PLANNING ----------------------
+
+def gram_factors(g):
+    """
+    (R, R_pinv) with R^T R = g; R_pinv drops directions with no energy.
+    """
+    w, v = np.linalg.eigh(g)
+    w = np.clip(w, 0, None)
+    root = np.sqrt(w)
+    keep = root > root.max() * 1e-10 if root.size and root.max() > 0 else np.zeros_like(root, bool)
+    inv = np.where(keep, 1.0 / np.where(keep, root, 1.0), 0.0)
+    return root[:, None] * v.T, v * inv[None, :]
+
+def choose_rank(s, rank=None, energy=None, min_rank=1, max_rank=None):
+    if rank is not None:
+        k = rank
+    else:
+        e = s ** 2
+        total = e.sum()
+        k = int(np.searchsorted(np.cumsum(e) / total, energy - 1e-12) + 1) if total > 0 else 1
+    if max_rank:
+        k = min(k, max_rank)
+    return max(1, min(max(k, min_rank), len(s)))
+
+def plan_module(tf, parts, opts):
+    """
+    SVD of one module. Returns dict with new rank, transforms and kept energy.
+    """
+    ru, ru_inv = gram_factors(up_gram(tf, parts["up"]))
+    rd, rd_inv = gram_factors(down_gram(tf, parts["down"]))
+    a, s, bt = np.linalg.svd(ru @ rd.T)
+    k = choose_rank(s, opts.rank, opts.energy, opts.min_rank, opts.max_rank)
+    sq = np.sqrt(s[:k])
+    total = float((s ** 2).sum())
+    return {
+        "rank": tf.shape(parts["down"])[0],
+        "new_rank": k,
+        "t_up": ru_inv @ a[:, :k] * sq[None, :],       # up' = up @ t_up          [out, k]
+        "t_down": rd_inv @ bt[:k].T * sq[None, :],     # down' = t_down^T @ down  [k, in]
+        "kept": float((s[:k] ** 2).sum()) / total if total > EPS else 1.0,
+    }
+
+# ---------------------- WRITING ----------------------
+
+def resized_shape(shape, k, axis):
+    shape = list(shape)
+    shape[axis] = k
+    return tuple(shape)
+
+def module_chunks(tf, parts, plan):
+    """
+    Byte chunks of the new up, then the new down tensor.
+    """
+    up, down = parts["up"], parts["down"]
+    t_up, t_down = plan["t_up"], plan["t_down"]
+    a = matrix2d(tf, up)
+    up_chunks = [from_float32(c @ t_up, tf.dtype(up)) for c in row_chunks(tf, up, a)]
+    b = matrix2d(tf, down)
+    # down' is [k, in]: built column block by column block, then laid out row-major
+    cols = [t_down.T @ c for c in col_chunks(tf, down, b)]
+    down_new = from_float32(np.concatenate(cols, axis=1) if cols else np.zeros((plan["new_rank"], 0)), tf.dtype(down))
+    return up_chunks, down_new
+
+def alpha_value(tf, parts, rank, new_rank):
+    """
+    New alpha so alpha / rank (the strength scale) is unchanged.
+    """
+    if "alpha" not in parts:
+        return None
+    alpha = float(tf.float32(parts["alpha"]).reshape(-1)[0])
+    return alpha * new_rank / rank
+
+def resize(path, out_path, opts, workers=DEFAULT_WORKERS, log=print):
+    with TensorFile(path) as tf:
+        modules = group_modules(tf.keys())
+        if not modules:
+            raise ValueError("no LoRA up/down pairs in this file")
+        with ThreadPoolExecutor(max(1, workers)) as pool:
+            plans = dict(zip(modules, pool.map(lambda m: plan_module(tf, modules[m], opts), modules)))
+
+        owner = {}
+        for m, parts in modules.items():
+            for part, name in parts.items():
+                owner[name] = (m, part)
+        specs = {}
+        for name in tf.keys():
+            dtype, shape = tf.dtype(name), tf.shape(name)
+            if name in owner:
+                m, part = owner[name]
+                k = plans[m]["new_rank"]
+                if part == "up":
+                    shape = resized_shape(shape, k, 1)
+                elif part == "down":
+                    shape = resized_shape(shape, k, 0)
+            specs[name] = (dtype, shape)
+
+        metadata = drop_hashes(tf.metadata)
+        ranks = [p["new_rank"] for p in plans.values()]
+        old_dim = metadata.get("ss_network_dim")
+        old_alpha = metadata.get("ss_network_alpha")
+        if opts.energy is not None and len(set(ranks)) > 1:
+            metadata["ss_network_dim"] = "Dynamic"
+            metadata["ss_network_alpha"] = "Dynamic"
+            how = f"dynamic resize with energy: {opts.energy}"
+        else:
+            k = max(ranks)
+            metadata["ss_network_dim"] = str(k)
+            try:
+                metadata["ss_network_alpha"] = f"{float(old_alpha) * k / float(old_dim):g}"
+            except (TypeError, ValueError, ZeroDivisionError):
+                pass
+            how = f"resize to rank {k}"
+        comment = metadata.get("ss_training_comment", "")
+        metadata["ss_training_comment"] = f"{how} from {old_dim}; {comment}" if comment else f"{how} from {old_dim}"
+
+        # compute modules in parallel, write them in file order; a small window bounds memory
+        order = list(specs)
+        module_order = list(dict.fromkeys(owner[n][0] for n in order if n in owner and owner[n][1] in ("up", "down")))
+        window = max(2, workers * 2)
+        with SafetensorsWriter(out_path, specs, metadata) as w, ThreadPoolExecutor(max(1, workers)) as pool:
+            pending, queued = {}, iter(module_order)
+
+            def fill():
+                while len(pending) < window:
+                    m = next(queued, None)
+                    if m is None:
+                        return
+                    pending[m] = pool.submit(module_chunks, tf, modules[m], plans[m])
+
+            fill()
+            results, written = {}, {}
+            for name in order:
+                m, part = owner.get(name, (None, None))
+                if part in ("up", "down"):
+                    if m not in results:
+                        results[m] = pending.pop(m).result()
+                        fill()
+                    up_chunks, down_new = results[m]
+                    if part == "up":
+                        for c in up_chunks[:-1]:
+                            w.write(name, c, partial=True)
+                        w.write(name, up_chunks[-1])
+                    else:
+                        w.write(name, down_new)
+                    written[m] = written.get(m, 0) + 1
+                    if written[m] == 2:
+                        del results[m]
+                elif part == "alpha":
+                    value = alpha_value(tf, modules[m], plans[m]["rank"], plans[m]["new_rank"])
+                    w.write(name, from_float32(np.full(tf.shape(name), value), tf.dtype(name)))
+                else:
+                    w.write(name, tf.raw(name))
+    kept = [p["kept"] for p in plans.values()]
+    log(f"{len(plans)} modules: rank {min(p['rank'] for p in plans.values())}-{max(p['rank'] for p in plans.values())}"
+        f" -> {min(ranks)}-{max(ranks)} (mean {np.mean(ranks):.1f}), energy kept min {min(kept):.4f} / mean {np.mean(kept):.4f}")
+    return plans
+
+# ---------------------- CLI ----------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Reduce the rank of a LoRA with per-module SVD.")
+    ap.add_argument("input", nargs="?", help="LoRA .safetensors")
+    group = ap.add_mutually_exclusive_group()
+    group.add_argument("--rank", type=int, help="fixed new rank for every module")
+    group.add_argument("--energy", type=float, help="keep this share of each module's energy (e.g. 0.95)")
+    ap.add_argument("--min-rank", type=int, default=1, help="lower bound for --energy")
+    ap.add_argument("--max-rank", type=int, help="upper bound for --energy")
+    ap.add_argument("--out", help="output file (default: <name>_r<rank>.safetensors next to the input)")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="modules processed in parallel")
+    opts = ap.parse_args()
+
+    path = opts.input
+    if not path:
+        from tkinter import filedialog, Tk
+        root = Tk()
+        root.withdraw()
+        path = filedialog.askopenfilename(title="Select LoRA to Resize", filetypes=[("SafeTensor files", "*.safetensors")])
+    if not path or not os.path.isfile(path):
+        print("❌ No valid file selected.")
+        return 1
+    if opts.rank is None and opts.energy is None:
+        opts.energy = 0.95
+    if opts.energy is not None and not 0 < opts.energy <= 1:
+        print("❌ --energy must be in (0, 1].")
+        return 1
+    if opts.rank is not None and opts.rank < 1:
+        print("❌ --rank must be at least 1.")
+        return 1
+    tag = f"r{opts.rank}" if opts.rank is not None else f"e{opts.energy:g}"
+    out = opts.out or f"{os.path.splitext(path)[0]}_{tag}.safetensors"
+
+    try:
+        resize(path, out, opts, opts.workers)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    before, after = os.path.getsize(path), os.path.getsize(out)
+    print(f"✔️ {out}\n   {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB ({after / before:.0%})")
+
+if __name__ == "__main__":
+    sys.exit(main())
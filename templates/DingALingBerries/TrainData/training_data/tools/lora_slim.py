@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# lora_slim.py — smaller copy of a LoRA for sharing: cast to fp16 / bf16 and drop near-empty modules.
+# - Streams: the input is memory-mapped (safetensors_io.TensorFile) and each tensor is converted
+#   in CHUNK_ELEMS slices straight into the output (SafetensorsWriter), so peak memory is a chunk,
+#   not the file. Tensors already in the target dtype, and integer / fp8 tensors, are copied as-is.
+# - --prune F drops every module whose weight delta ||up @ down * alpha / rank|| is below F times
+#   the largest module's (norms come from small rank x rank Gram matrices, lora_epoch_stats.py).
+# - Prints the size before / after, how much each step saved, and the pruned modules.
+#
+# Usage:
+#   python lora_slim.py input.safetensors [--dtype fp16|bf16|fp32] [--prune 0.01] [--out OUT]
+#                       [--workers N] [--list]
+
+import os
+import sys
+import math
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from lora_keys import group_modules
+from lora_epoch_stats import CHUNK_ELEMS, down_gram, scale_of, up_gram
+from safetensors_hash import drop_hashes
+from safetensors_io import DTYPE_SIZES, SafetensorsWriter, TensorFile, from_float32, to_float32
+
+DTYPES = {"fp16": "F16", "bf16": "BF16", "fp32": "F32"}
+CONVERTIBLE = {"F16", "BF16", "F32", "F64"}
+DEFAULT_WORKERS = os.cpu_count() or 4
+
+# ---------------------- PRUNING ----------------------
+
+def module_norm(tf, parts):
+    """
+    Frobenius norm of up @ down * scale: ||U D||^2 = sum((U^T U) * (D D^T)).
+    """
+    gu = up_gram(tf, parts["up"])
+    gd = down_gram(tf, parts["down"])
+    return abs(scale_of(tf, parts)) * math.sqrt(max(float((gu * gd).sum()), 0.0))
+
+def module_norms(tf, modules, workers=DEFAULT_WORKERS):
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        return dict(zip(modules, pool.map(lambda m: module_norm(tf, modules[m]), modules)))
+
+def pruned_modules(norms, fraction):
+    """
+    Modules whose norm is below fraction * the largest one.
+    """
+    if not norms or not fraction:
+        return set()
+    limit = max(norms.values()) * fraction
+    return {m for m, n in norms.items() if n < limit}
+
+# ---------------------- CONVERSION ----------------------
+
+def converted_chunks(tf, name, dtype):
+    """
+    Raw output bytes of one tensor in dtype, CHUNK_ELEMS elements at a time.
+    """
+    raw = tf.raw(name).reshape(-1)
+    for i in range(0, raw.size, CHUNK_ELEMS):
+        yield from_float32(to_float32(raw[i:i + CHUNK_ELEMS], tf.dtype(name)), dtype)
+
+def slim(path, out_path, dtype=None, prune=0.0, workers=DEFAULT_WORKERS):
+    """
+    Writes the slimmed file; returns a report dict (sizes in bytes, pruned {module: norm}).
+    """
+    with TensorFile(path) as tf:
+        modules = group_modules(tf.keys())
+        norms = module_norms(tf, modules, workers) if prune else {}
+        dropped = pruned_modules(norms, prune)
+        dropped_names = {n for m in dropped for n in modules[m].values()}
+
+        specs, pruned_bytes = {}, 0
+        for name in tf.keys():
+            size = tf.header.nbytes(name)
+            if name in dropped_names:
+                pruned_bytes += size
+                continue
+            src = tf.dtype(name)
+            specs[name] = (dtype if dtype and src in CONVERTIBLE else src, tf.shape(name))
+
+        with SafetensorsWriter(out_path, specs, drop_hashes(tf.metadata)) as w:
+            for name, (out_dtype, shape) in specs.items():
+                if out_dtype == tf.dtype(name) or not math.prod(shape):
+                    w.write(name, tf.raw(name))
+                    continue
+                chunks = converted_chunks(tf, name, out_dtype)
+                prev = next(chunks)
+                for chunk in chunks:
+                    w.write(name, prev, partial=True)
+                    prev = chunk
+                w.write(name, prev)
+        kept_bytes = sum(tf.header.nbytes(n) for n in specs)
+        cast_bytes = sum(DTYPE_SIZES[d] * math.prod(s) for d, s in specs.values())
+    return {
+        "before": os.path.getsize(path),
+        "after": os.path.getsize(out_path),
+        "pruned_bytes": pruned_bytes,
+        "cast_saved": kept_bytes - cast_bytes,
+        "modules": len(modules),
+        "pruned": {m: norms[m] for m in sorted(dropped, key=norms.get)},
+        "max_norm": max(norms.values()) if norms else None,
+    }
+
+# ---------------------- CLI ----------------------
+
+def mb(n):
+    return f"{n / 1e6:.1f} MB"
+
+def main():
+    ap = argparse.ArgumentParser(description="Cast a LoRA to fp16/bf16 and prune near-empty modules, streamed.")
+    ap.add_argument("input", nargs="?", help="LoRA .safetensors")
+    ap.add_argument("--dtype", choices=list(DTYPES), help="cast float tensors to this precision")
+    ap.add_argument("--prune", type=float, default=0.0,
+                    help="drop modules with norm below this fraction of the largest (e.g. 0.01)")
+    ap.add_argument("--out", help="output file (default: <name>_<dtype>[_pruned].safetensors next to the input)")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="modules measured in parallel")
+    ap.add_argument("--list", action="store_true", help="print every pruned module with its norm")
+    args = ap.parse_args()
+
+    path = args.input
+    if not path:
+        from tkinter import filedialog, Tk
+        root = Tk()
+        root.withdraw()
+        path = filedialog.askopenfilename(title="Select LoRA to Slim", filetypes=[("SafeTensor files", "*.safetensors")])
+    if not path or not os.path.isfile(path):
+        print("❌ No valid file selected.")
+        return 1
+    if not args.dtype and not args.prune:
+        print("❌ Nothing to do: give --dtype and/or --prune.")
+        return 1
+    if not 0 <= args.prune < 1:
+        print("❌ --prune must be in [0, 1).")
+        return 1
+    tags = ([args.dtype] if args.dtype else []) + (["pruned"] if args.prune else [])
+    out = args.out or f"{os.path.splitext(path)[0]}_{'_'.join(tags)}.safetensors"
+
+    try:
+        report = slim(path, out, DTYPES.get(args.dtype), args.prune, args.workers)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    before, after = report["before"], report["after"]
+    print(f"✔️ {out}\n   {mb(before)} -> {mb(after)} ({after / before:.0%}, saved {mb(before - after)})")
+    if args.dtype:
+        print(f"   cast to {args.dtype}: -{mb(report['cast_saved'])}")
+    if args.prune:
+        print(f"   pruned {len(report['pruned'])}/{report['modules']} module(s) below "
+              f"{args.prune:g} x {report['max_norm']:.4g}: -{mb(report['pruned_bytes'])}")
+        shown = report["pruned"].items() if args.list else list(report["pruned"].items())[-5:]
+        for m, n in shown:
+            print(f"     {n:.4g}  {m}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,15 +2,18 @@ import os
 import sys
 import json
 import math
+import asyncio
 import threading
 import subprocess
 import queue as queue_module
 import tempfile
 import time
-import re
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
+from frame_source import AnimatedFrameSource, ffmpeg_input, is_animated_image
+from ffmpeg_jobs import JobEngine, JobLog, TkDispatcher
+
 # ------------- CONFIG / CONSTANTS -------------
 
 # Default target size (MB) that is safely under Discord's 10 MB limit.
@@ -18,6 +21,8 @@ DEFAULT_TARGET_MB = 9.4  # 9.4 * 1024 * 1024 bytes ≈ 9.85 MiB, comfortably und
 
 FFMPEG_BIN = "ffmpeg"
 FFPROBE_BIN = "ffprobe"
+PROBE_TIMEOUT = 60  # seconds before a hung ffprobe is given up on
+PROGRESS_LOG_SECS = 5.0  # per file; the queue row itself refreshes at the dispatcher rate
 
 
 # ------------- HELPER FUNCTIONS -------------
@@ -27,7 +32,7 @@ def bytes_from_mb(mb_value: float) -> int:
     return int(mb_value * 1024 * 1024)
 
 
-def run_subprocess(cmd, capture_output=False):
+def run_subprocess(cmd, capture_output=False, timeout=None):
     """
     Run a subprocess. If capture_output=True, return (returncode, stdout, stderr).
     """
@@ -38,7 +43,8 @@ def run_subprocess(cmd, capture_output=False):
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
                 text=True,
-                check=False
+                check=False,
+                timeout=timeout
             )
             return proc.returncode, proc.stdout, proc.stderr
         else:
@@ -49,13 +55,19 @@ def run_subprocess(cmd, capture_output=False):
             f"Could not find command: {cmd[0]}\n"
             "Make sure ffmpeg/ffprobe are installed and on your PATH."
         )
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"{cmd[0]} timed out after {timeout}s")
 
 
 def probe_media(path):
     """
     Use ffprobe to get metadata: type, duration, width, height, fps, audio_bitrate.
     Returns a dict or raises RuntimeError.
+    Animated WebP/GIF (which ffprobe can't read) are probed from their headers.
     """
+    if is_animated_image(path):
+        return AnimatedFrameSource(path).probe()
+
     cmd = [
         FFMPEG_BIN.replace("ffmpeg", "ffprobe") if FFMPEG_BIN != "ffmpeg" else FFPROBE_BIN,
         "-v", "quiet",
@@ -64,7 +76,7 @@ def probe_media(path):
         "-show_streams",
         path
     ]
-    rc, out, err = run_subprocess(cmd, capture_output=True)
+    rc, out, err = run_subprocess(cmd, capture_output=True, timeout=PROBE_TIMEOUT)
     if rc != 0:
         raise RuntimeError(f"ffprobe failed for {path}:\n{err}")
 
@@ -176,44 +188,28 @@ def compute_scaled_dimensions(src_w, src_h, max_dim):
     return new_w, new_h
 
 
-def parse_ffmpeg_time_to_seconds(timestr):
+async def run_ffmpeg(engine, cmd, feeder, duration, progress_callback):
     """
-    Parse ffmpeg time string like "00:01:23.45" to seconds (float).
+    Run one ffmpeg pass on the shared JobEngine loop. Progress comes from ffmpeg's
+    -progress stream: progress_callback(percentage or None, metrics), where metrics has
+    frames, fps, speed, out_time and total_size. feeder is an optional frame source
+    streamed into stdin. Returns the ProcessResult (returncode, stderr_tail).
     """
-    try:
-        parts = timestr.split(":")
-        if len(parts) != 3:
-            return 0.0
-        h, m, s = parts
-        return int(h) * 3600 + int(m) * 60 + float(s)
-    except Exception:
-        return 0.0
+    def on_progress(metrics):
+        pct = None
+        if duration > 0 and metrics["out_time"] is not None:
+            pct = max(0.0, min(100.0, (metrics["out_time"] / duration) * 100.0))
+        progress_callback(pct, metrics)
 
+    return await engine.run_process(cmd, on_progress=on_progress, stdin_source=feeder)
 
-def read_ffmpeg_progress(proc, duration, progress_callback, stop_flag):
+
+def temp_job_path(prefix, output_path, ext=""):
     """
-    Read ffmpeg stderr lines, extract 'time=' to estimate progress.
-    Call progress_callback(percentage, time_seconds, raw_line).
+    Per-job temp file name, so parallel jobs never share pass logs or palettes.
     """
-    time_pattern = re.compile(r"time=(\d+:\d+:\d+\.\d+)")
-    while True:
-        if stop_flag.is_set():
-            break
-        line = proc.stderr.readline()
-        if not line:
-            break
-
-        line = line.strip()
-        match = time_pattern.search(line)
-        if match and duration > 0:
-            t = parse_ffmpeg_time_to_seconds(match.group(1))
-            pct = max(0.0, min(100.0, (t / duration) * 100.0))
-            progress_callback(pct, t, line)
-        else:
-            # Still send raw lines in case they contain warnings/errors
-            progress_callback(None, None, line)
-
-    proc.wait()
+    tag = abs(hash(os.path.abspath(output_path)))
+    return os.path.join(tempfile.gettempdir(), f"{prefix}_{os.getpid()}_{tag}{ext}")
 
 
 def format_duration(seconds):
@@ -231,9 +227,25 @@ def format_duration(seconds):
         return f"{m:d}:{s:02d}"
 
 
+def format_progress(pct, metrics):
+    """
+    One-line summary of a -progress block: "42.0% | 310 frames | 95.2 fps | 3.81x | 1.4 MB".
+    """
+    parts = [f"{pct:.1f}%" if pct is not None else "--"]
+    if metrics.get("frames") is not None:
+        parts.append(f"{metrics['frames']} frames")
+    if metrics.get("fps"):
+        parts.append(f"{metrics['fps']:.1f} fps")
+    if metrics.get("speed"):
+        parts.append(f"{metrics['speed']:.2f}x")
+    if metrics.get("total_size"):
+        parts.append(f"{metrics['total_size'] / (1024 * 1024):.1f} MB")
+    return " | ".join(parts)
+
+
 # ------------- ENCODING FUNCTIONS -------------
 
-def encode_audio_to_mp3(input_path, output_path, target_bytes, duration, progress_callback, stop_flag):
+async def encode_audio_to_mp3(engine, input_path, output_path, target_bytes, duration, progress_callback):
     total_bits = target_bytes * 8
     if duration <= 0:
         # Fallback to some arbitrary duration to avoid div-by-zero
@@ -244,22 +256,22 @@ def encode_audio_to_mp3(input_path, output_path, target_bytes, duration, progres
         bps = 8000
     kbps = int(bps / 1000)
 
+    in_args, feeder = ffmpeg_input(input_path)
     cmd = [
         FFMPEG_BIN,
         "-y",
-        "-i", input_path,
+        *in_args,
         "-vn",
         "-c:a", "libmp3lame",
         "-b:a", f"{kbps}k",
         output_path,
     ]
 
-    proc = subprocess.Popen(cmd, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
-    read_ffmpeg_progress(proc, duration, progress_callback, stop_flag)
-    return proc.returncode
+    return await run_ffmpeg(engine, cmd, feeder, duration, progress_callback)
 
 
-def encode_video_to_mp4(
+async def encode_video_to_mp4(
+    engine,
     input_path,
     output_path,
     target_bytes,
@@ -268,8 +280,7 @@ def encode_video_to_mp4(
     max_dim,
     fps_override,
     two_pass,
-    progress_callback,
-    stop_flag
+    progress_callback
 ):
     total_bits = target_bytes * 8
     if duration <= 0:
@@ -301,6 +312,8 @@ def encode_video_to_mp4(
     video_kbps = int(video_bps / 1000)
     audio_kbps = int(audio_bps / 1000)
 
+    in_args, feeder = ffmpeg_input(input_path)
+
     # Scaling
     vf_filters = []
     src_w = src_info.get("width", 0)
@@ -322,17 +335,14 @@ def encode_video_to_mp4(
 
     # Two-pass or one-pass
     if two_pass:
-        # Passlog in temp dir
-        passlogfile = os.path.join(
-            tempfile.gettempdir(),
-            f"compress_passlog_{os.getpid()}"
-        )
+        # Passlog in temp dir (unique per job)
+        passlogfile = temp_job_path("compress_passlog", output_path)
 
         # First pass (video only, no audio)
         cmd1 = [
             FFMPEG_BIN,
             "-y",
-            "-i", input_path,
+            *in_args,
             "-c:v", "libx264",
             "-b:v", f"{video_kbps}k",
             "-pass", "1",
@@ -350,57 +360,45 @@ def encode_video_to_mp4(
             "NUL" if os.name == "nt" else "/dev/null"
         ])
 
-        proc1 = subprocess.Popen(cmd1, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
-        read_ffmpeg_progress(proc1, duration, progress_callback, stop_flag)
-        rc1 = proc1.returncode
-
-        if rc1 != 0 or stop_flag.is_set():
-            # Clean up pass logs
-            for ext in (".log", "-0.log", ".log.mbtree"):
+        try:
+            res1 = await run_ffmpeg(engine, cmd1, feeder, duration, progress_callback)
+            if not res1.ok:
+                return res1
+
+            # Second pass (with audio)
+            cmd2 = [
+                FFMPEG_BIN,
+                "-y",
+                *in_args,
+                "-c:v", "libx264",
+                "-b:v", f"{video_kbps}k",
+                "-pass", "2",
+                "-passlogfile", passlogfile,
+                "-c:a", "aac",
+                "-b:a", f"{audio_kbps}k",
+            ]
+            if vf_arg:
+                cmd2.extend(["-vf", vf_arg])
+            if fps_arg:
+                cmd2.extend(["-r", fps_arg])
+
+            cmd2.append(output_path)
+
+            return await run_ffmpeg(engine, cmd2, feeder, duration, progress_callback)
+        finally:
+            # Clean up pass logs (also when the job is cancelled)
+            for ext in (".log", "-0.log", ".log.mbtree", "-0.log.mbtree"):
                 try:
                     os.remove(passlogfile + ext)
                 except OSError:
                     pass
-            return rc1
-
-        # Second pass (with audio)
-        cmd2 = [
-            FFMPEG_BIN,
-            "-y",
-            "-i", input_path,
-            "-c:v", "libx264",
-            "-b:v", f"{video_kbps}k",
-            "-pass", "2",
-            "-passlogfile", passlogfile,
-            "-c:a", "aac",
-            "-b:a", f"{audio_kbps}k",
-        ]
-        if vf_arg:
-            cmd2.extend(["-vf", vf_arg])
-        if fps_arg:
-            cmd2.extend(["-r", fps_arg])
-
-        cmd2.append(output_path)
-
-        proc2 = subprocess.Popen(cmd2, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
-        read_ffmpeg_progress(proc2, duration, progress_callback, stop_flag)
-        rc2 = proc2.returncode
-
-        # Clean up pass logs
-        for ext in (".log", "-0.log", ".log.mbtree"):
-            try:
-                os.remove(passlogfile + ext)
-            except OSError:
-                pass
-
-        return rc2
 
     else:
         # One-pass
         cmd = [
             FFMPEG_BIN,
             "-y",
-            "-i", input_path,
+            *in_args,
             "-c:v", "libx264",
             "-b:v", f"{video_kbps}k",
             "-c:a", "aac",
@@ -413,12 +411,11 @@ def encode_video_to_mp4(
 
         cmd.append(output_path)
 
-        proc = subprocess.Popen(cmd, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
-        read_ffmpeg_progress(proc, duration, progress_callback, stop_flag)
-        return proc.returncode
+        return await run_ffmpeg(engine, cmd, feeder, duration, progress_callback)
 
 
-def encode_video_to_gif(
+async def encode_video_to_gif(
+    engine,
     input_path,
     output_path,
     target_bytes,
@@ -426,8 +423,7 @@ def encode_video_to_gif(
     src_info,
     max_dim,
     fps_override,
-    progress_callback,
-    stop_flag
+    progress_callback
 ):
     """
     Best-effort high-quality GIF.
@@ -445,11 +441,10 @@ def encode_video_to_gif(
     if fps <= 0:
         fps = 10.0  # fallback for GIF pacing
 
+    in_args, feeder = ffmpeg_input(input_path)
+
     # We use palettegen + paletteuse for better quality.
-    palette_path = os.path.join(
-        tempfile.gettempdir(),
-        f"palette_{os.getpid()}.png"
-    )
+    palette_path = temp_job_path("palette", output_path, ".png")
 
     # First pass: generate palette
     vf_parts = [f"fps={fps}"]
@@ -460,45 +455,35 @@ def encode_video_to_gif(
     cmd1 = [
         FFMPEG_BIN,
         "-y",
-        "-i", input_path,
+        *in_args,
         "-vf", vf_palette,
         palette_path
     ]
-    proc1 = subprocess.Popen(cmd1, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
-    read_ffmpeg_progress(proc1, duration, progress_callback, stop_flag)
-    rc1 = proc1.returncode
+    try:
+        res1 = await run_ffmpeg(engine, cmd1, feeder, duration, progress_callback)
+        if not res1.ok:
+            return res1
+
+        # Second pass: use palette
+        vf_use = f"fps={fps}"
+        if new_w > 0 and new_h > 0:
+            vf_use += f",scale={new_w}:{new_h}:flags=lanczos"
+        vf_use += f"[x];[x][1:v]paletteuse"
 
-    if rc1 != 0 or stop_flag.is_set():
+        cmd2 = [
+            FFMPEG_BIN,
+            "-y",
+            *in_args,
+            "-i", palette_path,
+            "-lavfi", vf_use,
+            output_path
+        ]
+        return await run_ffmpeg(engine, cmd2, feeder, duration, progress_callback)
+    finally:
         try:
             os.remove(palette_path)
         except OSError:
             pass
-        return rc1
-
-    # Second pass: use palette
-    vf_use = f"fps={fps}"
-    if new_w > 0 and new_h > 0:
-        vf_use += f",scale={new_w}:{new_h}:flags=lanczos"
-    vf_use += f"[x];[x][1:v]paletteuse"
-
-    cmd2 = [
-        FFMPEG_BIN,
-        "-y",
-        "-i", input_path,
-        "-i", palette_path,
-        "-lavfi", vf_use,
-        output_path
-    ]
-    proc2 = subprocess.Popen(cmd2, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True)
-    read_ffmpeg_progress(proc2, duration, progress_callback, stop_flag)
-    rc2 = proc2.returncode
-
-    try:
-        os.remove(palette_path)
-    except OSError:
-        pass
-
-    return rc2
 
 
 # ------------- GUI APPLICATION -------------
@@ -512,8 +497,12 @@ class MediaCompressorGUI:
         # Queue data: list of dicts with {path, info, size_bytes, status}
         self.queue_items = []
 
-        # Threading / progress
-        self.worker_thread = None
+        # Job engine / progress: every ffmpeg child runs on one asyncio loop thread,
+        # results come back to Tk through the dispatcher.
+        self.engine = JobEngine(max_jobs=32)
+        self.ui = TkDispatcher(root)
+        self.job_log = JobLog.for_tool("media_compressor")  # ~/.cache/deadlymusubi/logs/*.jsonl
+        self.batch_future = None
         self.stop_flag = threading.Event()
         self.log_queue = queue_module.Queue()
         self.is_running = False
@@ -585,7 +574,13 @@ class MediaCompressorGUI:
             text="2-pass (MP4 only)",
             variable=self.two_pass_var
         )
-        self.chk_two_pass.grid(row=2, column=0, columnspan=4, sticky="w", pady=(5, 0))
+        self.chk_two_pass.grid(row=2, column=0, columnspan=2, sticky="w", pady=(5, 0))
+
+        # Parallel jobs
+        ttk.Label(options_frame, text="Parallel jobs:").grid(row=2, column=2, sticky="e", padx=(10, 0), pady=(5, 0))
+        self.jobs_var = tk.StringVar(value="1")
+        self.spin_jobs = ttk.Spinbox(options_frame, from_=1, to=32, width=5, textvariable=self.jobs_var)
+        self.spin_jobs.grid(row=2, column=3, sticky="w", pady=(5, 0))
 
         # Start / Stop / Exit
         buttons_frame = ttk.Frame(controls_frame)
@@ -787,6 +782,15 @@ class MediaCompressorGUI:
 
         self.two_pass_value = bool(self.two_pass_var.get())
 
+        # parallel jobs
+        try:
+            jobs = int(self.jobs_var.get())
+            if jobs <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Invalid jobs", "Parallel jobs must be a positive integer.")
+            return
+
         # Lock down controls
         self.is_running = True
         self.stop_flag.clear()
@@ -797,17 +801,19 @@ class MediaCompressorGUI:
             f"Starting batch: {len(self.queue_items)} file(s), "
             f"target size ~ {target_mb} MB per file, "
             f"video format = {self.video_format_value}, "
-            f"2-pass = {self.two_pass_value}"
+            f"2-pass = {self.two_pass_value}, "
+            f"parallel jobs = {jobs}"
         )
 
-        self.worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
-        self.worker_thread.start()
+        self.batch_future = self.engine.submit(self._run_batch(list(self.queue_items), jobs))
 
     def stop_processing(self):
         if not self.is_running:
             return
-        self.log("Stop requested. Waiting for current file to finish/abort...")
+        self.log("Stop requested. Aborting running files...")
         self.stop_flag.set()
+        if self.batch_future:
+            self.batch_future.cancel()
 
     def _set_controls_state(self, state):
         for widget in [
@@ -820,52 +826,58 @@ class MediaCompressorGUI:
             self.entry_max_dim,
             self.entry_fps,
             self.chk_two_pass,
+            self.spin_jobs,
         ]:
             widget.config(state=state)
 
-    # -------- WORKER THREAD --------
+    # -------- JOB ENGINE --------
 
-    def _worker_loop(self):
-        total = len(self.queue_items)
-        completed = 0
-        failed = 0
+    async def _run_batch(self, items, jobs):
+        """
+        Runs on the JobEngine loop: up to `jobs` files encode at once. Every UI
+        update goes through self.ui (TkDispatcher).
+        """
+        self.batch_stats = {"total": len(items), "completed": 0, "failed": 0}
+        slots = asyncio.Semaphore(jobs)
 
-        for idx, item in enumerate(self.queue_items):
-            if self.stop_flag.is_set():
-                item["status"] = "Cancelled"
-                self._update_queue_list_in_ui_thread()
-                break
+        async def one(idx, item):
+            async with slots:
+                await self._process_item(idx, item)
 
-            path = item["path"]
-            info = item["info"]
-            media_type = info["type"]
+        try:
+            await asyncio.gather(*(one(idx, item) for idx, item in enumerate(items)))
+        finally:
+            self.ui.post(self._batch_finished)
 
-            item["status"] = "Processing"
-            self._update_queue_list_in_ui_thread()
-            self.log(f"Processing [{idx + 1}/{total}]: {path} ({media_type})")
+    async def _process_item(self, idx, item):
+        total = self.batch_stats["total"]
+        path = item["path"]
+        info = item["info"]
+        media_type = info["type"]
 
-            duration = info.get("duration", 0.0) or 0.0
+        item["status"] = "Processing"
+        self._update_queue_list_in_ui_thread()
+        self.log(f"Processing [{idx + 1}/{total}]: {path} ({media_type})")
+
+        duration = info.get("duration", 0.0) or 0.0
 
+        try:
             # Determine output path and encoding mode
             if media_type == "audio":
                 # Always output MP3
                 output_path = get_unique_output_path(path, "_compressed", ".mp3")
 
-                def progress_cb(pct, t, line):
-                    if pct is not None:
-                        self.log(f"[AUDIO] {os.path.basename(path)} - {pct:.1f}% (time={t:.2f}s)")
-                    elif line:
-                        # occasional log of ffmpeg lines
-                        if "error" in line.lower():
-                            self.log(f"[AUDIO ffmpeg] {line}")
+                def progress_cb(pct, metrics):
+                    self._on_progress(item, "AUDIO", pct, metrics)
 
-                rc = encode_audio_to_mp3(
+                self.job_log.write("start", path, dst=output_path, duration=duration)
+                res = await encode_audio_to_mp3(
+                    self.engine,
                     input_path=path,
                     output_path=output_path,
                     target_bytes=self.target_bytes,
                     duration=duration,
-                    progress_callback=progress_cb,
-                    stop_flag=self.stop_flag
+                    progress_callback=progress_cb
                 )
 
             else:
@@ -877,15 +889,13 @@ class MediaCompressorGUI:
 
                 output_path = get_unique_output_path(path, "_compressed", output_ext)
 
-                def progress_cb(pct, t, line):
-                    if pct is not None:
-                        self.log(f"[VIDEO] {os.path.basename(path)} - {pct:.1f}% (time={t:.2f}s)")
-                    elif line:
-                        if "error" in line.lower():
-                            self.log(f"[VIDEO ffmpeg] {line}")
+                def progress_cb(pct, metrics):
+                    self._on_progress(item, "VIDEO", pct, metrics)
 
+                self.job_log.write("start", path, dst=output_path, duration=duration)
                 if self.video_format_value == "GIF":
-                    rc = encode_video_to_gif(
+                    res = await encode_video_to_gif(
+                        self.engine,
                         input_path=path,
                         output_path=output_path,
                         target_bytes=self.target_bytes,
@@ -893,11 +903,11 @@ class MediaCompressorGUI:
                         src_info=info,
                         max_dim=self.max_dim_value,
                         fps_override=self.fps_override_value,
-                        progress_callback=progress_cb,
-                        stop_flag=self.stop_flag
+                        progress_callback=progress_cb
                     )
                 else:
-                    rc = encode_video_to_mp4(
+                    res = await encode_video_to_mp4(
+                        self.engine,
                         input_path=path,
                         output_path=output_path,
                         target_bytes=self.target_bytes,
@@ -906,55 +916,82 @@ class MediaCompressorGUI:
                         max_dim=self.max_dim_value,
                         fps_override=self.fps_override_value,
                         two_pass=self.two_pass_value,
-                        progress_callback=progress_cb,
-                        stop_flag=self.stop_flag
+                        progress_callback=progress_cb
                     )
-
-            if rc == 0 and not self.stop_flag.is_set():
-                completed += 1
-                item["status"] = "Done"
-                # Final stats
-                src_size = os.path.getsize(path) if os.path.exists(path) else 0
-                out_size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
-                self.log(
-                    f"COMPLETED: {os.path.basename(path)} -> {os.path.basename(output_path)}\n"
-                    f"  Source size:  {src_size} bytes\n"
-                    f"  Output size:  {out_size} bytes\n"
-                    f"  Saved to:     {output_path}"
-                )
-            else:
-                if self.stop_flag.is_set():
-                    item["status"] = "Cancelled"
-                    self.log(f"Cancelled: {path}")
-                else:
-                    failed += 1
-                    item["status"] = "Failed"
-                    self.log(f"FAILED (rc={rc}): {path}")
-
+        except asyncio.CancelledError:
+            item["status"] = "Cancelled"
+            self.log(f"Cancelled: {path}")
+            self.job_log.write("cancelled", path)
             self._update_queue_list_in_ui_thread()
+            raise
+        except Exception as e:
+            res = None
+            self.log(f"ERROR: {path}\n  {e}")
+
+        rc = res.returncode if res is not None else None
+        self.job_log.write("done" if rc == 0 else "failed", path, returncode=rc)
+        if rc == 0:
+            self.batch_stats["completed"] += 1
+            item["status"] = "Done"
+            # Final stats
+            src_size = os.path.getsize(path) if os.path.exists(path) else 0
+            out_size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+            self.log(
+                f"COMPLETED: {os.path.basename(path)} -> {os.path.basename(output_path)}\n"
+                f"  Source size:  {src_size} bytes\n"
+                f"  Output size:  {out_size} bytes\n"
+                f"  Saved to:     {output_path}"
+            )
+        else:
+            self.batch_stats["failed"] += 1
+            item["status"] = "Failed"
+            self.log(f"FAILED (rc={rc}): {path}")
+            if res is not None and res.stderr_tail:
+                self.log("  " + "\n  ".join(res.stderr_tail[-5:]))
 
-            if self.stop_flag.is_set():
-                break
+        self._update_queue_list_in_ui_thread()
+
+    def _on_progress(self, item, tag, pct, metrics):
+        """
+        Runs on the engine loop for every -progress block. The queue row is coalesced by the
+        dispatcher; the log and the JSON log get a line at most every PROGRESS_LOG_SECS.
+        """
+        path = item["path"]
+        summary = format_progress(pct, metrics)
+        item["status"] = f"Processing {summary}"
+        self._update_queue_list_in_ui_thread()
+        self.job_log.progress(path, metrics)
+        now = time.monotonic()
+        if metrics["done"] or now - item.get("last_log", 0.0) >= PROGRESS_LOG_SECS:
+            item["last_log"] = now
+            self.log(f"[{tag}] {os.path.basename(path)} - {summary}")
 
+    def _batch_finished(self):
         # Summary
+        stats = self.batch_stats
+        if self.stop_flag.is_set():
+            for item in self.queue_items:
+                if item["status"].startswith("Processing"):
+                    item["status"] = "Cancelled"
         left = sum(1 for i in self.queue_items if i["status"] == "Pending")
         self.log(
             f"Batch complete. "
-            f"Total: {total}, Completed: {completed}, Failed: {failed}, "
+            f"Total: {stats['total']}, Completed: {stats['completed']}, Failed: {stats['failed']}, "
             f"Pending: {left}."
         )
 
         # Clear queue after batch ends, regardless of success/failure
         self.queue_items = []
-        self._update_queue_list_in_ui_thread()
+        self._update_queue_listbox()
 
         # Unlock controls
         self.is_running = False
+        self.batch_future = None
         self.stop_flag.clear()
         self._set_controls_state("normal")
 
     def _update_queue_list_in_ui_thread(self):
-        self.root.after(0, self._update_queue_listbox)
+        self.ui.post_latest("queue", self._update_queue_listbox)
 
 
 def main():
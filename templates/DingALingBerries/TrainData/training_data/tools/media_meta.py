@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+# media_meta.py — header-only metadata readers for the formats our runs produce besides PNG.
+# - WebP: RIFF chunk walk to the EXIF / XMP chunks (animated files keep them after the frames;
+#   ANMF frame chunks are seeked over, never read).
+# - JPEG: APP1 Exif / XMP and COM segments, stops at the first scan (SOS).
+# - MP4 / MOV: box walk to moov/udta and moov/meta (iTunes ilst items, mdta keys, QuickTime
+#   (c)cmt atoms); mdat is seeked over wherever it sits.
+# - safetensors: the 8-byte length + JSON header, "__metadata__" only (training ss_* keys).
+#
+# Every reader returns {keyword: text} like png_chunks.read_text_chunks, so gen_meta.extract
+# works on all of them: ComfyUI writes "prompt:" / "workflow:" into EXIF strings (animated WebP)
+# or a JSON "comment" (VHS Video Combine mp4), A1111 writes "parameters" into EXIF UserComment.
+
+import os
+import json
+import struct
+
+from png_chunks import MAX_TEXT_BYTES, read_text_chunks
+from safetensors_io import read_header
+
+MEDIA_EXTS = {".png", ".webp", ".jpg", ".jpeg", ".mp4", ".mov", ".m4v", ".safetensors"}
+GRAPH_KEYS = ("prompt", "workflow")
+
+class MediaFormatError(ValueError): pass
+
+# ---------------------- EXIF (TIFF) ----------------------
+
+EXIF_TAGS = {
+    0x010E: "description",
+    0x010F: "make",
+    0x0110: "model",
+    0x0131: "software",
+    0x013B: "artist",
+    0x9286: "parameters",   # UserComment: A1111 / Forge generation text
+    0x9C9C: "comment",      # XPComment (UTF-16LE)
+}
+EXIF_IFD_POINTER = 0x8769
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+
+def _user_comment(raw):
+    """
+    EXIF UserComment: 8-byte charset id, then the text.
+    """
+    head, body = raw[:8], raw[8:]
+    if head.startswith(b"UNICODE"):
+        # piexif writes big-endian; a leading NUL byte tells the two apart well enough
+        enc = "utf-16-be" if body[:1] == b"\0" else "utf-16-le"
+        return body.decode(enc, "replace")
+    if head.startswith(b"ASCII") or head == b"\0" * 8:
+        return body.decode("utf-8", "replace")
+    return raw.decode("utf-8", "replace")
+
+def parse_exif(data):
+    """
+    {keyword: text} from a TIFF-structured EXIF block (IFD0 + Exif IFD, text tags only).
+    "prompt:{...}" / "workflow:{...}" strings (ComfyUI) are returned under their own keyword.
+    """
+    if data.startswith(b"Exif\0\0"):
+        data = data[6:]
+    if data[:2] == b"II":
+        e = "<"
+    elif data[:2] == b"MM":
+        e = ">"
+    else:
+        raise MediaFormatError("bad EXIF byte order")
+    out = {}
+    offsets = [struct.unpack(e + "I", data[4:8])[0]]
+    seen = set()
+    while offsets:
+        off = offsets.pop()
+        if off in seen or off + 2 > len(data):
+            continue
+        seen.add(off)
+        (count,) = struct.unpack(e + "H", data[off:off + 2])
+        for i in range(count):
+            entry = data[off + 2 + 12 * i:off + 14 + 12 * i]
+            if len(entry) < 12:
+                break
+            tag, typ, n = struct.unpack(e + "HHI", entry[:8])
+            if tag == EXIF_IFD_POINTER:
+                offsets.append(struct.unpack(e + "I", entry[8:12])[0])
+                continue
+            name = EXIF_TAGS.get(tag)
+            if name is None:
+                continue
+            size = TYPE_SIZES.get(typ, 1) * n
+            if size <= 4:
+                raw = entry[8:8 + size]
+            else:
+                (at,) = struct.unpack(e + "I", entry[8:12])
+                raw = data[at:at + size]
+            if tag == 0x9286:
+                text = _user_comment(raw)
+            elif tag == 0x9C9C:
+                text = raw.decode("utf-16-le", "replace")
+            else:
+                text = raw.decode("utf-8", "replace")
+            text = text.rstrip("\0").strip()
+            if not text:
+                continue
+            key, sep, rest = text.partition(":")
+            if sep and key in GRAPH_KEYS:
+                out[key] = rest
+            else:
+                out[name] = text
+    return out
+
+# ---------------------- WEBP ----------------------
+
+def read_webp_text(path):
+    with open(path, "rb", buffering=0) as f:
+        head = f.read(12)
+        if head[:4] != b"RIFF" or head[8:12] != b"WEBP":
+            raise MediaFormatError("not a WebP file")
+        out = {}
+        while True:
+            hdr = f.read(8)
+            if len(hdr) < 8:
+                break
+            fourcc, size = struct.unpack("<4sI", hdr)
+            padded = size + (size & 1)
+            if fourcc in (b"EXIF", b"XMP "):
+                if size > MAX_TEXT_BYTES:
+                    raise MediaFormatError(f"{fourcc.decode().strip()} chunk of {size} bytes")
+                data = f.read(padded)[:size]
+                if fourcc == b"EXIF":
+                    try:
+                        out.update(parse_exif(data))
+                    except (MediaFormatError, struct.error):
+                        pass
+                else:
+                    out["xmp"] = data.decode("utf-8", "replace")
+            else:
+                f.seek(padded, 1)
+        return out
+
+# ---------------------- JPEG ----------------------
+
+XMP_ID = b"http://ns.adobe.com/xap/1.0/\0"
+
+def read_jpeg_text(path):
+    with open(path, "rb") as f:
+        if f.read(2) != b"\xff\xd8":
+            raise MediaFormatError("not a JPEG file")
+        out = {}
+        while True:
+            b = f.read(1)
+            if not b:
+                break
+            if b != b"\xff":
+                continue  # stray byte between segments
+            marker = f.read(1)
+            while marker == b"\xff":  # fill bytes
+                marker = f.read(1)
+            if not marker or marker in (b"\xda", b"\xd9"):  # SOS / EOI: image data from here on
+                break
+            if b"\xd0" <= marker <= b"\xd7" or marker == b"\x01":
+                continue  # standalone markers carry no length
+            seg = f.read(2)
+            if len(seg) < 2:
+                break
+            length = struct.unpack(">H", seg)[0] - 2
+            if marker == b"\xe1":
+                data = f.read(length)
+                if data.startswith(b"Exif\0\0"):
+                    try:
+                        out.update(parse_exif(data))
+                    except (MediaFormatError, struct.error):
+                        pass
+                elif data.startswith(XMP_ID):
+                    out["xmp"] = data[len(XMP_ID):].decode("utf-8", "replace")
+            elif marker == b"\xfe":
+                out["comment"] = f.read(length).decode("utf-8", "replace").rstrip("\0")
+            else:
+                f.seek(length, 1)
+        return out
+
+# ---------------------- MP4 / MOV ----------------------
+
+ILST_NAMES = {
+    b"\xa9cmt": "comment", b"\xa9nam": "title", b"\xa9too": "encoder", b"\xa9ART": "artist",
+    b"\xa9day": "date", b"desc": "description", b"ldes": "description", b"\xa9des": "description",
+}
+CONTAINERS = {b"moov", b"udta", b"meta", b"ilst"}
+
+def _boxes(f, start, end):
+    """
+    Yield (type, payload_start, payload_end) for the boxes in [start, end) — headers only.
+    """
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        hdr = f.read(8)
+        if len(hdr) < 8:
+            return
+        size, btype = struct.unpack(">I4s", hdr)
+        body = pos + 8
+        if size == 1:
+            ext = f.read(8)
+            if len(ext) < 8:
+                return
+            size = struct.unpack(">Q", ext)[0]
+            body += 8
+        elif size == 0:
+            size = end - pos
+        if size < body - pos:
+            return
+        yield btype, body, min(pos + size, end)
+        pos += size
+
+def _data_text(f, start, end):
+    """
+    Text of the 'data' atom inside an ilst item (8 bytes of type + locale before the value).
+    """
+    for btype, body, stop in _boxes(f, start, end):
+        if btype == b"data" and stop - body > 8 and stop - body <= MAX_TEXT_BYTES:
+            f.seek(body + 8)
+            return f.read(stop - body - 8).decode("utf-8", "replace")
+    return None
+
+def _walk_mp4(f, start, end, out, keys, depth=0):
+    if depth > 6:
+        return
+    for btype, body, stop in _boxes(f, start, end):
+        if btype == b"meta":
+            # ISO meta is a full box (4 bytes version/flags); QuickTime meta is not
+            f.seek(body)
+            peek = f.read(8)
+            if peek[4:8] not in (b"hdlr", b"keys", b"ilst"):
+                body += 4
+            _walk_mp4(f, body, stop, out, keys, depth + 1)
+        elif btype == b"keys":
+            # mdta key table (ffmpeg -movflags use_metadata_tags): ilst items are 1-based indices
+            f.seek(body + 4)
+            (count,) = struct.unpack(">I", f.read(4))
+            pos = body + 8
+            for i in range(count):
+                f.seek(pos)
+                size, _ns = struct.unpack(">I4s", f.read(8))
+                if size < 8:
+                    break
+                keys[i + 1] = f.read(size - 8).decode("utf-8", "replace")
+                pos += size
+        elif btype in CONTAINERS:
+            _walk_mp4(f, body, stop, out, keys, depth + 1)
+        elif depth >= 2 and (btype in ILST_NAMES or btype == b"----" or btype[:1] == b"\0"):
+            if btype == b"----":
+                name = None
+                for sub, sbody, sstop in _boxes(f, body, stop):
+                    if sub == b"name":
+                        f.seek(sbody + 4)
+                        name = f.read(sstop - sbody - 4).decode("utf-8", "replace")
+            elif btype[:1] == b"\0":
+                name = keys.get(struct.unpack(">I", btype)[0])
+                if name:
+                    name = name.rsplit(".", 1)[-1]  # com.apple.quicktime.comment -> comment
+            else:
+                name = ILST_NAMES[btype]
+            text = _data_text(f, body, stop)
+            if name and text is None and btype[:1] == b"\xa9":
+                # QuickTime udta text atom: 2 bytes length, 2 bytes language, text
+                f.seek(body)
+                n = struct.unpack(">H", f.read(2))[0]
+                f.seek(2, 1)
+                text = f.read(min(n, stop - body - 4)).decode("utf-8", "replace")
+            if name and text:
+                out[name] = text
+
+def read_mp4_text(path):
+    with open(path, "rb") as f:
+        end = f.seek(0, os.SEEK_END)
+        f.seek(4)
+        if f.read(4) not in (b"ftyp", b"moov", b"wide", b"free", b"mdat", b"skip"):
+            raise MediaFormatError("not an MP4/MOV file")
+        out, keys = {}, {}
+        _walk_mp4(f, 0, end, out, keys)
+    # VHS Video Combine stores {"prompt": ..., "workflow": ...} as one JSON comment
+    comment = out.get("comment", "")
+    if comment.lstrip().startswith("{"):
+        try:
+            data = json.loads(comment)
+        except ValueError:
+            data = None
+        if isinstance(data, dict) and any(k in data for k in GRAPH_KEYS):
+            del out["comment"]
+            for k, v in data.items():
+                out[k] = v if isinstance(v, str) else json.dumps(v)
+    return out
+
+# ---------------------- SAFETENSORS ----------------------
+
+def read_safetensors_text(path):
+    """
+    The "__metadata__" dict of a safetensors file (values are strings by the format's rules).
+    """
+    meta = read_header(path).metadata
+    return {str(k): v if isinstance(v, str) else json.dumps(v) for k, v in meta.items()}
+
+# ---------------------- DISPATCH ----------------------
+
+READERS = {
+    ".webp": read_webp_text,
+    ".jpg": read_jpeg_text,
+    ".jpeg": read_jpeg_text,
+    ".mp4": read_mp4_text,
+    ".mov": read_mp4_text,
+    ".m4v": read_mp4_text,
+    ".safetensors": read_safetensors_text,
+}
+
+def read_media_text(path, png_keys=None):
+    """
+    {keyword: text} for any supported file; png_keys filters PNG chunks like read_text_chunks.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".png":
+        return read_text_chunks(path, png_keys)
+    reader = READERS.get(ext)
+    if reader is None:
+        raise MediaFormatError(f"unsupported file type {ext}")
+    return reader(path)
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# model_cache.py — keep local copies of the big model files so training loads them at disk speed.
+# - Stages DIT_LOW / DIT_HIGH / VAE / T5 (any model file a launcher or config points at) from slow
+#   mounts (A:\Models, network shares, /mnt/c under WSL's 9P bridge) into a cache folder on
+#   local storage (default ~/.cache/deadlymusubi/models; use an ext4 / NVMe path under WSL).
+# - Each copy is hashed while it is copied (one read of the slow source, safetensors_hash.stream_to)
+#   and checked on every later run by size, source size + mtime, and the copy's cached sha256
+#   (safetensors_hash.HashCache), so a verified run reads nothing; --verify re-hashes the copies.
+# - --budget caps the cache size; least recently used copies not needed by this run are evicted.
+# - Launchers (.bat `set "DIT_LOW=..."`, .sh `DIT_LOW="..."`) and .toml configs are rewritten to
+#   <name>_staged.<ext> next to the original, with model paths pointing at the local copies (and
+#   a rewritten config's path swapped in too). The originals are never modified.
+# - Windows drive paths (A:\Models\..., C:/AI/...) are read through /mnt/<drive>/ when run under WSL.
+# - Re-run it before each training run: unchanged files cost a stat, changed sources are re-staged.
+#
+# Usage:
+#   python model_cache.py launcher.bat|config.toml|model.safetensors... [--cache-dir DIR]
+#                         [--budget 200GB] [--verify]
+#   python model_cache.py --list | --evict PATH | --clear
+
+import os
+import re
+import sys
+import time
+import shutil
+import hashlib
+import sqlite3
+import argparse
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+from lora_merge import format_size, parse_size
+from safetensors_hash import HashCache, hash_file, stat_key, stream_to
+
+DEFAULT_CACHE = Path.home() / ".cache" / "deadlymusubi" / "models"
+DEFAULT_BUDGET = "200GB"
+MODEL_EXTS = {".safetensors", ".pth", ".pt", ".ckpt", ".bin", ".gguf"}
+LAUNCHER_EXTS = {".bat", ".cmd", ".sh"}
+STAGED_SUFFIX = "_staged"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    source          TEXT PRIMARY KEY,
+    local           TEXT NOT NULL,
+    size            INTEGER NOT NULL,
+    source_mtime_ns INTEGER NOT NULL,
+    sha256          TEXT NOT NULL,
+    staged          REAL NOT NULL,
+    last_used       REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+BAT_SET = re.compile(r'^(\s*set\s+")([A-Za-z_][A-Za-z0-9_]*)=([^"]*)(".*)$', re.I | re.S)
+SH_SET = re.compile(r'^(\s*(?:export\s+)?)([A-Za-z_][A-Za-z0-9_]*)=("[^"]*"|\'[^\']*\'|[^\s"\'#]*)(.*)$', re.S)
+TOML_VALUE = re.compile(r'^(\s*[A-Za-z0-9_.-]+\s*=\s*)(["\'])([^"\']*)\2(.*)$', re.S)
+DRIVE_PATH = re.compile(r"^([A-Za-z]):[\\/](.*)$")
+
+# ---------------------- PATHS ----------------------
+
+def native_path(path):
+    """
+    Path as this OS sees it: A:\\Models\\x -> /mnt/a/Models/x when run under Linux / WSL.
+    """
+    m = DRIVE_PATH.match(path)
+    if m and os.name != "nt":
+        return f"/mnt/{m.group(1).lower()}/{m.group(2).replace(chr(92), '/')}"
+    return path
+
+def expand_vars(value, env, style):
+    """
+    %NAME% (bat) or $NAME / ${NAME} (sh) from the variables set earlier in the launcher.
+    """
+    if style == "bat":
+        return re.sub(r"%([A-Za-z_][A-Za-z0-9_]*)%", lambda m: env.get(m.group(1).upper(), m.group(0)), value)
+    return re.sub(r"\$\{?([A-Za-z_][A-Za-z0-9_]*)\}?", lambda m: env.get(m.group(1), m.group(0)), value)
+
+def staged_name(path):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}{STAGED_SUFFIX}{ext}"
+
+def _ext(path):
+    return os.path.splitext(path)[1].lower()
+
+# ---------------------- CACHE ----------------------
+
+class ModelCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE, budget=parse_size(DEFAULT_BUDGET), log=print):
+        self.dir = Path(cache_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.budget = budget
+        self.log = log
+        self.conn = sqlite3.connect(str(self.dir / "index.sqlite"))
+        self.conn.executescript(SCHEMA)
+        self.hashes = HashCache()
+        self.in_use = set()          # sources needed by this run; never evicted for each other
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+        self.hashes.close()
+
+    def remember_budget(self):
+        """
+        Record the budget this run stages under, for --list.
+        """
+        self.conn.execute("INSERT OR REPLACE INTO settings VALUES ('budget', ?)", (str(self.budget),))
+        self.conn.commit()
+
+    def stored_budget(self):
+        row = self.conn.execute("SELECT value FROM settings WHERE key = 'budget'").fetchone()
+        return int(row[0]) if row else None
+
+    def entries(self):
+        rows = self.conn.execute("SELECT source, local, size, source_mtime_ns, sha256, staged, last_used "
+                                 "FROM entries ORDER BY last_used").fetchall()
+        return [SimpleNamespace(source=r[0], local=r[1], size=r[2], source_mtime_ns=r[3], sha256=r[4],
+                                staged=r[5], last_used=r[6]) for r in rows]
+
+    def entry(self, source):
+        return next((e for e in self.entries() if e.source == source), None)
+
+    def total(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def remove(self, e):
+        if os.path.exists(e.local):
+            os.remove(e.local)
+            try:
+                os.rmdir(os.path.dirname(e.local))
+            except OSError:
+                pass
+        self.conn.execute("DELETE FROM entries WHERE source = ?", (e.source,))
+        self.conn.commit()
+
+    def make_room(self, size):
+        """
+        Evict least recently used copies until size more bytes fit the budget and the disk.
+        """
+        for e in self.entries():
+            free = shutil.disk_usage(self.dir).free
+            if self.total() + size <= self.budget and size < free:
+                return True
+            if e.source not in self.in_use:
+                self.log(f"   evicting {os.path.basename(e.local)} ({format_size(e.size)}, unused since "
+                         f"{time.strftime('%Y-%m-%d', time.localtime(e.last_used))})")
+                self.remove(e)
+        return self.total() + size <= self.budget and size < shutil.disk_usage(self.dir).free
+
+    # ---- checking ----
+
+    def copy_hash(self, local, force=False):
+        size, mtime_ns = stat_key(local)
+        cached = {} if force else self.hashes.get(local, size, mtime_ns)
+        if "sha256" not in cached:
+            cached = {k: v for k, v in hash_file(local, full=True, data=False).items() if v}
+            self.hashes.put(local, size, mtime_ns, cached)
+            self.hashes.conn.commit()
+        return cached["sha256"]
+
+    def valid(self, e, source, force=False):
+        """
+        Copy is usable: right size, source unchanged (when reachable), hash matches.
+        """
+        if not os.path.isfile(e.local) or os.path.getsize(e.local) != e.size:
+            return False, "copy missing or truncated"
+        if os.path.isfile(source) and stat_key(source) != (e.size, e.source_mtime_ns):
+            return False, "source changed"
+        if self.copy_hash(e.local, force) != e.sha256:
+            return False, "copy hash mismatch"
+        return True, None
+
+    # ---- staging ----
+
+    def stage(self, path, verify=False):
+        """
+        Local copy of path (staged now if needed), or None to keep using the original.
+        """
+        source = os.path.abspath(native_path(path))
+        self.in_use.add(source)
+        e = self.entry(source)
+        if e:
+            ok, why = self.valid(e, source, verify)
+            if ok:
+                self.conn.execute("UPDATE entries SET last_used = ? WHERE source = ?", (time.time(), source))
+                self.conn.commit()
+                self.log(f"✔️ {os.path.basename(source)}: cached")
+                return e.local
+            self.log(f"   {os.path.basename(source)}: {why}, staging again")
+            self.remove(e)
+        if not os.path.isfile(source):
+            self.log(f"❌ {path}: not found, left as is")
+            return None
+        size, mtime_ns = stat_key(source)
+        if size > self.budget or not self.make_room(size):
+            self.log(f"❌ {os.path.basename(source)}: {format_size(size)} does not fit the {format_size(self.budget)} budget / disk, left as is")
+            return None
+        return self.copy_in(source, size, mtime_ns)
+
+    def copy_in(self, source, size, mtime_ns):
+        folder = self.dir / hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+        folder.mkdir(exist_ok=True)
+        local = str(folder / os.path.basename(source))
+        self.log(f"   staging {os.path.basename(source)} ({format_size(size)}) ...")
+        start = time.time()
+        h = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(prefix=".stage_", suffix=".tmp", dir=folder)
+        try:
+            with open(source, "rb", buffering=0) as src, os.fdopen(fd, "wb") as dst:
+                stream_to(src, [h, SimpleNamespace(update=dst.write)])
+            if os.path.getsize(tmp) != size or stat_key(source) != (size, mtime_ns):
+                raise OSError(f"{source} changed while it was copied")
+            shutil.copystat(source, tmp)
+            os.replace(tmp, local)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        digest = h.hexdigest()
+        known = self.hashes.get(source, size, mtime_ns).get("sha256")
+        if known and known != digest:
+            os.remove(local)
+            raise OSError(f"{source}: copy hash differs from the source's cached hash")
+        for p in (source, local):
+            self.hashes.put(p, *stat_key(p), {"sha256": digest})
+        self.hashes.conn.commit()
+        now = time.time()
+        self.conn.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          (source, local, size, mtime_ns, digest, now, now))
+        self.conn.commit()
+        secs = max(time.time() - start, 1e-6)
+        self.log(f"✔️ {os.path.basename(source)}: staged at {format_size(size / secs)}/s -> {local}")
+        return local
+
+# ---------------------- REWRITING ----------------------
+
+def rewrite_config(path, cache, verify=False):
+    """
+    <name>_staged.toml with model paths pointing at local copies, or None if nothing changed.
+    """
+    with open(path, encoding="utf-8", newline="") as f:
+        lines = f.readlines()
+    changed = False
+    for i, line in enumerate(lines):
+        m = TOML_VALUE.match(line)
+        if not m or _ext(m.group(3)) not in MODEL_EXTS:
+            continue
+        local = cache.stage(m.group(3), verify)
+        if local:
+            lines[i] = f"{m.group(1)}{m.group(2)}{Path(local).as_posix()}{m.group(2)}{m.group(4)}"
+            changed = True
+    if not changed:
+        return None
+    out = staged_name(path)
+    with open(out, "w", encoding="utf-8", newline="") as f:
+        f.writelines(lines)
+    return out
+
+def rewrite_launcher(path, cache, verify=False):
+    """
+    <name>_staged.bat / .sh with model (and config) paths swapped, or None if nothing changed.
+    """
+    style = "sh" if _ext(path) == ".sh" else "bat"
+    pattern = SH_SET if style == "sh" else BAT_SET
+    with open(path, encoding="utf-8", errors="replace", newline="") as f:
+        lines = f.readlines()
+    env, changed = {}, False
+    for i, line in enumerate(lines):
+        m = pattern.match(line)
+        if not m:
+            continue
+        head, name, value, tail = m.groups()
+        quote = value[:1] if style == "sh" and value[:1] in "\"'" else ""
+        value = expand_vars(value[len(quote):len(value) - len(quote)], env, style)
+        new = None
+        if _ext(value) in MODEL_EXTS:
+            new = cache.stage(value, verify)
+        elif _ext(value) == ".toml" and os.path.isfile(native_path(value)):
+            new = rewrite_config(native_path(value), cache, verify)
+        env[name.upper() if style == "bat" else name] = new or value
+        if new:
+            q = (quote or '"') if style == "sh" else ""
+            lines[i] = f"{head}{name}={q}{new}{q}{tail}"
+            changed = True
+    if not changed:
+        return None
+    out = staged_name(path)
+    with open(out, "w", encoding="utf-8", newline="") as f:
+        f.writelines(lines)
+    return out
+
+# ---------------------- CLI ----------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Stage model files on local disk and point launchers at the copies.")
+    ap.add_argument("inputs", nargs="*", help="launchers (.bat/.sh), configs (.toml) or model files")
+    ap.add_argument("--cache-dir", default=str(DEFAULT_CACHE), help="local folder for the copies")
+    ap.add_argument("--budget", type=parse_size, default=parse_size(DEFAULT_BUDGET),
+                    help=f"maximum cache size, e.g. 120GB (default {DEFAULT_BUDGET})")
+    ap.add_argument("--verify", action="store_true", help="re-hash the local copies instead of trusting the cache")
+    ap.add_argument("--list", action="store_true", help="show the cached files")
+    ap.add_argument("--evict", metavar="PATH", help="drop the copy of this source file")
+    ap.add_argument("--clear", action="store_true", help="drop every copy")
+    args = ap.parse_args()
+
+    cache = ModelCache(args.cache_dir, args.budget)
+    try:
+        if args.list:
+            entries = cache.entries()
+            for e in reversed(entries):
+                print(f"{format_size(e.size):>9}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(e.last_used))}  "
+                      f"{e.sha256[:10]}  {e.source}\n{'':38}-> {e.local}")
+            budget = cache.stored_budget()
+            print(f"{len(entries)} file(s), {format_size(cache.total())}"
+                  + (f" of {format_size(budget)} (budget of the last staging run)" if budget else ""))
+            return 0
+        if args.evict or args.clear:
+            source = os.path.abspath(native_path(args.evict)) if args.evict else None
+            gone = [e for e in cache.entries() if args.clear or e.source == source]
+            for e in gone:
+                cache.remove(e)
+            print(f"✔️ {len(gone)} cached file(s) removed")
+            return 0
+
+        inputs = args.inputs
+        if not inputs:
+            from tkinter import filedialog, Tk
+            root = Tk()
+            root.withdraw()
+            inputs = list(filedialog.askopenfilenames(title="Select Launchers / Configs / Models to Stage"))
+        if not inputs:
+            print("❌ Nothing selected.")
+            return 1
+        cache.remember_budget()
+        for path in inputs:
+            if not os.path.isfile(native_path(path)):
+                print(f"❌ {path}: not found")
+                continue
+            path = native_path(path)
+            ext = _ext(path)
+            try:
+                if ext in LAUNCHER_EXTS:
+                    out = rewrite_launcher(path, cache, args.verify)
+                elif ext == ".toml":
+                    out = rewrite_config(path, cache, args.verify)
+                else:
+                    out = cache.stage(path, args.verify)
+            except OSError as e:
+                print(f"❌ {e}")
+                return 1
+            print(f"   {path} -> {out}" if out else f"   {path}: nothing to stage")
+    finally:
+        cache.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
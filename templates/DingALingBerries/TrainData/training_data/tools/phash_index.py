@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# phash_index.py — perceptual-hash index of the output archive: "find everything that looks like this".
+# - Each image gets a DCT perceptual hash (64x64 grayscale -> 2D DCT -> low frequencies vs. their
+#   median) at two sizes: 64 bits (8x8 coefficients) and 256 bits (16x16), packed into uint64s.
+# - The index is a single NumPy .npz (size, mtime, h64 [N], h256 [N, 4], paths as one UTF-8
+#   blob so long paths don't inflate a fixed-width string array); a query is one
+#   vectorized XOR + popcount over the whole array, so hundreds of thousands of outputs answer
+#   in milliseconds.
+# - Incremental like png_index.py: a refresh only stats the tree, hashes new / changed files in
+#   parallel and drops deleted ones. Animated WebP / GIF use their first frame; MP4 / MOV are
+#   included with --videos (first frame through ffmpeg).
+#
+# Usage:
+#   python phash_index.py [folder] [--query IMAGE] [--top N] [--max-distance D] [--bits 64|256]
+#                         [--mode list|auto|reflink|hardlink|symlink|copy] [--videos]
+#                         [--reindex] [--db PATH] [--workers N]
+#   (folder / reference image are asked for in dialogs when left out)
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from png_index import walk_media
+from png_search_engine import RESULT_MODES, Materializer, get_input_folder, sanitize
+
+DEFAULT_DB = Path.home() / ".cache" / "deadlymusubi" / "phash_index.npz"
+
+IMAGE_EXTS = {".png", ".webp", ".jpg", ".jpeg", ".gif"}
+VIDEO_EXTS = {".mp4", ".mov", ".m4v", ".webm", ".mkv"}
+
+HASH_SIZE = 64         # grayscale thumbnail edge fed to the DCT
+BATCH = 512            # thumbnails hashed per vectorized DCT call
+SAVE_EVERY = 20000     # write the index out periodically on big first runs
+DEFAULT_WORKERS = min(16, (os.cpu_count() or 4) * 2)
+FFMPEG_TIMEOUT = 60
+OUT_PREFIX = "similar_"  # result folders, never indexed
+
+# ---------------------- HASHING ----------------------
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    x = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * x + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m.astype(np.float32)
+
+DCT = _dct_matrix(HASH_SIZE)
+
+def _pack(bits):
+    """
+    [B, n_bits] bools -> [B, n_bits // 64] uint64.
+    """
+    packed = np.packbits(bits, axis=1)
+    return packed.view(">u8").astype(np.uint64)
+
+def hash_thumbs(thumbs):
+    """
+    (h64 [B], h256 [B, 4]) for a [B, 64, 64] stack of grayscale thumbnails.
+    """
+    x = thumbs.astype(np.float32)
+    coeffs = DCT @ x @ DCT.T
+    out = []
+    for n in (8, 16):
+        low = coeffs[:, :n, :n].reshape(len(x), -1)
+        out.append(_pack(low > np.median(low, axis=1, keepdims=True)))
+    return out[0][:, 0], out[1]
+
+def load_thumb(path):
+    """
+    64x64 grayscale uint8 thumbnail of an image (first frame) or video, or None if unreadable.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    try:
+        if ext in VIDEO_EXTS:
+            cmd = ["ffmpeg", "-v", "error", "-i", path, "-frames:v", "1",
+                   "-vf", f"scale={HASH_SIZE}:{HASH_SIZE}:flags=area", "-pix_fmt", "gray", "-f", "rawvideo", "-"]
+            raw = subprocess.run(cmd, capture_output=True, timeout=FFMPEG_TIMEOUT).stdout
+            if len(raw) < HASH_SIZE * HASH_SIZE:
+                return None
+            return np.frombuffer(raw[:HASH_SIZE * HASH_SIZE], np.uint8).reshape(HASH_SIZE, HASH_SIZE)
+        with Image.open(path) as img:
+            img.draft("L", (HASH_SIZE * 2, HASH_SIZE * 2))  # JPEG: decode at reduced scale
+            img = img.convert("L").resize((HASH_SIZE, HASH_SIZE), Image.Resampling.BILINEAR, reducing_gap=2.0)
+            return np.asarray(img, dtype=np.uint8)
+    except (OSError, ValueError, subprocess.SubprocessError, Image.DecompressionBombError):
+        return None
+
+def hash_file(path):
+    thumb = load_thumb(path)
+    if thumb is None:
+        raise ValueError(f"cannot decode {path}")
+    h64, h256 = hash_thumbs(thumb[None])
+    return h64[0], h256[0]
+
+# ---------------------- HAMMING ----------------------
+
+if hasattr(np, "bitwise_count"):
+    def popcount(a):
+        return np.bitwise_count(a)
+else:
+    _POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(a):
+        a = np.ascontiguousarray(a)
+        return _POP8[a.view(np.uint8)].reshape(a.shape + (8,)).sum(axis=-1, dtype=np.uint8)
+
+def hamming(hashes, query):
+    """
+    Bit distance from query to every row: hashes [N] (64-bit) or [N, 4] (256-bit).
+    """
+    d = popcount(np.bitwise_xor(hashes, query))
+    return d.astype(np.int32) if d.ndim == 1 else d.sum(axis=1, dtype=np.int32)
+
+# ---------------------- INDEX ----------------------
+
+class PhashIndex:
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.paths = []
+        self.size = np.zeros(0, np.int64)
+        self.mtime_ns = np.zeros(0, np.int64)
+        self.h64 = np.zeros(0, np.uint64)
+        self.h256 = np.zeros((0, 4), np.uint64)
+        if self.path.exists():
+            with np.load(self.path, allow_pickle=False) as z:
+                blob = z["paths"].tobytes().decode("utf-8")
+                self.paths = blob.split("\n") if blob else []
+                self.size, self.mtime_ns = z["size"], z["mtime_ns"]
+                self.h64, self.h256 = z["h64"], z["h256"]
+
+    def __len__(self):
+        return len(self.paths)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.stem + ".tmp.npz")
+        blob = np.frombuffer("\n".join(self.paths).encode("utf-8"), np.uint8)
+        np.savez(tmp, paths=blob, size=self.size, mtime_ns=self.mtime_ns, h64=self.h64, h256=self.h256)
+        os.replace(tmp, self.path)
+
+    def _under(self, root):
+        prefix = os.path.join(os.path.abspath(root), "")
+        return np.fromiter((p.startswith(prefix) for p in self.paths), bool, len(self.paths))
+
+    def _append(self, rows):
+        paths, size, mtime, h64, h256 = zip(*rows)
+        self.paths.extend(paths)
+        self.size = np.concatenate([self.size, np.array(size, np.int64)])
+        self.mtime_ns = np.concatenate([self.mtime_ns, np.array(mtime, np.int64)])
+        self.h64 = np.concatenate([self.h64, np.array(h64, np.uint64)])
+        self.h256 = np.concatenate([self.h256, np.array(h256, np.uint64).reshape(-1, 4)])
+
+    def _keep(self, mask):
+        self.paths = [p for p, k in zip(self.paths, mask) if k]
+        self.size, self.mtime_ns = self.size[mask], self.mtime_ns[mask]
+        self.h64, self.h256 = self.h64[mask], self.h256[mask]
+
+    def refresh(self, root, videos=False, force=False, workers=DEFAULT_WORKERS, skip=(), progress=None):
+        """
+        Bring rows under root up to date. Returns {"hashed", "unchanged", "removed", "errors", "secs"}.
+        """
+        t0 = time.perf_counter()
+        exts = IMAGE_EXTS | VIDEO_EXTS if videos else IMAGE_EXTS
+        under = self._under(root)
+        known = {self.paths[i]: i for i in np.flatnonzero(under)}
+        keep = np.ones(len(self.paths), bool)
+        keep[under] = False          # rows under root survive only if still present and unchanged
+        todo = []
+        seen = unchanged = 0
+        for path, size, mtime_ns in walk_media(root, skip, exts):
+            i = known.get(path)
+            if i is not None:
+                seen += 1
+            if i is not None and not force and self.size[i] == size and self.mtime_ns[i] == mtime_ns:
+                keep[i] = True
+                unchanged += 1
+            else:
+                todo.append((path, size, mtime_ns))
+        removed = len(known) - seen
+        self._keep(keep)
+        stats = {"hashed": 0, "unchanged": unchanged, "removed": removed, "errors": 0}
+
+        rows, thumbs, pending = [], [], []
+
+        def flush():
+            if not thumbs:
+                return
+            h64, h256 = hash_thumbs(np.stack(thumbs))
+            rows.extend((p, s, m, a, b) for (p, s, m), a, b in zip(pending, h64, h256))
+            thumbs.clear()
+            pending.clear()
+
+        with ThreadPoolExecutor(max(1, workers)) as pool:
+            for job, thumb in zip(todo, pool.map(lambda j: load_thumb(j[0]), todo)):
+                if thumb is None:
+                    stats["errors"] += 1
+                    continue
+                thumbs.append(thumb)
+                pending.append(job)
+                if len(thumbs) >= BATCH:
+                    flush()
+                    stats["hashed"] = len(rows)
+                    if progress:
+                        progress(stats["hashed"], len(todo))
+                if len(rows) >= SAVE_EVERY:
+                    self._append(rows)
+                    rows.clear()
+                    self.save()
+            flush()
+        if rows:
+            self._append(rows)
+        stats["hashed"] = len(todo) - stats["errors"]
+        if todo or removed:
+            self.save()
+        stats["secs"] = time.perf_counter() - t0
+        return stats
+
+    def search(self, query_h64, query_h256, root=None, top=50, max_distance=None, bits=256):
+        """
+        [(distance, path)] nearest first. root limits results to one folder tree.
+        """
+        if not len(self.paths):
+            return []
+        dist = hamming(self.h256, query_h256) if bits == 256 else hamming(self.h64, query_h64)
+        if root is not None:
+            dist = np.where(self._under(root), dist, np.iinfo(np.int32).max)
+        if max_distance is not None:
+            cand = np.flatnonzero(dist <= max_distance)
+        else:
+            cand = np.flatnonzero(dist < np.iinfo(np.int32).max)
+        if len(cand) > top:
+            cand = cand[np.argpartition(dist[cand], top)[:top]]
+        cand = cand[np.argsort(dist[cand], kind="stable")]
+        return [(int(dist[i]), self.paths[i]) for i in cand]
+
+def result_folders(root):
+    """
+    similar_<name> folders left in root by earlier queries (any reference image).
+    """
+    with os.scandir(root) as it:
+        return [e.path for e in it if e.name.startswith(OUT_PREFIX) and e.is_dir(follow_symlinks=False)]
+
+# ---------------------- CLI ----------------------
+
+def get_reference_image(args):
+    if args.query:
+        return args.query
+    from tkinter import filedialog, Tk
+    root = Tk()
+    root.withdraw()
+    return filedialog.askopenfilename(title="Select Reference Image",
+                                      filetypes=[("Images", "*.png *.webp *.jpg *.jpeg *.gif"), ("All", "*.*")])
+
+def main():
+    ap = argparse.ArgumentParser(description="Find outputs that look like a reference image (perceptual hash).")
+    ap.add_argument("folder", nargs="?", help="root folder of outputs (recursive)")
+    ap.add_argument("--query", help="reference image")
+    ap.add_argument("--top", type=int, default=50, help="number of nearest matches")
+    ap.add_argument("--max-distance", type=int, help="only matches within this many differing bits")
+    ap.add_argument("--bits", type=int, choices=[64, 256], default=256, help="hash size to compare")
+    ap.add_argument("--mode", choices=RESULT_MODES, default="list",
+                    help="list prints matches; other modes place them in a similar_<name> folder")
+    ap.add_argument("--videos", action="store_true", help="also index mp4/mov/webm/mkv (first frame, needs ffmpeg)")
+    ap.add_argument("--db", default=str(DEFAULT_DB), help="index file path")
+    ap.add_argument("--reindex", action="store_true", help="re-hash every file under the folder")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parallel decoders")
+    args = ap.parse_args()
+
+    input_folder = get_input_folder(args)
+    if not input_folder or not os.path.isdir(input_folder):
+        print("❌ No valid folder selected.")
+        return
+    input_folder = os.path.abspath(input_folder)
+    reference = get_reference_image(args)
+    if not reference or not os.path.isfile(reference):
+        print("❌ No reference image selected.")
+        return
+    try:
+        q64, q256 = hash_file(reference)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    out_name = OUT_PREFIX + sanitize(os.path.splitext(os.path.basename(reference))[0])[:100]
+    out_folder = os.path.join(input_folder, out_name)
+
+    index = PhashIndex(args.db)
+    stats = index.refresh(input_folder, videos=args.videos, force=args.reindex, workers=args.workers,
+                          skip=result_folders(input_folder) + [out_folder],
+                          progress=lambda n, total: print(f"\r  hashed {n}/{total}", end="", flush=True))
+    print(f"\rIndex: {stats['hashed']} hashed, {stats['removed']} removed, {stats['unchanged']} unchanged, "
+          f"{stats['errors']} unreadable ({stats['secs']:.1f}s, {len(index)} total)")
+
+    t0 = time.perf_counter()
+    matches = index.search(q64, q256, root=input_folder, top=args.top,
+                           max_distance=args.max_distance, bits=args.bits)
+    print(f"{len(matches)} match(es) in {(time.perf_counter() - t0) * 1000:.1f} ms ({args.bits}-bit):")
+    for dist, path in matches:
+        print(f"  {dist:>4}  {path}")
+
+    if args.mode != "list" and matches:
+        os.makedirs(out_folder, exist_ok=True)
+        materializer = Materializer(args.mode)
+        for rank, (dist, path) in enumerate(matches, 1):
+            name = f"{rank:04d}_d{dist:03d}_{os.path.basename(path)}"
+            try:
+                materializer.place(path, os.path.join(out_folder, name))
+            except OSError as e:
+                print(f"❌ Failed to place {os.path.basename(path)}: {e}")
+        print(f"✔️ Matches placed in:\n{out_folder}")
+    elif args.mode == "list" and matches:
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        manifest = os.path.join(input_folder, f"{out_name}_{stamp}.txt")
+        with open(manifest, "w", encoding="utf-8") as f:
+            for dist, path in matches:
+                f.write(f"{dist}\t{path}\n")
+        print(f"✔️ Manifest: {manifest}")
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# png_chunks.py — minimal PNG chunk reader for generation metadata (no PIL, no pixel data).
+# - Walks chunk headers from the signature and returns tEXt / zTXt / iTXt payloads.
+# - Stops at the first IDAT: A1111 "parameters" and ComfyUI "prompt"/"workflow" are
+#   written before the image data, so nothing past that point is ever read.
+# - One buffered read covers the usual case; only an unusually large text chunk
+#   (big ComfyUI workflows) costs a second read for the rest of the header area.
+# - strip_chunks() copies a PNG chunk by chunk, leaving out the metadata chunks; IDAT and
+#   everything else (iCCP, gAMA, APNG frames, ...) is written back byte for byte, CRCs included.
+
+import zlib
+import struct
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+TEXT_CHUNKS = {b"tEXt", b"zTXt", b"iTXt"}
+STRIP_CHUNKS = TEXT_CHUNKS | {b"eXIf", b"tIME"}
+
+READ_SIZE = 64 * 1024        # first read; covers signature + IHDR + typical text chunks
+MAX_TEXT_BYTES = 64 << 20    # refuse absurd chunk lengths from corrupt files
+
+class PngFormatError(ValueError): pass
+
+# ---------------------- DECODING ----------------------
+
+def decode_text_chunk(ctype, data):
+    """
+    (keyword, text) from the payload of a tEXt, zTXt or iTXt chunk.
+    """
+    key, sep, rest = data.partition(b"\0")
+    if not sep:
+        raise PngFormatError(f"{ctype.decode()} chunk without keyword terminator")
+    keyword = key.decode("latin-1")
+    if ctype == b"tEXt":
+        return keyword, rest.decode("latin-1")
+    if ctype == b"zTXt":
+        # compression method byte (0 = zlib), then the compressed text
+        return keyword, zlib.decompress(rest[1:]).decode("latin-1")
+    # iTXt: compression flag, method, language\0, translated keyword\0, utf-8 text
+    if len(rest) < 2:
+        raise PngFormatError("truncated iTXt chunk")
+    compressed = rest[0]
+    _lang, _, rest = rest[2:].partition(b"\0")
+    _tkey, _, text = rest.partition(b"\0")
+    if compressed:
+        text = zlib.decompress(text)
+    return keyword, text.decode("utf-8", "replace")
+
+# ---------------------- READING ----------------------
+
+def read_text_chunks(path, keys=None):
+    """
+    {keyword: text} for the text chunks in front of the first IDAT.
+    keys: optional set of keywords to decode (others are skipped without inflating).
+    Raises PngFormatError for files that aren't PNG.
+    """
+    with open(path, "rb", buffering=0) as f:
+        buf = f.read(READ_SIZE)
+        if buf[:8] != PNG_SIGNATURE:
+            raise PngFormatError("not a PNG file")
+        out = {}
+        pos = 8
+        while True:
+            if pos + 8 > len(buf):
+                more = f.read(READ_SIZE)
+                if not more:
+                    break  # truncated before IDAT: return what we have
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            length, ctype = struct.unpack(">I4s", buf[pos:pos + 8])
+            if ctype == b"IDAT" or ctype == b"IEND":
+                break
+            end = pos + 8 + length + 4  # + CRC
+            wanted = ctype in TEXT_CHUNKS
+            if wanted and keys is not None:
+                # keywords are at most 79 bytes, so the name is in the buffer already
+                # unless the chunk header sits right at its end
+                if pos + 8 + 80 > len(buf) and end > len(buf):
+                    buf = buf[pos:] + f.read(READ_SIZE)
+                    end -= pos
+                    pos = 0
+                name = buf[pos + 8:pos + 8 + min(length, 80)].partition(b"\0")[0]
+                wanted = name.decode("latin-1") in keys
+            if wanted:
+                if length > MAX_TEXT_BYTES:
+                    raise PngFormatError(f"{ctype.decode()} chunk of {length} bytes")
+                if end > len(buf):
+                    # large workflow chunk: fetch the remainder in one go
+                    rest = f.read(end - len(buf))
+                    buf = buf[pos:] + rest
+                    end -= pos
+                    pos = 0
+                    if end > len(buf):
+                        break
+                try:
+                    keyword, text = decode_text_chunk(ctype, buf[pos + 8:pos + 8 + length])
+                    out[keyword] = text
+                except (PngFormatError, zlib.error):
+                    pass
+                pos = end
+            elif end > len(buf):
+                # chunk we don't need (iCCP, eXIf, other text) running past the buffer: seek over it
+                f.seek(end - len(buf), 1)
+                buf, pos = b"", 0
+            else:
+                pos = end
+        return out
+
+def read_parameters(path):
+    """
+    The A1111-style "parameters" text ('' if there is none).
+    """
+    return read_text_chunks(path, {"parameters"}).get("parameters", "")
+
+# ---------------------- STRIPPING ----------------------
+
+def strip_chunks(src, dst, drop=STRIP_CHUNKS):
+    """
+    Copy PNG src to dst without the chunks in drop (and anything after IEND); no pixel is
+    decoded. Returns (chunks dropped, bytes removed). Raises PngFormatError for non-PNG or
+    truncated files, before dst is created.
+    """
+    with open(src, "rb") as f:
+        data = memoryview(f.read())
+    if data[:8] != PNG_SIGNATURE:
+        raise PngFormatError("not a PNG file")
+    keep, dropped, pos = [data[:8]], 0, 8
+    while True:
+        if pos + 8 > len(data):
+            raise PngFormatError("truncated PNG (no IEND)")
+        length, ctype = struct.unpack(">I4s", data[pos:pos + 8])
+        end = pos + 12 + length
+        if end > len(data):
+            raise PngFormatError(f"truncated {ctype.decode('latin-1')} chunk")
+        if ctype in drop:
+            dropped += 1
+        else:
+            keep.append(data[pos:end])
+        pos = end
+        if ctype == b"IEND":
+            break
+    with open(dst, "wb") as f:
+        f.writelines(keep)
+    return dropped, len(data) - sum(len(k) for k in keep)
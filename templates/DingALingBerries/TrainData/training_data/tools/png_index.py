@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# png_index.py — persistent SQLite index of PNG generation metadata for png_search_engine.py.
+# - One row per file: path, size, mtime, the A1111-style "parameters" text and its <lora:...> names.
+#   Text is read with png_chunks.py (chunk headers only, stops at the first IDAT).
+# - WebP, JPEG, MP4/MOV and .safetensors are indexed the same way through media_meta.py
+#   (EXIF/XMP, APP segments, udta/ilst atoms, the safetensors __metadata__), headers only.
+#   Their text tags other than prompt / workflow / parameters are stored as "key: value" lines.
+# - ComfyUI "prompt"/"workflow" graphs and A1111 settings are parsed once (gen_meta.py) into
+#   columns: models, LoRA names + strengths, seed, steps, cfg, sampler, resolution, prompt.
+#   query() turns "LoRA X above 0.8 with seed Y" into indexed lookups.
+# - Incremental: a refresh only stats the tree; files whose (size, mtime) changed, or new
+#   files, are re-read. Deleted files drop out of the index.
+# - FTS5 with the trigram tokenizer answers "substring anywhere in the metadata" queries from
+#   the index, so repeat searches take milliseconds instead of re-opening every file.
+#
+# The database lives in ~/.cache/deadlymusubi/png_index.sqlite and holds every root you
+# have searched (paths are absolute), so searching a subfolder reuses the parent's rows.
+
+import os
+import re
+import time
+import sqlite3
+from pathlib import Path
+
+from media_meta import MEDIA_EXTS, read_media_text
+from gen_meta import empty_meta, extract, lora_stem
+
+DEFAULT_DB = Path.home() / ".cache" / "deadlymusubi" / "png_index.sqlite"
+
+LORA_REGEX = re.compile(r"<lora:([^:>]+)(?::[^>]*)?>")
+COMMIT_EVERY = 1000
+SCHEMA_VERSION = 3   # 3: LoRA names are part of the stored searchable text
+META_CHUNKS = {"parameters", "prompt", "workflow"}   # PNG text chunks worth decoding
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id         INTEGER PRIMARY KEY,
+    path       TEXT NOT NULL UNIQUE,
+    size       INTEGER NOT NULL,
+    mtime_ns   INTEGER NOT NULL,
+    parameters TEXT NOT NULL DEFAULT '',
+    error      TEXT
+);
+CREATE TABLE IF NOT EXISTS loras (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name    TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS loras_name ON loras(name);
+CREATE INDEX IF NOT EXISTS loras_file ON loras(file_id);
+"""
+
+# columns added in schema 2 (structured generation settings)
+FILE_COLUMNS = {
+    "text": "TEXT NOT NULL DEFAULT ''",   # everything searchable: parameters or Comfy prompts + models, LoRA names
+    "source": "TEXT", "seed": "INTEGER", "steps": "INTEGER", "cfg": "REAL",
+    "sampler": "TEXT COLLATE NOCASE", "scheduler": "TEXT COLLATE NOCASE",
+    "width": "INTEGER", "height": "INTEGER", "frames": "INTEGER",
+    "prompt": "TEXT", "negative": "TEXT",
+}
+LORA_COLUMNS = {"stem": "TEXT COLLATE NOCASE", "strength": "REAL"}
+
+SCHEMA_2 = """
+CREATE TABLE IF NOT EXISTS models (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    name    TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS models_name ON models(name);
+CREATE INDEX IF NOT EXISTS models_file ON models(file_id);
+CREATE INDEX IF NOT EXISTS loras_stem ON loras(stem, strength);
+CREATE INDEX IF NOT EXISTS files_seed ON files(seed);
+CREATE INDEX IF NOT EXISTS files_steps ON files(steps);
+"""
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(parameters, loras, tokenize='trigram');
+"""
+
+COMPARE_RE = re.compile(r"^\s*(>=|<=|==|=|>|<)?\s*(-?[\d.]+)\s*$")
+
+# ---------------------- METADATA ----------------------
+
+def lora_names(text):
+    return [m.strip() for m in LORA_REGEX.findall(text)]
+
+def read_metadata(path):
+    """
+    (parameters text, structured meta dict) for one file of any MEDIA_EXTS type.
+    """
+    chunks = read_media_text(path, META_CHUNKS)
+    lines = [chunks["parameters"]] if chunks.get("parameters") else []
+    lines += [f"{k}: {v}" for k, v in chunks.items() if k not in META_CHUNKS and v]
+    if path.lower().endswith(".safetensors"):
+        meta = empty_meta("safetensors")
+        for key in ("ss_sd_model_name", "ss_base_model_version"):
+            if chunks.get(key):
+                meta["models"].append(chunks[key])
+        meta["seed"] = _int(chunks.get("ss_seed"))
+        return "\n".join(lines), meta
+    return "\n".join(lines), extract(chunks)
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def file_loras(parameters, meta):
+    """
+    [(name, strength)]: parsed from the graph / settings, else the <lora:...> tags of the text.
+    """
+    return meta.get("loras") or [(n, None) for n in lora_names(parameters)]
+
+def search_fields(parameters, meta):
+    """
+    (text, LoRA names) that term / regex searches look at: the stored text, plus for ComfyUI
+    files the prompts, model and LoRA tags pulled out of the graph; then the full LoRA names.
+    These are the two FTS columns; searchable_text() joins them for files read during a run.
+    """
+    loras = "\n".join(n for n, _ in file_loras(parameters, meta))
+    if meta.get("source") != "comfy":
+        return parameters, loras
+    parts = [parameters, meta.get("prompt"), meta.get("negative")] + list(meta.get("models", []))
+    parts += [f"<lora:{lora_stem(n)}:{s if s is not None else 1}>" for n, s in meta.get("loras", [])]
+    return "\n".join(p for p in parts if p), loras
+
+def searchable_text(parameters, meta):
+    return "\n".join(p for p in search_fields(parameters, meta) if p)
+
+def parse_compare(expr):
+    """
+    ">0.8" -> (">", 0.8); a bare number means equality.
+    """
+    m = COMPARE_RE.match(str(expr))
+    if not m:
+        raise ValueError(f"bad comparison: {expr!r} (use e.g. >0.8, <=1, =0.5)")
+    op = m.group(1) or "="
+    return ("=" if op == "==" else op), float(m.group(2))
+
+def _compare(value, op, target):
+    if value is None:
+        return False
+    return {"=": value == target, ">": value > target, "<": value < target,
+            ">=": value >= target, "<=": value <= target}[op]
+
+def meta_matches(meta, filters):
+    """
+    Same semantics as PngIndex.query(), for files read during this run.
+    """
+    if filters.get("lora"):
+        want = filters["lora"].lower()
+        cmp = filters.get("strength")
+        if not any((lora_stem(n).lower() == want or n.lower() == want)
+                   and (cmp is None or _compare(s, *cmp)) for n, s in meta.get("loras", [])):
+            return False
+    if filters.get("model"):
+        want = filters["model"].lower()
+        if not any(want in m.lower() for m in meta.get("models", [])):
+            return False
+    for key in ("seed", "steps", "width", "height", "frames"):
+        if filters.get(key) is not None and meta.get(key) != filters[key]:
+            return False
+    if filters.get("sampler") and (meta.get("sampler") or "").lower() != filters["sampler"].lower():
+        return False
+    return True
+
+def walk_media(root, skip=(), exts=MEDIA_EXTS):
+    """
+    Yield (path, size, mtime_ns) for every file with one of exts under root, without opening them.
+    skip: absolute folder paths not to descend into (e.g. result folders).
+    """
+    skip = {os.path.normcase(os.path.abspath(s)) for s in skip}
+    stack = [os.path.abspath(root)]
+    while stack:
+        folder = stack.pop()
+        try:
+            entries = os.scandir(folder)
+        except OSError:
+            continue
+        with entries:
+            for e in entries:
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        if os.path.normcase(e.path) not in skip:
+                            stack.append(e.path)
+                    elif os.path.splitext(e.name)[1].lower() in exts and e.is_file():
+                        st = e.stat()
+                        yield e.path, st.st_size, st.st_mtime_ns
+                except OSError:
+                    continue
+
+def _prefix_range(root):
+    """
+    [lo, hi) bounds selecting every path below root with plain index comparisons.
+    """
+    lo = os.path.join(os.path.abspath(root), "")
+    return lo, lo[:-1] + chr(ord(lo[-1]) + 1)
+
+# ---------------------- INDEX ----------------------
+
+class PngIndex:
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite without FTS5/trigram (older than 3.34): fall back to instr() scans of the table
+            self.has_fts = False
+        self.conn.commit()
+
+    def _migrate(self):
+        """
+        Add the structured columns to an older index (or one whose searchable text is built
+        differently); its rows get re-read on the next refresh.
+        """
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        for table, columns in (("files", FILE_COLUMNS), ("loras", LORA_COLUMNS)):
+            have = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            for name, decl in columns.items():
+                if name not in have:
+                    self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {decl}")
+        self.conn.executescript(SCHEMA_2)
+        self.conn.execute("UPDATE files SET mtime_ns = -1")  # force a re-read
+        self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    # ---- refresh ----
+
+    def known(self, root):
+        """
+        {path: (id, size, mtime_ns)} for every indexed file under root.
+        """
+        lo, hi = _prefix_range(root)
+        return {p: (i, s, m) for i, p, s, m in self.conn.execute(
+            "SELECT id, path, size, mtime_ns FROM files WHERE path >= ? AND path < ?", (lo, hi))}
+
+    def stale(self, root, skip=(), force=False):
+        """
+        Compare the tree with the index. Returns (changed, removed_ids, unchanged_count):
+        changed = [(path, size, mtime_ns)] that are new or modified (every file if force).
+        """
+        known = self.known(root)
+        changed = []
+        unchanged = 0
+        for path, size, mtime_ns in walk_media(root, skip):
+            row = known.pop(path, None)
+            if row and not force and row[1] == size and row[2] == mtime_ns:
+                unchanged += 1
+            else:
+                changed.append((path, size, mtime_ns))
+        return changed, [row[0] for row in known.values()], unchanged
+
+    def store(self, path, size, mtime_ns, parameters, error=None, meta=None):
+        """
+        Insert or replace one file's metadata (call commit() yourself, or use refresh()).
+        """
+        meta = meta or empty_meta()
+        fields = search_fields(parameters, meta)
+        text = "\n".join(p for p in fields if p)
+        values = (size, mtime_ns, parameters, error, text, meta["source"], meta["seed"], meta["steps"],
+                  meta["cfg"], meta["sampler"], meta["scheduler"], meta["width"], meta["height"],
+                  meta["frames"], meta["prompt"], meta["negative"])
+        cur = self.conn.execute("SELECT id FROM files WHERE path = ?", (path,))
+        row = cur.fetchone()
+        if row:
+            file_id = row[0]
+            self.conn.execute(
+                "UPDATE files SET size=?, mtime_ns=?, parameters=?, error=?, text=?, source=?, seed=?, "
+                "steps=?, cfg=?, sampler=?, scheduler=?, width=?, height=?, frames=?, prompt=?, negative=? "
+                "WHERE id=?", values + (file_id,))
+            self.conn.execute("DELETE FROM loras WHERE file_id = ?", (file_id,))
+            self.conn.execute("DELETE FROM models WHERE file_id = ?", (file_id,))
+            if self.has_fts:
+                self.conn.execute("DELETE FROM files_fts WHERE rowid = ?", (file_id,))
+        else:
+            file_id = self.conn.execute(
+                "INSERT INTO files(size, mtime_ns, parameters, error, text, source, seed, steps, cfg, "
+                "sampler, scheduler, width, height, frames, prompt, negative, path) "
+                "VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)", values + (path,)).lastrowid
+        loras = file_loras(parameters, meta)
+        self.conn.executemany("INSERT INTO loras(file_id, name, stem, strength) VALUES (?,?,?,?)",
+                              [(file_id, n, lora_stem(n), s) for n, s in loras])
+        self.conn.executemany("INSERT INTO models(file_id, name) VALUES (?,?)",
+                              [(file_id, m) for m in meta["models"]])
+        if self.has_fts:
+            self.conn.execute("INSERT INTO files_fts(rowid, parameters, loras) VALUES (?,?,?)",
+                              (file_id, *fields))
+        return file_id
+
+    def remove(self, ids):
+        for file_id in ids:
+            self.conn.execute("DELETE FROM loras WHERE file_id = ?", (file_id,))
+            self.conn.execute("DELETE FROM models WHERE file_id = ?", (file_id,))
+            if self.has_fts:
+                self.conn.execute("DELETE FROM files_fts WHERE rowid = ?", (file_id,))
+            self.conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def commit(self):
+        self.conn.commit()
+
+    def refresh(self, root, skip=(), progress=None, force=False):
+        """
+        Bring the index up to date for everything under root. Only new or changed files are read.
+        progress(done, total) is called while reading. Returns a stats dict.
+        """
+        t0 = time.perf_counter()
+        changed, removed, unchanged = self.stale(root, skip, force)
+        self.remove(removed)
+        errors = 0
+        for n, (path, size, mtime_ns) in enumerate(changed, 1):
+            try:
+                (params, meta), err = read_metadata(path), None
+            except Exception as e:
+                params, meta, err = "", None, str(e)
+                errors += 1
+            self.store(path, size, mtime_ns, params, err, meta)
+            if n % COMMIT_EVERY == 0:
+                self.commit()
+            if progress:
+                progress(n, len(changed))
+        self.commit()
+        return {"read": len(changed), "removed": len(removed), "unchanged": unchanged,
+                "errors": errors, "secs": time.perf_counter() - t0}
+
+    # ---- queries ----
+
+    def search(self, root, term):
+        """
+        Paths under root whose searchable text (or a LoRA name in it) contains term,
+        case-insensitive. Uses the trigram index for terms of 3+ characters.
+        """
+        lo, hi = _prefix_range(root)
+        if self.has_fts and len(term) >= 3:
+            phrase = '"' + term.replace('"', '""') + '"'
+            cur = self.conn.execute(
+                "SELECT f.path FROM files_fts JOIN files f ON f.id = files_fts.rowid "
+                "WHERE files_fts MATCH ? AND f.path >= ? AND f.path < ? ORDER BY f.path",
+                (phrase, lo, hi))
+        else:
+            cur = self.conn.execute(
+                "SELECT path FROM files WHERE path >= ? AND path < ? AND instr(lower(text), ?) > 0 "
+                "ORDER BY path", (lo, hi, term.lower()))
+        return [row[0] for row in cur]
+
+    def iter_parameters(self, root):
+        """
+        (path, searchable text) for every readable file under root, for matchers SQL can't express.
+        """
+        lo, hi = _prefix_range(root)
+        return self.conn.execute(
+            "SELECT path, text FROM files WHERE error IS NULL AND path >= ? AND path < ?", (lo, hi))
+
+    def query(self, root, lora=None, strength=None, model=None, seed=None, steps=None,
+              sampler=None, width=None, height=None, frames=None):
+        """
+        Structured lookup on the parsed settings, e.g. query(root, lora="shrek", strength=(">", 0.8), seed=42).
+        lora matches the file stem ("New\\x.safetensors" -> "x") or the full name, case-insensitive;
+        strength is an (op, value) pair from parse_compare(); model is a substring.
+        """
+        lo, hi = _prefix_range(root)
+        sql = ["SELECT DISTINCT f.path FROM files f"]
+        where = ["f.path >= ?", "f.path < ?"]
+        args = [lo, hi]
+        if lora:
+            sql.append("JOIN loras l ON l.file_id = f.id")
+            where.append("(l.stem = ? OR l.name = ?)")
+            args += [lora, lora]
+            if strength:
+                op, value = strength
+                where.append(f"l.strength {op} ?")
+                args.append(value)
+        if model:
+            sql.append("JOIN models m ON m.file_id = f.id")
+            where.append("instr(lower(m.name), ?) > 0")
+            args.append(model.lower())
+        for column, value in (("seed", seed), ("steps", steps), ("width", width),
+                              ("height", height), ("frames", frames)):
+            if value is not None:
+                where.append(f"f.{column} = ?")
+                args.append(value)
+        if sampler:
+            where.append("f.sampler = ?")
+            args.append(sampler)
+        cur = self.conn.execute(" ".join(sql) + " WHERE " + " AND ".join(where) + " ORDER BY f.path", args)
+        return [row[0] for row in cur]
+
+    def search_lora(self, root, name):
+        """
+        Paths under root that use a LoRA with exactly this name (case-insensitive).
+        """
+        lo, hi = _prefix_range(root)
+        cur = self.conn.execute(
+            "SELECT DISTINCT f.path FROM loras l JOIN files f ON f.id = l.file_id "
+            "WHERE l.name = ? AND f.path >= ? AND f.path < ? ORDER BY f.path", (name, lo, hi))
+        return [row[0] for row in cur]
+
+    def errors(self, root):
+        lo, hi = _prefix_range(root)
+        return self.conn.execute(
+            "SELECT path, error FROM files WHERE error IS NOT NULL AND path >= ? AND path < ?", (lo, hi)).fetchall()
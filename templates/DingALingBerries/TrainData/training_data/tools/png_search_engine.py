@@ -1,22 +1,68 @@
+# png_search_engine.py — find AI outputs whose PNG metadata mentions strings, collect them per term.
+# - Also covers animated WebP, JPEG, MP4/MOV and LoRA .safetensors (training ss_* metadata):
+#   every format is read header-only (media_meta.py), no media is decoded.
+# - Metadata lives in a persistent SQLite index (png_index.py); each run only re-reads PNGs
+#   that are new or changed since the last search, so repeat searches are near-instant.
+# - Matches the A1111 "parameters" text anywhere, including <lora:...> names (case-insensitive),
+#   and for ComfyUI images the prompts, model and LoRA names parsed out of the workflow graph.
+# - Structured filters (--lora, --strength, --seed, --steps, --model, --sampler) select on the
+#   parsed settings, e.g. "LoRA X at strength > 0.8 with seed Y", as indexed SQL lookups.
+# - Runs as a pipeline: directory walker -> pool of metadata readers -> matcher/indexer ->
+#   bounded pool of copiers, so disk reads, parsing and copies overlap. Progress is live.
+# - Results are placed without duplicating data where the filesystem allows it:
+#   --mode auto tries a reflink (copy-on-write clone), then a hardlink, and only copies as a
+#   last resort. reflink / hardlink / symlink / copy force one method; list only writes a
+#   manifest of matching paths.
+# - Any number of terms and regexes are checked in the same pass (one Aho-Corasick automaton
+#   for the literal terms), each with its own result folder: auditing 50 LoRA names costs one scan.
+#
+# Usage:
+#   python png_search_engine.py [folder] [term ...] [--terms FILE] [--regex PATTERN ...]
+#                               [--mode auto|reflink|hardlink|symlink|copy|list]
+#                               [--lora NAME [--strength ">0.8"]] [--seed N] [--steps N]
+#                               [--model TEXT] [--sampler NAME]
+#                               [--reindex] [--db PATH] [--readers N] [--copiers N]
+#   (folder / term are asked for in dialogs when left out)
+#   A terms file has one term per line; "re:" starts a regex, "#" a comment.
+
 import os
+import errno
 import shutil
 import re
-from PIL import Image
-from collections import defaultdict
+import time
+import queue
+import argparse
+import threading
+from collections import defaultdict, deque
 from tkinter import filedialog, simpledialog, Tk
 from datetime import datetime
-import sys
+
+from png_index import (COMMIT_EVERY, DEFAULT_DB, PngIndex, meta_matches, parse_compare,
+                       read_metadata, searchable_text, walk_media)
 
 ILLEGAL_CHARS = r'[<>:"/\\|?*]'
-LORA_REGEX = re.compile(r"<lora:([^:>]+)(?::[^>]*)?>")
+
+DEFAULT_READERS = min(32, (os.cpu_count() or 4) * 4)  # reads are I/O bound; more helps on network shares
+DEFAULT_COPIERS = 4
+QUEUE_DEPTH = 1024     # files waiting to be read / copied; bounds memory on huge trees
+STATUS_EVERY = 0.25    # seconds between progress lines
+
+_DONE = object()
+
+RESULT_MODES = ["auto", "reflink", "hardlink", "symlink", "copy", "list"]
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+# errors that mean "this filesystem / platform can't do that", as opposed to a bad file
+UNSUPPORTED = {errno.EXDEV, errno.EPERM, errno.EACCES, errno.EINVAL, errno.ENOTTY,
+               getattr(errno, "EOPNOTSUPP", 95), getattr(errno, "ENOTSUP", 95), errno.ENOSYS}
 
 
 def sanitize(name):
     return re.sub(ILLEGAL_CHARS, "_", name)
 
-def get_input_folder():
-    if len(sys.argv) > 1:
-        folder = sys.argv[1]
+def get_input_folder(args):
+    if args.folder:
+        folder = args.folder
     else:
         root = Tk()
         root.withdraw()
@@ -29,59 +75,473 @@ def get_search_term():
     term = simpledialog.askstring("Search Term", "Enter the string to search for in LoRA names or prompts:")
     return term.strip() if term else None
 
+def read_terms_file(path):
+    """
+    ([literal terms], [regex patterns]) from a text file: one per line, "re:" prefix for regexes.
+    """
+    terms, regexes = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("re:"):
+                regexes.append(line[3:].strip())
+            else:
+                terms.append(line)
+    return terms, regexes
+
+# ---------------------- MATCHING ----------------------
+
+class AhoCorasick:
+    """
+    Multi-pattern substring matcher: one pass over the text reports every pattern it
+    contains, however many patterns there are. Patterns and text are compared lowercased.
+    """
+    def __init__(self, patterns):
+        self.n = len(patterns)
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [frozenset()]
+        for i, pat in enumerate(patterns):
+            node = 0
+            for ch in pat.lower():
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(frozenset())
+                    self.goto[node][ch] = nxt
+                node = nxt
+            self.out[node] = self.out[node] | {i}
+        # breadth-first failure links; each node also reports what its suffixes report
+        todo = deque(self.goto[0].values())
+        while todo:
+            node = todo.popleft()
+            for ch, child in self.goto[node].items():
+                todo.append(child)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(ch, 0)
+                self.out[child] = self.out[child] | self.out[self.fail[child]]
+
+    def search(self, text):
+        """
+        Set of pattern indices found in text.
+        """
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        node = 0
+        for ch in text.lower():
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found |= out[node]
+                if len(found) == self.n:
+                    break
+        return found
+
+def describe_filters(filters):
+    parts = []
+    for key, value in filters.items():
+        if key == "strength":
+            parts.append(f"strength{value[0]}{value[1]:g}")
+        elif value is not None:
+            parts.append(f"{key}={value}")
+    return " ".join(parts)
+
+class Query:
+    def __init__(self, label, regex=False, filters=None):
+        self.label = label
+        self.regex = re.compile(label, re.IGNORECASE) if regex else None
+        self.filters = filters        # structured settings query (png_index.PngIndex.query kwargs)
+        self.folder_name = sanitize(("re_" if regex else "") + label)[:120] or "_"
+
+    @property
+    def display(self):
+        return ("re:" if self.regex else "") + self.label
+
+class MultiMatcher:
+    """
+    All queries against one file: literal terms through one automaton, then each regex,
+    then structured filters against the parsed settings.
+    """
+    def __init__(self, queries):
+        self.queries = queries
+        self.filter_idx = [i for i, q in enumerate(queries) if q.filters]
+        self.regex_idx = [i for i, q in enumerate(queries) if q.regex is not None]
+        self.literal_idx = [i for i, q in enumerate(queries) if q.regex is None and not q.filters]
+        self.automaton = AhoCorasick([queries[i].label for i in self.literal_idx])
+
+    def match(self, text, meta=None):
+        hits = {self.literal_idx[j] for j in self.automaton.search(text)} if self.literal_idx else set()
+        for i in self.regex_idx:
+            if self.queries[i].regex.search(text):
+                hits.add(i)
+        if meta is not None:
+            for i in self.filter_idx:
+                if meta_matches(meta, self.queries[i].filters):
+                    hits.add(i)
+        return hits
+
+# ---------------------- RESULTS ----------------------
+
+def reflink(src, dst):
+    """
+    Copy-on-write clone (Btrfs, XFS, bcachefs, ...): instant, no extra space until edited.
+    """
+    import fcntl
+    with open(src, "rb") as fs, open(dst, "xb") as fd:
+        try:
+            fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+        except OSError:
+            fd.close()
+            os.remove(dst)
+            raise
+    shutil.copystat(src, dst)
+
+def hardlink(src, dst):
+    os.link(src, dst)
+
+def symlink(src, dst):
+    os.symlink(os.path.abspath(src), dst)
+
+def copy(src, dst):
+    shutil.copy2(src, dst)
+
+def _same_file(a, b):
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class Materializer:
+    """
+    Places one result file. In auto mode each method that turns out unsupported between
+    these two folders (cross-device, no reflink support, ...) is dropped for the rest of the run.
+    """
+    METHODS = {"reflink": reflink, "hardlink": hardlink, "symlink": symlink, "copy": copy}
+    AUTO = ["reflink", "hardlink", "copy"]
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.order = list(self.AUTO) if mode == "auto" else [mode]
+        if os.name == "nt" and "reflink" in self.order and mode == "auto":
+            self.order.remove("reflink")
+        self.lock = threading.Lock()
+
+    def place(self, src, dst):
+        """
+        Returns the method that worked; raises the last error if none did.
+        Each method writes a temporary name next to dst that then replaces it, so an existing
+        dst (a hardlink of src from an earlier run) is never opened for writing, and re-runs
+        overwrite results instead of failing with EEXIST.
+        """
+        if os.path.lexists(dst) and _same_file(src, dst):
+            return "existing"
+        tmp = os.path.join(os.path.dirname(dst), f".{os.path.basename(dst)}.{os.getpid()}.{threading.get_ident()}.tmp")
+        for method in list(self.order):
+            try:
+                _discard(tmp)   # left by a killed run; linking onto it would fail with EEXIST
+                self.METHODS[method](src, tmp)
+                os.replace(tmp, dst)
+                return method
+            except (OSError, ImportError) as e:
+                _discard(tmp)
+                if self.mode != "auto" or method == "copy":
+                    raise
+                unsupported = isinstance(e, ImportError) or e.errno in UNSUPPORTED
+                if not unsupported:
+                    raise
+                with self.lock:
+                    if method in self.order:
+                        self.order.remove(method)
+        raise OSError(f"no method left to place {src}")
+
+# ---------------------- PIPELINE ----------------------
+
+class SearchPipeline:
+    """
+    walker thread  -> read_q -> N reader threads -> result_q -> matcher (this thread, owns SQLite)
+          |                                                          |
+          +-- unchanged files already matched in the index --+-------+-> copy_q -> M copier threads
+    """
+    def __init__(self, index, root, queries, readers=DEFAULT_READERS,
+                 copiers=DEFAULT_COPIERS, force=False, mode="auto"):
+        self.index = index
+        self.root = os.path.abspath(root)
+        self.queries = queries
+        self.matcher = MultiMatcher(queries)
+        self.folders = [os.path.join(self.root, q.folder_name) for q in queries]
+        self.readers = max(1, readers)
+        self.copiers = max(1, copiers)
+        self.force = force
+        self.mode = mode
+        self.materializer = None if mode == "list" else Materializer(mode)
+        self.matched_paths = [[] for _ in queries]   # list mode: per-query manifest
+        self.per_query = [0] * len(queries)
+
+        self.read_q = queue.Queue(QUEUE_DEPTH)
+        self.result_q = queue.Queue(QUEUE_DEPTH)
+        self.copy_q = queue.Queue(QUEUE_DEPTH)
+
+        self.lock = threading.Lock()
+        self.file_counters = [defaultdict(int) for _ in queries]
+        self.log_entries = []
+        self.removed_ids = []
+        self.stats = {"scanned": 0, "unchanged": 0, "queued": 0, "read": 0, "errors": 0,
+                      "matched": 0, "copied": 0, "removed": 0}
+        self.methods = defaultdict(int)  # how results were placed: reflink / hardlink / ...
+        self._last_status = 0.0
+
+    def _count(self, key, n=1):
+        with self.lock:
+            self.stats[key] += n
+
+    # ---- stages ----
+
+    def _walk(self, known, candidates):
+        try:
+            for path, size, mtime_ns in walk_media(self.root, skip=self.folders):
+                self._count("scanned")
+                row = known.pop(path, None)
+                if row and not self.force and row[1] == size and row[2] == mtime_ns:
+                    self._count("unchanged")
+                    for qi in candidates.get(path, ()):
+                        self._enqueue_copy(path, qi)
+                else:
+                    self._count("queued")
+                    self.read_q.put((path, size, mtime_ns))
+            self.removed_ids = [row[0] for row in known.values()]
+        finally:
+            for _ in range(self.readers):
+                self.read_q.put(_DONE)
+
+    def _read(self):
+        while True:
+            job = self.read_q.get()
+            if job is _DONE:
+                self.result_q.put(_DONE)
+                return
+            path, size, mtime_ns = job
+            try:
+                (params, meta), err = read_metadata(path), None
+            except Exception as e:
+                params, meta, err = "", None, str(e)
+            self.result_q.put((path, size, mtime_ns, params, meta, err))
+
+    def _copy(self):
+        while True:
+            job = self.copy_q.get()
+            if job is _DONE:
+                return
+            src, dest_path, new_name = job
+            filename = os.path.basename(src)
+            folder_name = os.path.basename(os.path.dirname(dest_path))
+            try:
+                method = self.materializer.place(src, dest_path)
+                self.log_entries.append(f"✅ {filename} → {folder_name}/{new_name} ({method})")
+                with self.lock:
+                    self.stats["copied"] += 1
+                    self.methods[method] += 1
+            except Exception as e:
+                self.log_entries.append(f"❌ Failed to place {filename} in {folder_name}: {e}")
+
+    def _enqueue_copy(self, src, qi):
+        with self.lock:
+            self.stats["matched"] += 1
+            self.per_query[qi] += 1
+            if self.materializer is None:
+                self.matched_paths[qi].append(src)
+                return
+            if self.per_query[qi] == 1:
+                os.makedirs(self.folders[qi], exist_ok=True)
+            filename = os.path.basename(src)
+            base_name, ext = os.path.splitext(filename)
+            self.file_counters[qi][filename] += 1
+            new_name = f"{base_name}_{self.file_counters[qi][filename]:03d}{ext}"
+        self.copy_q.put((src, os.path.join(self.folders[qi], new_name), new_name))
+
+    def index_candidates(self):
+        """
+        {path: {query index}} for rows already in the index: literal terms via the trigram
+        index (one query each), regexes in a single pass over the stored text, structured
+        filters through the settings columns.
+        """
+        candidates = defaultdict(set)
+        for i in self.matcher.literal_idx:
+            for path in self.index.search(self.root, self.queries[i].label):
+                candidates[path].add(i)
+        if self.matcher.regex_idx:
+            for path, params in self.index.iter_parameters(self.root):
+                for i in self.matcher.regex_idx:
+                    if self.queries[i].regex.search(params):
+                        candidates[path].add(i)
+        for i in self.matcher.filter_idx:
+            for path in self.index.query(self.root, **self.queries[i].filters):
+                candidates[path].add(i)
+        return candidates
+
+    # ---- driver ----
+
+    def status(self, final=False):
+        now = time.monotonic()
+        if not final and now - self._last_status < STATUS_EVERY:
+            return
+        self._last_status = now
+        s = self.stats
+        print(f"\r  scanned {s['scanned']}  |  read {s['read']}/{s['queued']}  |  "
+              f"matched {s['matched']}  |  placed {s['copied']}   ", end="\n" if final else "", flush=True)
+
+    def run(self):
+        t0 = time.perf_counter()
+        known = self.index.known(self.root)
+        # matches among rows that are still current come straight from the index
+        candidates = self.index_candidates()
+
+        threads = [threading.Thread(target=self._walk, args=(known, candidates), name="walker", daemon=True)]
+        threads += [threading.Thread(target=self._read, name=f"reader-{i}", daemon=True) for i in range(self.readers)]
+        copiers = [threading.Thread(target=self._copy, name=f"copier-{i}", daemon=True) for i in range(self.copiers)]
+        for t in threads + copiers:
+            t.start()
+
+        # matcher / indexer: the only thread that touches SQLite
+        pending = self.readers
+        while pending:
+            try:
+                item = self.result_q.get(timeout=STATUS_EVERY)
+            except queue.Empty:
+                self.status()
+                continue
+            if item is _DONE:
+                pending -= 1
+                continue
+            path, size, mtime_ns, params, meta, err = item
+            self.index.store(path, size, mtime_ns, params, err, meta)
+            self._count("read")
+            if err:
+                self._count("errors")
+            else:
+                for qi in self.matcher.match(searchable_text(params, meta), meta):
+                    self._enqueue_copy(path, qi)
+            if self.stats["read"] % COMMIT_EVERY == 0:
+                self.index.commit()
+            self.status()
+
+        for t in threads:
+            t.join()
+        self.index.remove(self.removed_ids)
+        self.stats["removed"] = len(self.removed_ids)
+        self.index.commit()
+
+        for _ in copiers:
+            self.copy_q.put(_DONE)
+        while any(t.is_alive() for t in copiers):
+            for t in copiers:
+                t.join(STATUS_EVERY)
+            self.status()
+        self.status(final=True)
+        self.stats["secs"] = time.perf_counter() - t0
+        return self.stats
+
+# ---------------------- CLI ----------------------
+
 def main():
-    input_folder = get_input_folder()
+    ap = argparse.ArgumentParser(description="Search PNG generation metadata and collect matches per term.")
+    ap.add_argument("folder", nargs="?", help="root folder to search (recursive)")
+    ap.add_argument("terms", nargs="*", help="strings to look for in prompts / LoRA names")
+    ap.add_argument("--terms", dest="terms_file", metavar="FILE", help="file with one term per line (re: for regexes)")
+    ap.add_argument("--regex", action="append", default=[], help="regular expression (case-insensitive); repeatable")
+    ap.add_argument("--lora", help="LoRA name (file stem or full name) used in the generation")
+    ap.add_argument("--strength", help='LoRA strength comparison with --lora, e.g. ">0.8", "<=1", "0.5"')
+    ap.add_argument("--seed", type=int, help="exact seed")
+    ap.add_argument("--steps", type=int, help="exact sampler steps")
+    ap.add_argument("--model", help="checkpoint / DiT name contains this")
+    ap.add_argument("--sampler", help="sampler name, e.g. euler")
+    ap.add_argument("--mode", choices=RESULT_MODES, default="auto",
+                    help="how results are placed (auto: reflink, else hardlink, else copy; list: manifest only)")
+    ap.add_argument("--db", default=str(DEFAULT_DB), help="index database path")
+    ap.add_argument("--reindex", action="store_true", help="re-read every file under the folder")
+    ap.add_argument("--readers", type=int, default=DEFAULT_READERS, help="parallel metadata readers")
+    ap.add_argument("--copiers", type=int, default=DEFAULT_COPIERS, help="parallel copies")
+    args = ap.parse_args()
+
+    input_folder = get_input_folder(args)
     if not input_folder or not os.path.isdir(input_folder):
         print("❌ No valid folder selected.")
         return
 
-    search_term = get_search_term()
-    if not search_term:
+    terms = [t.strip() for t in args.terms if t.strip()]
+    regexes = list(args.regex)
+    if args.terms_file:
+        file_terms, file_regexes = read_terms_file(args.terms_file)
+        terms += file_terms
+        regexes += file_regexes
+    filters = {"lora": args.lora, "model": args.model, "seed": args.seed, "steps": args.steps,
+               "sampler": args.sampler}
+    if args.strength:
+        if not args.lora:
+            print("❌ --strength needs --lora.")
+            return
+        try:
+            filters["strength"] = parse_compare(args.strength)
+        except ValueError as e:
+            print(f"❌ {e}")
+            return
+    filters = {k: v for k, v in filters.items() if v is not None}
+    if not terms and not regexes and not filters:
+        term = get_search_term()
+        if term:
+            terms.append(term)
+    if not terms and not regexes and not filters:
         print("❌ No search term provided.")
         return
 
-    search_term_lower = search_term.lower()
-    target_folder_name = sanitize(search_term)
-    target_folder = os.path.join(input_folder, target_folder_name)
-    os.makedirs(target_folder, exist_ok=True)
+    try:
+        queries = [Query(t) for t in dict.fromkeys(terms)] + [Query(r, regex=True) for r in dict.fromkeys(regexes)]
+    except re.error as e:
+        print(f"❌ Bad regex: {e}")
+        return
+    if filters:
+        queries.append(Query(describe_filters(filters), filters=filters))
 
-    log_entries = []
-    file_counters = defaultdict(int)
-    log_path = os.path.join(input_folder, f"search_log_{target_folder_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt")
+    input_folder = os.path.abspath(input_folder)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    run_name = queries[0].folder_name if len(queries) == 1 else f"{len(queries)}_terms"
+    log_path = os.path.join(input_folder, f"search_log_{run_name}_{stamp}.txt")
 
-    for root_dir, _, files in os.walk(input_folder):
-        for filename in files:
-            if not filename.lower().endswith(".png"):
-                continue
+    index = PngIndex(args.db)
+    pipeline = SearchPipeline(index, input_folder, queries,
+                              readers=args.readers, copiers=args.copiers, force=args.reindex, mode=args.mode)
+    stats = pipeline.run()
+    errors = index.errors(input_folder)
+    index.close()
 
-            image_path = os.path.join(root_dir, filename)
+    placed = ", ".join(f"{n} {m}" for m, n in sorted(pipeline.methods.items())) or "none placed"
+    print(f"Index: {stats['read']} read, {stats['removed']} removed, {stats['unchanged']} unchanged. "
+          f"{stats['matched']} match(es) [{placed}] ({stats['secs']:.1f}s)")
+    width = max(len(q.display) for q in queries)
+    for q, n in sorted(zip(queries, pipeline.per_query), key=lambda x: -x[1]):
+        print(f"  {q.display:<{width}} {n:>7}")
 
-            try:
-                with Image.open(image_path) as img:
-                    metadata = img.info.get("parameters", "")
-            except Exception as e:
-                log_entries.append(f"❌ Failed to open {filename}: {e}")
-                continue
-
-            found = False
-            if search_term_lower in metadata.lower():
-                found = True
-            else:
-                lora_matches = LORA_REGEX.findall(metadata)
-                if any(search_term_lower in lora.lower() for lora in lora_matches):
-                    found = True
-
-            if found:
-                base_name, ext = os.path.splitext(filename)
-                file_counters[filename] += 1
-                new_name = f"{base_name}_{file_counters[filename]:03d}{ext}"
-                dest_path = os.path.join(target_folder, new_name)
-                try:
-                    shutil.copy2(image_path, dest_path)
-                    log_entries.append(f"✅ {filename} → {target_folder_name}/{new_name}")
-                except Exception as e:
-                    log_entries.append(f"❌ Failed to copy {filename} to {target_folder_name}: {e}")
+    if args.mode == "list":
+        manifest = os.path.join(input_folder, f"search_results_{run_name}_{stamp}.txt")
+        with open(manifest, "w", encoding="utf-8") as f:
+            for q, paths in zip(queries, pipeline.matched_paths):
+                for p in sorted(paths):
+                    f.write(f"{q.display}\t{p}\n")
+        print(f"Manifest: {manifest}")
 
+    log_entries = [f"❌ Failed to open {os.path.basename(p)}: {err}" for p, err in errors] + pipeline.log_entries
     with open(log_path, "w", encoding="utf-8") as log_file:
         log_file.write("\n".join(log_entries))
 
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# safetensors_hash.py — sha256 / AutoV2 / AutoV3 hashes of LoRAs and checkpoints, each file read once.
+# - sha256 of the whole file (AutoV2 = its first 10 hex digits, what A1111 / Civitai show), and
+#   sha256 of the tensor data section only (AutoV3 = first 12; kohya's sshs_model_hash is the full
+#   digest). The data hash ignores the header, so editing metadata does not change it.
+# - One streaming pass computes both: a reader fills one large buffer while the other is being
+#   hashed (hashlib releases the GIL), so a 28 GB DiT costs one sequential read.
+# - Results are cached in ~/.cache/deadlymusubi/hash_cache.sqlite by (path, size, mtime); unchanged
+#   files are never re-read. --write stores sshs_model_hash in the file's __metadata__ with the
+#   header-only writer (safetensors_io.write_metadata), so other tools can skip hashing too.
+# - --dupes lists files with identical tensor data (same weights under different names / metadata).
+#
+# Usage:
+#   python safetensors_hash.py <file or folder>... [--data-only] [--write] [--dupes] [--json OUT]
+#                              [--workers N] [--db PATH] [--rehash]
+
+import os
+import sys
+import json
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from png_index import walk_media
+from safetensors_io import COPY_CHUNK, SafetensorsFormatError, read_header, write_metadata
+
+DEFAULT_DB = Path.home() / ".cache" / "deadlymusubi" / "hash_cache.sqlite"
+DEFAULT_WORKERS = 2                   # files hashed at once; more only helps on fast NVMe arrays
+LEGACY_OFFSET, LEGACY_SIZE = 0x100000, 0x10000
+HASH_KEYS = ("sshs_model_hash", "sshs_legacy_hash")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    path        TEXT PRIMARY KEY,
+    size        INTEGER NOT NULL,
+    mtime_ns    INTEGER NOT NULL,
+    sha256      TEXT,
+    data_sha256 TEXT,
+    legacy      TEXT
+);
+"""
+FIELDS = ("sha256", "data_sha256", "legacy")
+
+# ---------------------- HASHING ----------------------
+
+def stream_to(f, sinks, chunk=COPY_CHUNK):
+    """
+    Feed the rest of f to every sink's update() (hashers, or a file wrapper), reading the next
+    buffer while the last one is consumed.
+    """
+    bufs = [bytearray(chunk), bytearray(chunk)]
+    i, pending = 0, []
+    with ThreadPoolExecutor(len(sinks)) as pool:
+        while True:
+            view = memoryview(bufs[i])
+            n = f.readinto(view)
+            for fut in pending:
+                fut.result()
+            if not n:
+                return
+            pending = [pool.submit(s.update, view[:n]) for s in sinks]
+            i ^= 1
+
+def legacy_hash(path):
+    """
+    A1111's old 8-digit model hash: sha256 of 64 KB at offset 1 MB.
+    """
+    with open(path, "rb") as f:
+        f.seek(LEGACY_OFFSET)
+        return hashlib.sha256(f.read(LEGACY_SIZE)).hexdigest()[:8]
+
+def hash_file(path, full=True, data=True):
+    """
+    {"sha256", "data_sha256", "legacy"} (None for what was not asked or not a safetensors file).
+    """
+    try:
+        data_offset = read_header(path).data_offset if data else None
+    except SafetensorsFormatError:
+        data_offset = None
+    h_full = hashlib.sha256() if full else None
+    h_data = hashlib.sha256() if data_offset is not None else None
+    with open(path, "rb", buffering=0) as f:
+        if h_data and h_full:
+            h_full.update(f.read(data_offset))
+        elif h_data:
+            f.seek(data_offset)
+        stream_to(f, [h for h in (h_full, h_data) if h])
+    return {
+        "sha256": h_full.hexdigest() if h_full else None,
+        "data_sha256": h_data.hexdigest() if h_data else None,
+        "legacy": legacy_hash(path),
+    }
+
+def short_hashes(hashes):
+    """
+    AutoV2 / AutoV3 short forms added to a hash dict.
+    """
+    out = dict(hashes)
+    out["autov2"] = hashes["sha256"][:10] if hashes.get("sha256") else None
+    out["autov3"] = hashes["data_sha256"][:12] if hashes.get("data_sha256") else None
+    return out
+
+def drop_hashes(metadata):
+    """
+    Metadata without the stored hashes, for tools that write new tensor data.
+    """
+    return {k: v for k, v in metadata.items() if k not in HASH_KEYS}
+
+# ---------------------- CACHE ----------------------
+
+class HashCache:
+    def __init__(self, db_path=DEFAULT_DB):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.db_path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def get(self, path, size, mtime_ns):
+        row = self.conn.execute("SELECT size, mtime_ns, sha256, data_sha256, legacy FROM hashes WHERE path = ?",
+                                (path,)).fetchone()
+        if not row or row[0] != size or row[1] != mtime_ns:
+            return {}
+        return {k: v for k, v in zip(FIELDS, row[2:]) if v}
+
+    def put(self, path, size, mtime_ns, hashes):
+        self.conn.execute("INSERT OR REPLACE INTO hashes (path, size, mtime_ns, sha256, data_sha256, legacy) "
+                          "VALUES (?, ?, ?, ?, ?, ?)", (path, size, mtime_ns, *(hashes.get(k) for k in FIELDS)))
+
+# ---------------------- PER FILE ----------------------
+
+def stat_key(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+def write_hash(path, data_sha256):
+    """
+    Store sshs_model_hash in the header; returns how write_metadata did it, or None if already there.
+    """
+    metadata = read_header(path).metadata
+    if metadata.get("sshs_model_hash") == data_sha256:
+        return None
+    metadata["sshs_model_hash"] = data_sha256
+    return write_metadata(path, metadata)
+
+def file_hashes(path, cached, full=True, write=False):
+    """
+    Runs in a worker: fills in what the cache lacks. Returns (size, mtime_ns, hashes, note).
+    With write, the data hash goes into the header first, so the full hash is of the final file.
+    """
+    hashes, note = dict(cached), None
+    need_data = "data_sha256" not in hashes
+    need_full = full and "sha256" not in hashes
+    if write:
+        if need_data:
+            hashes.update({k: v for k, v in hash_file(path, full=False).items() if v})
+        if hashes.get("data_sha256"):
+            note = write_hash(path, hashes["data_sha256"])
+            if note:
+                hashes.pop("sha256", None)   # the header changed, and with it the whole-file hash
+                if note != "in place":
+                    hashes.pop("legacy", None)
+                need_full = full
+        need_data = False
+    if need_full or need_data:
+        hashes.update({k: v for k, v in hash_file(path, full=need_full, data=need_data).items() if v})
+    size, mtime_ns = stat_key(path)
+    return size, mtime_ns, hashes, note
+
+def hash_paths(paths, cache, full=True, write=False, rehash=False, workers=DEFAULT_WORKERS, progress=None):
+    """
+    [(path, hashes or None, error or note)] in input order; the cache is updated as files finish.
+    """
+    jobs = []
+    for path in paths:
+        size, mtime_ns = stat_key(path)
+        jobs.append((path, {} if rehash else cache.get(path, size, mtime_ns)))
+    results = []
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        futures = [pool.submit(file_hashes, path, cached, full, write) for path, cached in jobs]
+        for i, ((path, _), fut) in enumerate(zip(jobs, futures), 1):
+            try:
+                size, mtime_ns, hashes, note = fut.result()
+            except OSError as e:
+                results.append((path, None, str(e)))
+            else:
+                cache.put(path, size, mtime_ns, hashes)
+                cache.conn.commit()
+                results.append((path, short_hashes(hashes), note))
+            if progress:
+                progress(i, len(jobs))
+    return results
+
+def collect_paths(inputs):
+    paths = []
+    for p in inputs:
+        if os.path.isdir(p):
+            paths.extend(sorted(f for f, _, _ in walk_media(p, exts={".safetensors"})))
+        elif os.path.isfile(p):
+            paths.append(os.path.abspath(p))
+    return paths
+
+# ---------------------- CLI ----------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Cached sha256 / AutoV2 / AutoV3 hashes of safetensors files.")
+    ap.add_argument("inputs", nargs="*", help="files or folders (folders: every .safetensors below)")
+    ap.add_argument("--data-only", action="store_true", help="skip the whole-file sha256 / AutoV2")
+    ap.add_argument("--write", action="store_true", help="store sshs_model_hash in each file's metadata")
+    ap.add_argument("--dupes", action="store_true", help="list files with identical tensor data")
+    ap.add_argument("--json", help="write all hashes to this JSON file")
+    ap.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="files hashed at once")
+    ap.add_argument("--db", default=str(DEFAULT_DB), help="hash cache location")
+    ap.add_argument("--rehash", action="store_true", help="ignore cached hashes")
+    args = ap.parse_args()
+
+    inputs = args.inputs
+    if not inputs:
+        from tkinter import filedialog, Tk
+        root = Tk()
+        root.withdraw()
+        folder = filedialog.askdirectory(title="Select Folder to Hash")
+        inputs = [folder] if folder else []
+    paths = collect_paths(inputs)
+    if not paths:
+        print("❌ No files found.")
+        return 1
+
+    cache = HashCache(args.db)
+    try:
+        results = hash_paths(paths, cache, not args.data_only, args.write, args.rehash, args.workers)
+    finally:
+        cache.close()
+
+    errors = 0
+    for path, hashes, note in results:
+        if hashes is None:
+            errors += 1
+            print(f"❌ {path}: {note}")
+            continue
+        shown = [f"{k}={hashes[k]}" for k in ("autov2", "autov3", "legacy") if hashes.get(k)]
+        print(f"{os.path.basename(path)}  {'  '.join(shown)}" + (f"  (hash written, {note})" if note else ""))
+
+    if args.dupes:
+        groups = {}
+        for path, hashes, _ in results:
+            if hashes and hashes.get("data_sha256"):
+                groups.setdefault(hashes["data_sha256"], []).append(path)
+        dupes = [g for g in groups.values() if len(g) > 1]
+        print(f"\n{len(dupes)} group(s) with identical tensor data")
+        for g in dupes:
+            print("  " + "\n  ".join(g) + "\n")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({p: h for p, h, _ in results if h}, f, indent=2)
+    print(f"✔️ {len(results) - errors} file(s) hashed" + (f", {errors} failed" if errors else ""))
+
+if __name__ == "__main__":
+    sys.exit(main())
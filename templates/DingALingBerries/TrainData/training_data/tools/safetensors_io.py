@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+# safetensors_io.py — header-level safetensors access without torch or the safetensors package.
+# - A safetensors file is: 8-byte little-endian header length N, N bytes of JSON, tensor data.
+#   Reading metadata / tensor names, shapes and offsets only touches those first 8 + N bytes.
+# - write_metadata() rewrites just the header. When the new JSON fits in the old header
+#   (safetensors pads it with spaces), the file is patched in place and the tensor data is
+#   never touched. Otherwise the data section is streamed behind a new header with
+#   os.copy_file_range (kernel-side copy, no user-space buffers) or a large-buffer loop.
+# - Headers we write get a little spare padding so the next small edit fits in place.
+# - TensorFile memory-maps a file and hands out zero-copy NumPy views of single tensors
+#   (bf16 / fp8 decoded to float32 on request), so tools can walk huge checkpoints chunk by chunk.
+#   from_float32() encodes back (bf16 and fp8 e4m3fn with round-to-nearest-even).
+# - SafetensorsWriter writes a file tensor by tensor: the header is laid out up front from the
+#   declared dtypes / shapes, then data is appended in order, so outputs never sit in RAM whole.
+
+import os
+import json
+import math
+import mmap
+import shutil
+import struct
+import tempfile
+
+MAX_HEADER_BYTES = 100 << 20   # same limit as the reference implementation
+HEADER_SLACK = 4096            # spare padding added when a header has to be re-laid out
+COPY_CHUNK = 64 << 20          # bytes per copy_file_range / read call
+ALIGN = 8
+
+DTYPE_SIZES = {
+    "BOOL": 1, "U8": 1, "I8": 1, "F8_E4M3": 1, "F8_E5M2": 1,
+    "I16": 2, "U16": 2, "F16": 2, "BF16": 2,
+    "I32": 4, "U32": 4, "F32": 4,
+    "I64": 8, "U64": 8, "F64": 8,
+}
+
+# NumPy storage type per safetensors dtype (bf16 / fp8 are read as raw integers, see to_float32)
+STORAGE_DTYPES = {
+    "BOOL": "?", "U8": "u1", "I8": "i1", "F8_E4M3": "u1", "F8_E5M2": "u1",
+    "I16": "<i2", "U16": "<u2", "F16": "<f2", "BF16": "<u2",
+    "I32": "<i4", "U32": "<u4", "F32": "<f4",
+    "I64": "<i8", "U64": "<u8", "F64": "<f8",
+}
+
+class SafetensorsFormatError(ValueError): pass
+
+# ---------------------- READING ----------------------
+
+class SafetensorsHeader:
+    """
+    Parsed header of one file: metadata dict, {name: {"dtype", "shape", "data_offsets"}},
+    and where the data section starts (offsets in the header are relative to it).
+    """
+    def __init__(self, path, header, header_size, file_size):
+        self.path = path
+        self.metadata = dict(header.pop("__metadata__", None) or {})
+        self.tensors = header
+        self.header_size = header_size
+        self.data_offset = 8 + header_size
+        self.file_size = file_size
+
+    def __len__(self):
+        return len(self.tensors)
+
+    def keys(self):
+        return self.tensors.keys()
+
+    def nbytes(self, name):
+        start, end = self.tensors[name]["data_offsets"]
+        return end - start
+
+    def absolute_range(self, name):
+        """
+        (start, end) byte positions of a tensor in the file.
+        """
+        start, end = self.tensors[name]["data_offsets"]
+        return self.data_offset + start, self.data_offset + end
+
+    @property
+    def data_size(self):
+        return self.file_size - self.data_offset
+
+def read_header(path):
+    """
+    SafetensorsHeader for path; reads 8 + N bytes only.
+    """
+    with open(path, "rb") as f:
+        head = f.read(8)
+        if len(head) < 8:
+            raise SafetensorsFormatError("file too short for a safetensors header")
+        (n,) = struct.unpack("<Q", head)
+        if n > MAX_HEADER_BYTES:
+            raise SafetensorsFormatError(f"header length {n} exceeds {MAX_HEADER_BYTES}")
+        raw = f.read(n)
+        file_size = os.fstat(f.fileno()).st_size
+    if len(raw) < n:
+        raise SafetensorsFormatError("truncated header")
+    try:
+        header = json.loads(raw)
+    except ValueError as e:
+        raise SafetensorsFormatError(f"header is not valid JSON: {e}")
+    if not isinstance(header, dict):
+        raise SafetensorsFormatError("header is not a JSON object")
+    return SafetensorsHeader(path, header, n, file_size)
+
+def read_metadata(path):
+    return read_header(path).metadata
+
+# ---------------------- TENSOR ACCESS ----------------------
+
+_E4M3_TABLE = None
+
+def e4m3_table():
+    """
+    float32 value of each of the 256 float8_e4m3fn bit patterns (no infinities, S.1111.111 = NaN).
+    """
+    global _E4M3_TABLE
+    if _E4M3_TABLE is None:
+        import numpy as np
+        bits = np.arange(256)
+        sign = np.where(bits & 0x80, -1.0, 1.0)
+        exp = (bits >> 3) & 0xF
+        man = bits & 0x7
+        value = np.where(exp == 0, man / 8.0 * 2.0 ** -6, (1 + man / 8.0) * 2.0 ** (exp - 7.0))
+        value = np.where((exp == 0xF) & (man == 0x7), np.nan, value)
+        _E4M3_TABLE = (sign * value).astype(np.float32)
+    return _E4M3_TABLE
+
+def to_float32(raw, dtype):
+    """
+    float32 copy of a raw storage array of the given safetensors dtype.
+    """
+    import numpy as np
+    if dtype == "BF16":
+        return (raw.astype(np.uint32) << 16).view(np.float32)
+    if dtype == "F8_E4M3":
+        return e4m3_table()[raw]
+    if dtype == "F8_E5M2":
+        return (raw.astype(np.uint16) << 8).view(np.float16).astype(np.float32)
+    return raw.astype(np.float32)
+
+E4M3_MAX = 448.0
+
+def to_e4m3(x):
+    """
+    float8_e4m3fn bit patterns (uint8) of float32 values: round to nearest even, saturating at
+    +-448 (the format has no infinities), NaN -> 0x7F. Scale into range before calling.
+    """
+    import numpy as np
+    x = np.asarray(x, dtype=np.float32)
+    a = np.fmin(np.abs(x), np.float32(E4M3_MAX))     # fmin: NaN -> 448, patched below
+    # normals: keep 3 mantissa bits of the float32 pattern with round-half-even, re-bias 127 -> 7
+    u = a.view(np.uint32)
+    r = (u + 0x7FFFF + ((u >> 20) & 1)) >> 20
+    normal = r.astype(np.int32) - ((127 - 7) << 3)
+    # subnormals (|x| < 2^-6) are multiples of 2^-9; code 8 is the smallest normal, so this carries
+    sub = np.rint(a * np.float32(512)).astype(np.int32)
+    code = np.where(a < np.float32(2.0 ** -6), sub, normal).astype(np.uint8)
+    code |= (np.signbit(x).astype(np.uint8) << 7)
+    return np.where(np.isnan(x), np.uint8(0x7F), code)
+
+def from_float32(x, dtype):
+    """
+    Raw storage array of the given safetensors dtype from float values (bf16: round to nearest
+    even; F8_E4M3: see to_e4m3).
+    """
+    import numpy as np
+    x = np.asarray(x, dtype=np.float32)
+    if dtype == "BF16":
+        u = x.view(np.uint32)
+        rounded = (u + 0x7FFF + ((u >> 16) & 1)) >> 16
+        return np.where(np.isnan(x), 0x7FC0, rounded).astype(np.uint16)
+    if dtype == "F8_E4M3":
+        return to_e4m3(x)
+    if dtype == "F8_E5M2":
+        raise ValueError(f"no encoder for {dtype}")
+    return x.astype(STORAGE_DTYPES[dtype])
+
+class TensorFile:
+    """
+    Read-only memory map of one safetensors file.
+        with TensorFile(path) as tf:
+            raw = tf.raw(name)        # zero-copy view in storage dtype, shaped
+            x = tf.float32(name)      # decoded copy (use raw() + to_float32 on slices to stay small)
+    """
+    def __init__(self, path):
+        import numpy as np
+        self._np = np
+        self.header = read_header(path)
+        self._file = open(path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # views still alive; the map goes away with them
+        self._file.close()
+
+    @property
+    def metadata(self):
+        return self.header.metadata
+
+    def keys(self):
+        return self.header.keys()
+
+    def dtype(self, name):
+        return self.header.tensors[name]["dtype"]
+
+    def shape(self, name):
+        return tuple(self.header.tensors[name]["shape"])
+
+    def raw(self, name):
+        info = self.header.tensors[name]
+        storage = self._np.dtype(STORAGE_DTYPES[info["dtype"]])
+        start, end = self.header.absolute_range(name)
+        if end > self.header.file_size:
+            raise SafetensorsFormatError(f"{name} extends past the end of the file")
+        count = (end - start) // storage.itemsize
+        return self._np.frombuffer(self._mm, storage, count, start).reshape(info["shape"])
+
+    def float32(self, name):
+        return to_float32(self.raw(name), self.dtype(name))
+
+# ---------------------- WRITING ----------------------
+
+def header_json(tensors, metadata):
+    """
+    Compact JSON bytes of a header, unpadded.
+    """
+    for k, v in (metadata or {}).items():
+        if not isinstance(k, str) or not isinstance(v, str):
+            raise SafetensorsFormatError(f"metadata must map str -> str (got {k!r}: {type(v).__name__})")
+    header = {"__metadata__": metadata} if metadata else {}
+    header.update(tensors)
+    return json.dumps(header, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def encode_header(tensors, metadata, slack=HEADER_SLACK):
+    """
+    Header bytes (without the length prefix), space-padded to ALIGN plus `slack` spare bytes.
+    """
+    raw = header_json(tensors, metadata)
+    size = -(-(len(raw) + slack) // ALIGN) * ALIGN
+    return raw + b" " * (size - len(raw))
+
+def copy_range(src, dst, offset, length):
+    """
+    Copy length bytes from src (at offset) to dst's current position.
+    """
+    src.seek(offset)
+    remaining = length
+    if hasattr(os, "copy_file_range"):
+        dst.flush()
+        out_pos = dst.tell()
+        try:
+            while remaining:
+                n = os.copy_file_range(src.fileno(), dst.fileno(), min(remaining, COPY_CHUNK),
+                                       offset + length - remaining, out_pos + length - remaining)
+                if n == 0:
+                    break
+                remaining -= n
+        except OSError:
+            pass  # cross-filesystem on old kernels, unsupported fs, ...: fall back below
+        dst.seek(out_pos + length - remaining)
+        src.seek(offset + length - remaining)
+    buf = bytearray(min(COPY_CHUNK, max(remaining, 1)))
+    view = memoryview(buf)
+    while remaining:
+        n = src.readinto(view[:min(remaining, len(buf))])
+        if not n:
+            raise SafetensorsFormatError("file ended inside the tensor data")
+        dst.write(view[:n])
+        remaining -= n
+
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def replace_with(tmp, path):
+    """
+    Move a finished temp file over path. mkstemp creates files as 0600; the result gets path's
+    old mode, or the umask default a plain open() would give, so other users can read it.
+    """
+    if os.path.exists(path):
+        shutil.copymode(path, tmp)
+    else:
+        os.chmod(tmp, 0o666 & ~_UMASK)
+    os.replace(tmp, path)
+
+def write_file(info, out_path, tensors=None, metadata=None, append=None):
+    """
+    New file at out_path: fresh header (tensors / metadata default to info's) followed by
+    info's whole data section, streamed. Writes through a temp file, so out_path may be info.path.
+    append: {name: (dtype, shape, bytes)} of small extra tensors stored after the copied data.
+    """
+    tensors = dict(info.tensors if tensors is None else tensors)
+    metadata = info.metadata if metadata is None else metadata
+    offset = info.data_size
+    for name, (dtype, shape, data) in (append or {}).items():
+        tensors[name] = {"dtype": dtype, "shape": list(shape), "data_offsets": [offset, offset + len(data)]}
+        offset += len(data)
+    header = encode_header(tensors, metadata)
+    folder = os.path.dirname(os.path.abspath(out_path))
+    fd, tmp = tempfile.mkstemp(prefix=".st_", suffix=".tmp", dir=folder)
+    try:
+        with open(info.path, "rb") as src, os.fdopen(fd, "wb") as dst:
+            dst.write(struct.pack("<Q", len(header)))
+            dst.write(header)
+            copy_range(src, dst, info.data_offset, info.data_size)
+            for _, _, data in (append or {}).values():
+                dst.write(data)
+        replace_with(tmp, out_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return out_path
+
+class SafetensorsWriter:
+    """
+    Streamed output file.
+        with SafetensorsWriter(out, {name: (dtype, shape)}, metadata) as w:
+            for name in specs: w.write(name, array_or_bytes)   # in declaration order
+    Data goes to a temp file next to out that replaces it on a clean exit.
+    """
+    def __init__(self, path, specs, metadata=None):
+        self.path = path
+        self.names = list(specs)
+        tensors, offset = {}, 0
+        for name, (dtype, shape) in specs.items():
+            n = DTYPE_SIZES[dtype] * math.prod(shape)
+            tensors[name] = {"dtype": dtype, "shape": list(shape), "data_offsets": [offset, offset + n]}
+            offset += n
+        self.tensors = tensors
+        self.data_size = offset
+        self._next = 0
+        self._written = 0
+        header = encode_header(tensors, metadata or {})
+        fd, self._tmp = tempfile.mkstemp(prefix=".st_", suffix=".tmp", dir=os.path.dirname(os.path.abspath(path)))
+        self._file = os.fdopen(fd, "wb")
+        self._file.write(struct.pack("<Q", len(header)))
+        self._file.write(header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, name, data, partial=False):
+        """
+        Append the bytes of tensor `name` (must be the next declared one). partial=True lets a
+        big tensor arrive in several calls; the next name is expected once it is complete.
+        """
+        if self._next >= len(self.names) or self.names[self._next] != name:
+            raise ValueError(f"expected {self.names[self._next] if self._next < len(self.names) else 'nothing'}, got {name}")
+        buf = memoryview(data)
+        if not buf.c_contiguous:
+            buf = memoryview(buf.tobytes())
+        buf = buf.cast("B")
+        start, end = self.tensors[name]["data_offsets"]
+        self._written += len(buf)
+        if self._written > end - start:
+            raise ValueError(f"{name}: {self._written} bytes written, {end - start} declared")
+        self._file.write(buf)
+        if self._written == end - start:
+            self._next += 1
+            self._written = 0
+        elif not partial:
+            raise ValueError(f"{name}: {self._written} bytes written, {end - start} declared")
+
+    def close(self):
+        if self._next != len(self.names):
+            self.abort()
+            raise ValueError(f"{len(self.names) - self._next} tensor(s) not written")
+        self._file.close()
+        replace_with(self._tmp, self.path)
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp):
+            os.remove(self._tmp)
+
+def write_metadata(path, metadata, out_path=None):
+    """
+    Replace the __metadata__ of path. out_path None edits path itself. Returns how it was done:
+    "in place" (header patched, data untouched), "rewritten" (header grew, data streamed to a
+    new file that replaced the old one) or "copied" (written to out_path).
+    """
+    info = read_header(path)
+    if out_path and os.path.abspath(out_path) != os.path.abspath(path):
+        write_file(info, out_path, metadata=metadata)
+        return "copied"
+    raw = header_json(info.tensors, metadata)
+    if len(raw) > info.header_size:
+        write_file(info, path, metadata=metadata)
+        return "rewritten"
+    with open(path, "r+b") as f:
+        f.seek(8)
+        f.write(raw + b" " * (info.header_size - len(raw)))
+    return "in place"
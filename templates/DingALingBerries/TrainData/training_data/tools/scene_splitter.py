@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+# scene_splitter.py — split long source videos into clean training clips at hard scene cuts.
+# - Two detectors: ffmpeg's scene score (select=gt(scene,T)) or a NumPy frame-difference pass
+#   over tiny grayscale frames piped out of ffmpeg. Both downscale inside ffmpeg first, so
+#   detection runs well above real time on CPU.
+# - Cut lists are cached per source (path + size + mtime + settings); re-runs skip detection.
+# - Scenes shorter than --min_len are merged into the previous clip.
+#
+# Usage:
+#   python scene_splitter.py <video or folder> [...] [--out DIR] [--method ffmpeg|numpy]
+#   python scene_splitter.py                      (pick a folder in a dialog)
+#
+# Requirements: ffmpeg + ffprobe on PATH. numpy only for --method numpy.
+
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+import subprocess
+from pathlib import Path
+
+from Video16FPS_Converter import list_videos, get_video_stream_info
+
+CACHE_DIR = Path.home() / ".cache" / "deadlymusubi" / "scenes"
+
+# Defaults tuned on live-action 1080p rips: ffmpeg scene score is 0..1,
+# numpy score is mean absolute difference of 64x36 gray frames in 0..1.
+DEFAULT_THRESHOLD = {"ffmpeg": 0.30, "numpy": 0.12}
+DEFAULT_MIN_LEN = 1.0
+SCENES_DIR = "scenes"  # default clip folder, next to each source
+
+NP_W, NP_H = 64, 36
+NP_BATCH = 256  # frames per read in the numpy pass
+
+PTS_RE = re.compile(r"pts_time:([0-9.]+)")
+
+# ---------------------- DETECTION ----------------------
+
+def detect_cuts_ffmpeg(ffmpeg, src, threshold):
+    """
+    Scene-change timestamps (seconds) using ffmpeg's own scene score.
+    """
+    vf = f"scale={NP_W * 2}:-2,select='gt(scene,{threshold})',showinfo"
+    cmd = [ffmpeg, "-hide_banner", "-nostats", "-i", src,
+           "-an", "-sn", "-dn", "-vf", vf, "-f", "null", "-"]
+    p = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+    if p.returncode != 0:
+        raise RuntimeError(f"ffmpeg scene detection failed for {src}:\n{p.stderr[-2000:]}")
+    cuts = []
+    for line in p.stderr.splitlines():
+        if "showinfo" not in line:
+            continue
+        m = PTS_RE.search(line)
+        if m:
+            cuts.append(float(m.group(1)))
+    return cuts
+
+def detect_cuts_numpy(ffmpeg, src, threshold, fps):
+    """
+    Scene-change timestamps (seconds) from a vectorized frame-difference pass.
+    ffmpeg decodes and shrinks to NP_W x NP_H gray; NumPy scores NP_BATCH frames at a time
+    out of one reusable buffer, so memory stays flat for any input length.
+    """
+    import numpy as np
+
+    if not fps:
+        raise RuntimeError(f"Unknown frame rate for {src}; use --method ffmpeg.")
+
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-i", src,
+           "-an", "-sn", "-dn", "-vf", f"scale={NP_W}:{NP_H},format=gray",
+           "-f", "rawvideo", "pipe:1"]
+    frame_bytes = NP_W * NP_H
+    buf = bytearray(frame_bytes * NP_BATCH)
+    view = memoryview(buf)
+
+    cuts = []
+    prev = None
+    base = 0  # index of first frame in the current batch
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            got = 0
+            while got < len(buf):
+                n = proc.stdout.readinto(view[got:])
+                if not n:
+                    break
+                got += n
+            count = got // frame_bytes
+            if count == 0:
+                break
+
+            frames = np.frombuffer(buf, dtype=np.uint8, count=count * frame_bytes)
+            frames = frames.reshape(count, NP_H, NP_W).astype(np.int16)
+            if prev is not None:
+                frames = np.concatenate([prev[None], frames])
+            scores = np.abs(np.diff(frames, axis=0)).mean(axis=(1, 2)) / 255.0
+            offset = 0 if prev is None else 1
+            for i in np.flatnonzero(scores > threshold):
+                cuts.append((base + int(i) + 1 - offset) / fps)
+
+            prev = frames[-1].copy()
+            base += count
+            if got < len(buf):
+                break
+    finally:
+        proc.stdout.close()
+        err = proc.stderr.read().decode("utf-8", "replace")
+        proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg decode failed for {src}:\n{err[-2000:]}")
+    return cuts
+
+def segments_from_cuts(cuts, duration, min_len):
+    """
+    Turn cut timestamps into (start, end) clips, folding scenes shorter than
+    min_len into the clip before them.
+    """
+    bounds = [0.0]
+    for t in sorted(cuts):
+        if t - bounds[-1] >= min_len and (duration is None or duration - t >= min_len):
+            bounds.append(t)
+    end = duration if duration else (bounds[-1] if len(bounds) > 1 else None)
+    segs = [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+    if end is not None and end > bounds[-1]:
+        segs.append((bounds[-1], end))
+    return segs
+
+# ---------------------- CACHE ----------------------
+
+def _cache_path(src):
+    key = hashlib.sha1(os.path.abspath(src).encode("utf-8")).hexdigest()
+    return CACHE_DIR / f"{key}.json"
+
+def load_cached_cuts(src, method, threshold):
+    p = _cache_path(src)
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+        st = os.stat(src)
+        if (entry["size"], entry["mtime_ns"]) != (st.st_size, st.st_mtime_ns):
+            return None
+        return entry["results"].get(f"{method}:{threshold}")
+    except (OSError, ValueError, KeyError):
+        return None
+
+def store_cached_cuts(src, method, threshold, cuts):
+    p = _cache_path(src)
+    st = os.stat(src)
+    entry = {"path": os.path.abspath(src), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "results": {}}
+    try:
+        with open(p, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        if (old.get("size"), old.get("mtime_ns")) == (st.st_size, st.st_mtime_ns):
+            entry["results"] = old.get("results", {})
+    except (OSError, ValueError):
+        pass
+    entry["results"][f"{method}:{threshold}"] = cuts
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    os.replace(tmp, p)
+
+def find_cuts(src, method, threshold, ffmpeg="ffmpeg", ffprobe="ffprobe", vinfo=None, use_cache=True):
+    if use_cache:
+        cached = load_cached_cuts(src, method, threshold)
+        if cached is not None:
+            return cached, True
+    if method == "numpy":
+        vinfo = vinfo or get_video_stream_info(ffprobe, src)
+        cuts = detect_cuts_numpy(ffmpeg, src, threshold, vinfo.get("fps"))
+    else:
+        cuts = detect_cuts_ffmpeg(ffmpeg, src, threshold)
+    store_cached_cuts(src, method, threshold, cuts)
+    return cuts, False
+
+# ---------------------- SPLITTING ----------------------
+
+def split_video(ffmpeg, src, segments, out_dir, copy=False, crf="18", preset="veryfast"):
+    """
+    Cut src into one file per segment in a single ffmpeg run (segment muxer).
+    Re-encoding forces keyframes at the cuts so clips start exactly on the new scene;
+    --copy is faster but can only cut on existing keyframes.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    name, ext = os.path.splitext(os.path.basename(src))
+    pattern = os.path.join(out_dir, f"{name}_scene%03d{ext or '.mp4'}")
+    times = ",".join(f"{s:.3f}" for s, _ in segments[1:])
+
+    cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-i", src, "-map", "0:v:0", "-an"]
+    if copy:
+        cmd += ["-c:v", "copy"]
+    else:
+        cmd += ["-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-pix_fmt", "yuv420p"]
+        if times:
+            cmd += ["-force_key_frames", times]
+    cmd += ["-f", "segment", "-reset_timestamps", "1"]
+    if times:
+        cmd += ["-segment_times", times]
+    cmd.append(pattern)
+
+    p = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+    if p.returncode != 0:
+        raise RuntimeError(f"ffmpeg split failed for {src}:\n{p.stderr[-2000:]}")
+    return pattern
+
+# ---------------------- CLI ----------------------
+
+def get_input_paths(args):
+    if args.inputs:
+        return args.inputs
+    from tkinter import Tk, filedialog
+    root = Tk()
+    root.withdraw()
+    folder = filedialog.askdirectory(title="Select Folder of Source Videos")
+    return [folder] if folder else []
+
+def collect_videos(inputs, out=None):
+    """
+    Videos to split. Folders are walked recursively, skipping clip folders of earlier runs
+    (any "scenes" folder below the input, and --out), so re-runs don't split clips again.
+    """
+    out = os.path.normcase(os.path.abspath(out)) if out else None
+    files = []
+    for p in inputs:
+        if not os.path.isdir(p):
+            files += list_videos([p], animated=False)
+            continue
+        for f in list_videos([p], animated=False):
+            folders = Path(os.path.relpath(f, p)).parts[:-1]
+            in_out = out and os.path.normcase(os.path.abspath(f)).startswith(out + os.sep)
+            if SCENES_DIR not in folders and not in_out:
+                files.append(f)
+    return files
+
+def main():
+    ap = argparse.ArgumentParser(description="Split videos into clips at hard scene cuts.")
+    ap.add_argument("inputs", nargs="*", help="video files or folders (recursive)")
+    ap.add_argument("--out", help="output folder (default: <source folder>/scenes)")
+    ap.add_argument("--method", choices=["ffmpeg", "numpy"], default="ffmpeg")
+    ap.add_argument("--threshold", type=float, help="cut threshold (default 0.30 ffmpeg / 0.12 numpy)")
+    ap.add_argument("--min_len", type=float, default=DEFAULT_MIN_LEN, help="shortest clip in seconds")
+    ap.add_argument("--copy", action="store_true", help="stream copy instead of re-encoding (keyframe-accurate only)")
+    ap.add_argument("--dry_run", action="store_true", help="only print the detected clips")
+    ap.add_argument("--no_cache", action="store_true", help="ignore cached cut lists")
+    ap.add_argument("--ffmpeg", default="ffmpeg")
+    ap.add_argument("--ffprobe", default="ffprobe")
+    args = ap.parse_args()
+
+    threshold = args.threshold if args.threshold is not None else DEFAULT_THRESHOLD[args.method]
+    files = collect_videos(get_input_paths(args), args.out)
+    if not files:
+        print("❌ No videos found.")
+        return 1
+
+    for idx, src in enumerate(files, 1):
+        vinfo = get_video_stream_info(args.ffprobe, src)
+        duration = vinfo.get("duration")
+        try:
+            cuts, cached = find_cuts(src, args.method, threshold, args.ffmpeg, args.ffprobe,
+                                     vinfo=vinfo, use_cache=not args.no_cache)
+        except RuntimeError as e:
+            print(f"❌ [{idx}/{len(files)}] {e}")
+            continue
+
+        segs = segments_from_cuts(cuts, duration, args.min_len)
+        print(f"[{idx}/{len(files)}] {src}: {len(cuts)} cut(s), {len(segs)} clip(s)"
+              f"{' (cached)' if cached else ''}")
+        for s, e in segs:
+            print(f"    {s:9.3f} → {e:9.3f}  ({e - s:.2f}s)")
+        if args.dry_run or len(segs) == 0:
+            continue
+
+        out_dir = args.out or os.path.join(os.path.dirname(src), SCENES_DIR)
+        try:
+            pattern = split_video(args.ffmpeg, src, segs, out_dir, copy=args.copy)
+            print(f"✔️ Clips written: {pattern}")
+        except RuntimeError as e:
+            print(f"❌ {e}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
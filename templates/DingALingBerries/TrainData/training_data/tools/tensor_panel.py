@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# tensor_panel.py — tensor list + on-demand statistics for one .safetensors file (Tk panel).
+# - The list (name, dtype, shape, parameters, byte offset, size) comes from the header alone, so
+#   a multi-GB checkpoint opens instantly.
+# - Selecting a tensor computes min / max / mean / std / norm, zero and non-finite counts and a
+#   histogram in a background thread, from the memory-mapped bytes of that tensor only
+#   (safetensors_io.TensorFile), in CHUNK_ELEMS slices. bf16 / fp8 are decoded per slice.
+# - Used as the "Tensors" tab of lora_metadata_gui.py; standalone:
+#
+# Usage:
+#   python tensor_panel.py [file.safetensors]
+
+import os
+import sys
+import math
+import threading
+
+from safetensors_io import TensorFile, to_float32
+
+CHUNK_ELEMS = 1 << 22          # elements decoded at a time (16 MB as float32)
+HIST_BINS = 64
+
+# ---------------------- STATS ----------------------
+
+def _slices(tf, name):
+    raw = tf.raw(name).reshape(-1)
+    dtype = tf.dtype(name)
+    for i in range(0, raw.size, CHUNK_ELEMS):
+        yield to_float32(raw[i:i + CHUNK_ELEMS], dtype)
+
+def tensor_stats(tf, name, bins=HIST_BINS):
+    """
+    {count, min, max, mean, std, norm, zeros, nonfinite, hist, edges} of one tensor, streamed.
+    Two passes over its bytes: moments and range, then the histogram over that range.
+    """
+    import numpy as np
+    count = zeros = nonfinite = 0
+    total = total_sq = 0.0
+    lo, hi = math.inf, -math.inf
+    for x in _slices(tf, name):
+        finite = np.isfinite(x)
+        if not finite.all():
+            nonfinite += int(x.size - finite.sum())
+            x = x[finite]
+        if not x.size:
+            continue
+        x64 = x.astype(np.float64)
+        count += x.size
+        zeros += int(np.count_nonzero(x == 0))
+        total += float(x64.sum())
+        total_sq += float(np.dot(x64, x64))
+        lo, hi = min(lo, float(x.min())), max(hi, float(x.max()))
+    if not count:
+        return {"count": 0, "nonfinite": nonfinite, "zeros": 0, "hist": None, "edges": None}
+    mean = total / count
+    hist = np.zeros(bins, np.int64)
+    edges = np.linspace(lo, hi if hi > lo else lo + 1, bins + 1)
+    for x in _slices(tf, name):
+        hist += np.histogram(x[np.isfinite(x)], edges)[0]
+    return {
+        "count": count, "min": lo, "max": hi, "mean": mean,
+        "std": math.sqrt(max(total_sq / count - mean * mean, 0.0)),
+        "norm": math.sqrt(total_sq), "zeros": zeros, "nonfinite": nonfinite,
+        "hist": hist, "edges": edges,
+    }
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+# ---------------------- PANEL ----------------------
+
+class TensorPanel:
+    COLUMNS = ("dtype", "shape", "params", "offset", "size")
+
+    def __init__(self, master):
+        import tkinter as tk
+        from tkinter import ttk
+        from ffmpeg_jobs import TkDispatcher
+
+        self.ui = TkDispatcher(master)
+        self.tf = None
+        self.job = 0
+        self.frame = ttk.Frame(master)
+        self.frame.columnconfigure(0, weight=1)
+        self.frame.rowconfigure(1, weight=1)
+
+        bar = ttk.Frame(self.frame)
+        bar.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 5))
+        ttk.Label(bar, text="Filter:").pack(side="left")
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *_: self.populate())
+        ttk.Entry(bar, textvariable=self.filter_var, width=40).pack(side="left", padx=5)
+        self.count_var = tk.StringVar()
+        ttk.Label(bar, textvariable=self.count_var).pack(side="left", padx=10)
+
+        self.tree = ttk.Treeview(self.frame, columns=self.COLUMNS, show="tree headings", selectmode="browse")
+        self.tree.heading("#0", text="name")
+        self.tree.column("#0", width=420, stretch=True)
+        for c in self.COLUMNS:
+            self.tree.heading(c, text=c)
+            self.tree.column(c, width=140 if c == "shape" else 90, stretch=False, anchor="e")
+        ys = ttk.Scrollbar(self.frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=ys.set)
+        self.tree.grid(row=1, column=0, sticky="nsew")
+        ys.grid(row=1, column=1, sticky="ns")
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+        stats = ttk.Frame(self.frame)
+        stats.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(5, 0))
+        stats.columnconfigure(1, weight=1)
+        self.stats_var = tk.StringVar(value="Select a tensor to compute its statistics.")
+        ttk.Label(stats, textvariable=self.stats_var, font=("Courier New", 10), justify="left").grid(
+            row=0, column=0, sticky="nw", padx=(0, 10))
+        self.hist = tk.Canvas(stats, height=140, background="white", highlightthickness=0)
+        self.hist.grid(row=0, column=1, sticky="ew")
+
+    def grid(self, **kw):
+        self.frame.grid(**kw)
+
+    def close(self):
+        self.job += 1
+        if self.tf:
+            self.tf.close()
+            self.tf = None
+
+    def load(self, path):
+        """
+        Header only: the tensor bytes are not touched until a tensor is selected.
+        """
+        self.close()
+        self.tf = TensorFile(path)
+        self.populate()
+        self.stats_var.set("Select a tensor to compute its statistics.")
+        self.hist.delete("all")
+
+    def populate(self):
+        self.tree.delete(*self.tree.get_children())
+        if not self.tf:
+            return
+        header = self.tf.header
+        needle = self.filter_var.get().lower()
+        shown = 0
+        for name, info in header.tensors.items():
+            if needle and needle not in name.lower():
+                continue
+            start, end = header.absolute_range(name)
+            shape = info.get("shape", [])
+            self.tree.insert("", "end", iid=name, text=name, values=(
+                info.get("dtype", "?"), "x".join(map(str, shape)) or "scalar", f"{math.prod(shape):,}",
+                f"{start:,}", format_bytes(end - start)))
+            shown += 1
+        self.count_var.set(f"{shown} of {len(header)} tensor(s), {format_bytes(header.file_size)}")
+
+    def on_select(self, _event=None):
+        selection = self.tree.selection()
+        if not selection or not self.tf:
+            return
+        name = selection[0]
+        self.job += 1
+        job, tf = self.job, self.tf
+        self.stats_var.set(f"Reading {format_bytes(tf.header.nbytes(name))} ...")
+        self.hist.delete("all")
+
+        def work():
+            try:
+                stats = tensor_stats(tf, name)
+            except Exception as e:
+                stats = {"error": str(e)}
+            self.ui.post(self.show_stats, job, name, stats)
+
+        threading.Thread(target=work, daemon=True).start()
+
+    def show_stats(self, job, name, stats):
+        if job != self.job:
+            return  # a newer selection (or file) superseded this one
+        if "error" in stats:
+            self.stats_var.set(f"❌ {stats['error']}")
+            return
+        if not stats["count"]:
+            self.stats_var.set(f"{name}\nno finite values ({stats['nonfinite']} non-finite)")
+            return
+        self.stats_var.set(
+            f"{name}\n"
+            f"min  {stats['min']:+.6g}\nmax  {stats['max']:+.6g}\n"
+            f"mean {stats['mean']:+.6g}\nstd  {stats['std']:.6g}\nnorm {stats['norm']:.6g}\n"
+            f"zeros {stats['zeros']:,} / {stats['count']:,}" +
+            (f"\nnon-finite {stats['nonfinite']:,}" if stats["nonfinite"] else ""))
+        self.draw_histogram(stats["hist"], stats["edges"])
+
+    def draw_histogram(self, hist, edges):
+        c = self.hist
+        c.update_idletasks()
+        w, h = max(c.winfo_width(), 200), int(c["height"])
+        top = max(int(hist.max()), 1)
+        bar = (w - 10) / len(hist)
+        for i, n in enumerate(hist):
+            bh = (h - 25) * n / top
+            c.create_rectangle(5 + i * bar, h - 18 - bh, 5 + (i + 1) * bar - 1, h - 18, fill="#3b528b", width=0)
+        c.create_text(5, h - 2, text=f"{edges[0]:.4g}", anchor="sw")
+        c.create_text(w - 5, h - 2, text=f"{edges[-1]:.4g}", anchor="se")
+        c.create_text(w - 5, 2, text=f"peak {top:,}", anchor="ne")
+
+# ---------------------- STANDALONE ----------------------
+
+def main():
+    import tkinter as tk
+    from tkinter import filedialog
+    root = tk.Tk()
+    root.title("Tensor Browser")
+    root.geometry("1200x800")
+    root.rowconfigure(0, weight=1)
+    root.columnconfigure(0, weight=1)
+    path = sys.argv[1] if len(sys.argv) > 1 else filedialog.askopenfilename(
+        filetypes=[("SafeTensor files", "*.safetensors")])
+    if not path or not os.path.isfile(path):
+        print("❌ No valid file selected.")
+        return 1
+    panel = TensorPanel(root)
+    panel.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+    panel.load(path)
+    root.title(f"Tensor Browser - {os.path.basename(path)}")
+    root.mainloop()
+
+if __name__ == "__main__":
+    sys.exit(main())